@@ -0,0 +1,48 @@
+
+# benchmark_gene.py
+
+__module_name__ = "benchmark_gene.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+# import packages #
+# --------------- #
+import seq_toolkit
+
+
+# local imports #
+# ------------- #
+from fixtures import DEFAULT_SCALES
+
+
+# gene length and number of exons simulated at each scale
+_GENE_MODELS = {"kb": (50_000, 15), "Mb": (1_000_000, 100), "Gb": (2_000_000, 200)}
+
+
+class CreateGene:
+
+    params = DEFAULT_SCALES
+    param_names = ["scale"]
+    items = "bases"
+
+    def setup(self, scale):
+        self.gene_length, self.n_exons = _GENE_MODELS[scale]
+        self.n_items = self.gene_length
+
+    def time_create(self, scale):
+        seq_toolkit.Gene().create(gene_length=self.gene_length, n_exons=self.n_exons, max_exon_length=2_500)
+
+
+class ExtractFeatures(CreateGene):
+
+    def setup(self, scale):
+        super().setup(scale)
+        self.gene = seq_toolkit.Gene()
+        self.gene.create(gene_length=self.gene_length, n_exons=self.n_exons, max_exon_length=2_500)
+
+    def time_transcript(self, scale):
+        self.gene.transcript()
+
+    def time_introns(self, scale):
+        self.gene.introns()
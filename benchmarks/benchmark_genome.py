@@ -0,0 +1,78 @@
+
+# benchmark_genome.py
+
+__module_name__ = "benchmark_genome.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+# import packages #
+# --------------- #
+import os
+import pandas as pd
+import seq_toolkit
+
+
+# local imports #
+# ------------- #
+from fixtures import DEFAULT_SCALES, SCALES, chromosome_sizes, fixture_paths
+
+
+class FetchChromosome:
+
+    params = DEFAULT_SCALES
+    param_names = ["scale"]
+    items = "bases"
+
+    def setup(self, scale):
+        self.fasta_path = fixture_paths(scale)["fasta"]
+        self.n_items = chromosome_sizes(scale)["chr2"]
+
+    def time_fetch_chromosome(self, scale):
+        seq_toolkit.fetch_chromosome(self.fasta_path, "chr2")
+
+    def time_fetch_region(self, scale):
+        seq_toolkit.fetch_region(self.fasta_path, "chr2", 0, self.n_items)
+
+
+class ParseReference:
+
+    params = DEFAULT_SCALES
+    param_names = ["scale"]
+    items = "bases"
+
+    def setup(self, scale):
+        self.reference_dir = fixture_paths(scale)["reference_dir"]
+        self.gtf_tsv = os.path.join(self.reference_dir, "genes", "gtf.tsv")
+        self.n_items = SCALES[scale]
+
+    def time_parse_reference(self, scale):
+        # parse the GTF itself, not the cached tsv written by a previous call
+        if os.path.exists(self.gtf_tsv):
+            os.remove(self.gtf_tsv)
+        seq_toolkit.parse_reference(self.reference_dir)
+
+
+class MergeFeatures:
+
+    params = DEFAULT_SCALES
+    param_names = ["scale"]
+    items = "intervals"
+
+    def setup(self, scale):
+        self.features_df = pd.read_csv(
+            fixture_paths(scale)["bed"], sep="\t", header=None, names=["Chromosome", "Start", "End"]
+        )
+        self.n_items = len(self.features_df)
+
+    def time_merge(self, scale):
+        seq_toolkit.GenomicFeatures(self.features_df).merge()
+
+    def time_merge_incremental(self, scale):
+        features, batch_size = seq_toolkit.GenomicFeatures(incremental=True), max(self.n_items // 20, 1)
+        for batch_start in range(0, self.n_items, batch_size):
+            features.add(self.features_df.iloc[batch_start : batch_start + batch_size])
+            features.merged_df
+
+    def time_intersect(self, scale):
+        seq_toolkit.GenomicFeatures(self.features_df).intersect(self.features_df)
@@ -0,0 +1,62 @@
+
+# benchmark_motif.py
+
+__module_name__ = "benchmark_motif.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+# import packages #
+# --------------- #
+import os
+import seq_toolkit
+import tempfile
+
+
+# local imports #
+# ------------- #
+from fixtures import DEFAULT_SCALES, SCALES, fixture_paths
+
+
+class QueryMotif:
+
+    params = DEFAULT_SCALES
+    param_names = ["scale"]
+    items = "bases"
+
+    def setup(self, scale):
+        fasta_path = fixture_paths(scale)["fasta"]
+        chrom_length = seq_toolkit.chromosome_sizes(fasta_path)["chr1"]
+        self.sequence = seq_toolkit.fetch_region(fasta_path, "chr1", 0, chrom_length)
+        self.searcher = seq_toolkit.MotifSearcher("CANNTG")
+        self.n_items = len(self.sequence)
+
+    def time_query_motif_exact(self, scale):
+        seq_toolkit.query_motif(self.sequence, "GAATTC", verbose=False)
+
+    def time_query_motif_iupac(self, scale):
+        seq_toolkit.query_motif(self.sequence, "CANNTG", verbose=False)
+
+    def time_query_motif_mismatches(self, scale):
+        seq_toolkit.query_motif(self.sequence, "TTAGGGTTAG", verbose=False, max_mismatches=1)
+
+    def time_motif_searcher_scan(self, scale):
+        self.searcher.scan(self.sequence, as_frame=False)
+
+
+class ScanGenome:
+
+    params = DEFAULT_SCALES
+    param_names = ["scale"]
+    items = "bases"
+
+    def setup(self, scale):
+        self.fasta_path = fixture_paths(scale)["fasta"]
+        self.out_dir = tempfile.mkdtemp()
+        self.n_items = SCALES[scale]
+
+    def time_scan_genome(self, scale):
+        seq_toolkit.scan_genome(self.fasta_path, "GAATTC", os.path.join(self.out_dir, "hits.bed"), n_workers=1)
+
+    def time_count_motif_genome(self, scale):
+        seq_toolkit.count_motif_genome(self.fasta_path, "CG", window_size=1_000, n_workers=1)
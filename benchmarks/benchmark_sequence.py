@@ -0,0 +1,109 @@
+
+# benchmark_sequence.py
+
+__module_name__ = "benchmark_sequence.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+# import packages #
+# --------------- #
+import os
+import seq_toolkit
+import tempfile
+
+
+# local imports #
+# ------------- #
+from fixtures import DEFAULT_SCALES, SCALES, fixture_paths
+
+
+# the pure-Python SequenceManipulator and Seq.simulate are benchmarked on at most this many bases
+_MAX_PYTHON_BASES = 1_000_000
+
+# read pairs simulated at each scale
+_READ_PAIRS = {"kb": 10_000, "Mb": 1_000_000, "Gb": 10_000_000}
+
+
+class _ChromosomeSequence:
+
+    """Shared setup: chr1 of the synthetic genome."""
+
+    params = DEFAULT_SCALES
+    param_names = ["scale"]
+    items = "bases"
+
+    def setup(self, scale):
+        fasta_path = fixture_paths(scale)["fasta"]
+        self.sequence = seq_toolkit.fetch_region(fasta_path, "chr1", 0, seq_toolkit.chromosome_sizes(fasta_path)["chr1"])
+        self.n_items = len(self.sequence)
+
+
+class ReverseComplement(_ChromosomeSequence):
+
+    def setup(self, scale):
+        super().setup(scale)
+        self.sequence = self.sequence[:_MAX_PYTHON_BASES]
+        self.n_items = len(self.sequence)
+
+    def time_reverse_complement(self, scale):
+        seq_toolkit.SequenceManipulator(self.sequence).reverse_complement()
+
+
+class SimulateSequence:
+
+    params = DEFAULT_SCALES
+    param_names = ["scale"]
+    items = "bases"
+
+    def setup(self, scale):
+        self.n_items = min(SCALES[scale], _MAX_PYTHON_BASES)
+
+    def time_simulate(self, scale):
+        seq_toolkit.Seq().simulate(self.n_items)
+
+
+class CountKmers(_ChromosomeSequence):
+
+    def time_count_kmers_k11(self, scale):
+        seq_toolkit.count_kmers(self.sequence, 11, return_codes=True)
+
+    def time_count_kmers_k31_canonical(self, scale):
+        seq_toolkit.count_kmers(self.sequence, 31, canonical=True, return_codes=True)
+
+
+class CompositionProfile(_ChromosomeSequence):
+
+    def time_composition_profile(self, scale):
+        seq_toolkit.composition_profile(self.sequence, window_size=100, as_frame=False)
+
+
+class SimulateReads(_ChromosomeSequence):
+
+    items = "read pairs"
+
+    def setup(self, scale):
+        super().setup(scale)
+        self.n_items = _READ_PAIRS[scale]
+        self.out_dir = tempfile.TemporaryDirectory()
+        self.simulator = seq_toolkit.ReadSimulator(read_length=150, paired=True, seed=0)
+
+    def teardown(self, scale):
+        self.out_dir.cleanup()
+
+    def time_simulate_reads_fastq_gz(self, scale):
+        out_paths = [os.path.join(self.out_dir.name, "reads_{}.fq.gz".format(mate)) for mate in [1, 2]]
+        self.simulator.simulate(self.sequence, self.n_items, *out_paths)
+
+
+class InjectVariants(_ChromosomeSequence):
+
+    def setup(self, scale):
+        super().setup(scale)
+        self.variant_df = seq_toolkit.simulate_variants(self.sequence, snp_rate=1e-3, indel_rate=1e-4, seed=0)
+
+    def time_simulate_variants(self, scale):
+        seq_toolkit.simulate_variants(self.sequence, snp_rate=1e-3, indel_rate=1e-4, seed=0)
+
+    def time_inject_variants(self, scale):
+        seq_toolkit.inject_variants(self.sequence, self.variant_df)
@@ -0,0 +1,141 @@
+
+# fixtures.py
+
+__module_name__ = "fixtures.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+# import packages #
+# --------------- #
+import numpy as np
+import os
+
+
+# total genome size at each scale; "Gb" is only generated when requested
+SCALES = {"kb": 50_000, "Mb": 10_000_000, "Gb": 1_000_000_000}
+DEFAULT_SCALES = ["kb", "Mb"]
+_CHROMOSOME_FRACTIONS = {"chr1": 0.5, "chr2": 0.3, "chr3": 0.2}
+_LINE_WIDTH = 60
+_BLOCK_SIZE = 2 ** 20 * _LINE_WIDTH
+_SEED = 0
+
+
+def benchmark_data_dir():
+
+    """Fixture cache: $SEQ_TOOLKIT_BENCHMARK_DATA or ~/.cache/seq_toolkit_benchmarks"""
+
+    return os.environ.get(
+        "SEQ_TOOLKIT_BENCHMARK_DATA", os.path.join(os.path.expanduser("~"), ".cache", "seq_toolkit_benchmarks")
+    )
+
+
+def chromosome_sizes(scale):
+
+    """{chromosome: length} of the synthetic genome at `scale`."""
+
+    return {chrom: int(SCALES[scale] * fraction) for chrom, fraction in _CHROMOSOME_FRACTIONS.items()}
+
+
+def write_fasta(fasta_path, chrom_sizes, seed=_SEED):
+
+    """
+    Write a random genome, streaming one block of lines at a time.
+
+    Each chromosome carries a run of 1,000 Ns (an assembly gap) at 10% of its length.
+    """
+
+    rng = np.random.default_rng(seed)
+    alphabet = np.frombuffer(b"ACGT", dtype=np.uint8)
+    with open(fasta_path, "wb") as fasta:
+        for chrom, chrom_length in chrom_sizes.items():
+            fasta.write(">{}\n".format(chrom).encode())
+            gap_start = chrom_length // 10
+            for block_start in range(0, chrom_length, _BLOCK_SIZE):
+                block_length = min(_BLOCK_SIZE, chrom_length - block_start)
+                block = alphabet[rng.integers(0, 4, block_length)]
+                gap = slice(max(gap_start - block_start, 0), max(gap_start + 1000 - block_start, 0))
+                block[gap] = ord("N")
+                n_full_lines = block_length // _LINE_WIDTH
+                lines = np.full((n_full_lines, _LINE_WIDTH + 1), ord("\n"), dtype=np.uint8)
+                lines[:, :_LINE_WIDTH] = block[: n_full_lines * _LINE_WIDTH].reshape(-1, _LINE_WIDTH)
+                fasta.write(lines.tobytes())
+                if block_length % _LINE_WIDTH:
+                    fasta.write(block[n_full_lines * _LINE_WIDTH :].tobytes() + b"\n")
+
+
+def write_gtf(gtf_path, chrom_sizes, gene_spacing=20_000, seed=_SEED):
+
+    """Write one multi-exon gene (gene, transcript and exon records) every ~`gene_spacing` bases."""
+
+    rng = np.random.default_rng(seed)
+    attributes = 'gene_id "{0}"; transcript_id "{0}.1"; gene_type "protein_coding"; gene_name "{1}";'
+    gene_idx = 0
+    with open(gtf_path, "w") as gtf:
+        for chrom, chrom_length in chrom_sizes.items():
+            n_genes = max(chrom_length // gene_spacing, 1)
+            gene_lengths = rng.integers(1_000, min(15_000, chrom_length // 2), n_genes)
+            gene_starts = np.sort(rng.integers(1, chrom_length - gene_lengths.max(), n_genes))
+            strands = rng.choice(["+", "-"], n_genes)
+            Lines = []
+            for gene_start, gene_length, strand in zip(gene_starts, gene_lengths, strands):
+                gene_idx += 1
+                gene_end = gene_start + gene_length - 1
+                gene_attributes = attributes.format("G{:07d}".format(gene_idx), "GENE{}".format(gene_idx))
+                record = "{}\tsynthetic\t{}\t{}\t{}\t.\t{}\t.\t{}"
+                Lines.append(record.format(chrom, "gene", gene_start, gene_end, strand, gene_attributes))
+                Lines.append(record.format(chrom, "transcript", gene_start, gene_end, strand, gene_attributes))
+                n_exons = rng.integers(2, 11)
+                boundaries = np.sort(rng.choice(np.arange(gene_start + 1, gene_end), 2 * n_exons - 2, replace=False))
+                exon_starts = np.concatenate([[gene_start], boundaries[1::2]])
+                exon_ends = np.concatenate([boundaries[0::2], [gene_end]])
+                for exon_number, (exon_start, exon_end) in enumerate(zip(exon_starts, exon_ends), start=1):
+                    exon_attributes = gene_attributes + ' exon_number "{}";'.format(exon_number)
+                    Lines.append(record.format(chrom, "exon", exon_start, exon_end, strand, exon_attributes))
+            gtf.write("\n".join(Lines) + "\n")
+
+
+def write_bed(bed_path, chrom_sizes, interval_spacing=200, seed=_SEED):
+
+    """Write unsorted, partly overlapping BED3 intervals, one every ~`interval_spacing` bases."""
+
+    rng = np.random.default_rng(seed)
+    with open(bed_path, "w") as bed:
+        for chrom, chrom_length in chrom_sizes.items():
+            n_intervals = max(chrom_length // interval_spacing, 1)
+            starts = rng.integers(0, chrom_length - 1_000, n_intervals)
+            ends = starts + rng.integers(50, 1_000, n_intervals)
+            rows = np.char.add(np.char.add(chrom + "\t", starts.astype(str)), np.char.add("\t", ends.astype(str)))
+            bed.write("\n".join(rows) + "\n")
+
+
+def fixture_paths(scale):
+
+    """
+    Paths to the synthetic reference at `scale`, generated on first use and cached.
+
+    Returns:
+    --------
+    FixturePaths
+        {"reference_dir", "fasta", "gtf", "bed"}; the reference directory follows the
+        layout expected by `parse_reference` (fasta/genome.fa, genes/genes.gtf).
+        type: dict
+    """
+
+    reference_dir = os.path.join(benchmark_data_dir(), scale)
+    FixturePaths = {
+        "reference_dir": reference_dir,
+        "fasta": os.path.join(reference_dir, "fasta", "genome.fa"),
+        "gtf": os.path.join(reference_dir, "genes", "genes.gtf"),
+        "bed": os.path.join(reference_dir, "features.bed"),
+    }
+
+    chrom_sizes = chromosome_sizes(scale)
+    for key, write in [("fasta", write_fasta), ("gtf", write_gtf), ("bed", write_bed)]:
+        if not os.path.exists(FixturePaths[key]):
+            os.makedirs(os.path.dirname(FixturePaths[key]), exist_ok=True)
+            tmp_path = FixturePaths[key] + ".tmp"
+            write(tmp_path, chrom_sizes)
+            os.replace(tmp_path, FixturePaths[key])
+
+    return FixturePaths
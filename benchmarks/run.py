@@ -0,0 +1,301 @@
+
+# run.py
+
+__module_name__ = "run.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+"""
+Run the seq-toolkit benchmark suite, or compare it between two commits.
+
+    python benchmarks/run.py run [--scales kb Mb] [--bench PATTERN] [--output results.json]
+    python benchmarks/run.py compare BASE HEAD [--threshold 0.1] [--scales kb Mb]
+
+Benchmarks are asv-style classes in benchmarks/benchmark_*.py: `setup(scale)` prepares
+inputs (not timed) and sets `n_items`; each `time_*` method is one benchmark.
+"""
+
+
+# import packages #
+# --------------- #
+import argparse
+import ast
+import contextlib
+import fnmatch
+import glob
+import importlib
+import io
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+
+# local imports #
+# ------------- #
+from fixtures import DEFAULT_SCALES, SCALES, fixture_paths
+
+
+_BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+_REPO_ROOT = os.path.dirname(_BENCHMARK_DIR)
+_DEFAULT_REPEAT = 3
+_DEFAULT_THRESHOLD = 0.1
+_DEFAULT_TIMEOUT = 1800
+_MIN_SAMPLE_TIME = 0.05
+_MAX_NUMBER = 1000
+
+
+def _discover_benchmarks(pattern="*"):
+
+    """
+    ["module.Class.time_method", ...] for every benchmark matching the glob `pattern`.
+
+    Modules are parsed rather than imported, so that `seq_toolkit` is only ever imported
+    by the benchmark processes (from the tree being benchmarked).
+    """
+
+    benchmark_ids = []
+    for module_path in sorted(glob.glob(os.path.join(_BENCHMARK_DIR, "benchmark_*.py"))):
+        module_name = os.path.splitext(os.path.basename(module_path))[0]
+        with open(module_path) as module_file:
+            module_tree = ast.parse(module_file.read())
+        for node in module_tree.body:
+            if not isinstance(node, ast.ClassDef) or node.name.startswith("_"):
+                continue
+            for method in node.body:
+                if isinstance(method, ast.FunctionDef) and method.name.startswith("time_"):
+                    benchmark_id = "{}.{}.{}".format(module_name, node.name, method.name)
+                    if fnmatch.fnmatch(benchmark_id, pattern):
+                        benchmark_ids.append(benchmark_id)
+
+    return benchmark_ids
+
+
+def _peak_rss_mb():
+
+    """Peak resident set size of this process (ru_maxrss is in kB on Linux, bytes on macOS)."""
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return max_rss / 2 ** 20
+
+    return max_rss / 2 ** 10
+
+
+def _run_single(benchmark_id, scale, repeat):
+
+    """
+    Run one benchmark in this (fresh) process.
+
+    Returns:
+    --------
+    Result
+        {"time": best wall time (s), "peak_rss_mb", "throughput", "unit"}, or
+        {"skipped": reason} / {"error": message}.
+        type: dict
+    """
+
+    module_name, class_name, method_name = benchmark_id.split(".")
+    cls = getattr(importlib.import_module(module_name), class_name)
+    benchmark = cls()
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            if hasattr(benchmark, "setup"):
+                benchmark.setup(scale)
+            method = getattr(benchmark, method_name)
+            start = time.perf_counter()
+            method(scale)
+            first_time = time.perf_counter() - start
+            # as in timeit.autorange: fast benchmarks are timed over several calls per sample
+            number = min(max(int(_MIN_SAMPLE_TIME / max(first_time, 1e-9)), 1), _MAX_NUMBER)
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                for _ in range(number):
+                    method(scale)
+                timings.append((time.perf_counter() - start) / number)
+    except NotImplementedError as error:
+        return {"skipped": str(error)}
+    except Exception as error:
+        return {"error": "{}: {}".format(type(error).__name__, error)}
+
+    best_time = min(timings)
+    n_items = getattr(benchmark, "n_items", None)
+
+    return {
+        "time": best_time,
+        "peak_rss_mb": _peak_rss_mb(),
+        "throughput": n_items / best_time if n_items else None,
+        "unit": "{}/s".format(getattr(cls, "items", "items")),
+    }
+
+
+def _run_suite(scales, pattern, repeat, timeout, python=sys.executable, env=None):
+
+    """Run each benchmark at each scale in its own interpreter, so peak RSS is per benchmark."""
+
+    for scale in scales:
+        fixture_paths(scale)
+
+    if env is None:
+        env = dict(os.environ, PYTHONPATH=_REPO_ROOT)
+
+    Results = {}
+    for benchmark_id in _discover_benchmarks(pattern):
+        for scale in scales:
+            key = "{}[{}]".format(benchmark_id, scale)
+            command = [python, os.path.abspath(__file__), "_single", benchmark_id, scale, str(repeat)]
+            try:
+                process = subprocess.run(command, capture_output=True, text=True, timeout=timeout, env=env)
+                if process.returncode == 0:
+                    Results[key] = json.loads(process.stdout.strip().splitlines()[-1])
+                else:
+                    Results[key] = {"error": process.stderr.strip().splitlines()[-1]}
+            except subprocess.TimeoutExpired:
+                Results[key] = {"error": "timed out after {} s".format(timeout)}
+            print(_format_result(key, Results[key]), flush=True)
+
+    return Results
+
+
+def _format_result(key, Result):
+
+    """"""
+
+    if not "time" in Result:
+        return "{:<75} {}".format(key, Result.get("error", Result.get("skipped")))
+
+    throughput = "{:>12.3g} {}".format(Result["throughput"], Result["unit"]) if Result["throughput"] else ""
+
+    return "{:<75} {:>10.4f} s {:>9.1f} MB {}".format(key, Result["time"], Result["peak_rss_mb"], throughput)
+
+
+def _git(*args):
+
+    """"""
+
+    return subprocess.run(
+        ["git", "-C", _REPO_ROOT] + list(args), capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+
+def _run_at_commit(commit, scales, pattern, repeat, timeout):
+
+    """Check `commit` out into a temporary worktree and run the current suite against it."""
+
+    worktree = tempfile.mkdtemp(prefix="seq_toolkit_benchmark_")
+    _git("worktree", "add", "--detach", worktree, commit)
+    try:
+        env = dict(os.environ, PYTHONPATH=worktree)
+        print("\nBenchmarking {} ({})".format(commit, _git("rev-parse", "--short", commit)), flush=True)
+        return _run_suite(scales, pattern, repeat, timeout, env=env)
+    finally:
+        _git("worktree", "remove", "--force", worktree)
+        shutil.rmtree(worktree, ignore_errors=True)
+
+
+def _load_or_run(reference, scales, pattern, repeat, timeout):
+
+    """`reference` is either a results file written by `run --output` or a git commit."""
+
+    if os.path.isfile(reference):
+        with open(reference) as results_file:
+            return json.load(results_file)["results"]
+
+    return _run_at_commit(reference, scales, pattern, repeat, timeout)
+
+
+def _compare_results(BaseResults, HeadResults, threshold):
+
+    """
+    Print a comparison table and return the benchmarks whose wall time or peak RSS grew by more than `threshold`.
+    """
+
+    regressions = []
+    print("\n{:<75} {:>10} {:>10} {:>7} {:>10} {:>10} {:>7}".format(
+        "benchmark", "base (s)", "head (s)", "ratio", "base (MB)", "head (MB)", "ratio"
+    ))
+    for key in sorted(set(BaseResults) & set(HeadResults)):
+        base, head = BaseResults[key], HeadResults[key]
+        if not ("time" in base and "time" in head):
+            continue
+        time_ratio = head["time"] / base["time"]
+        rss_ratio = head["peak_rss_mb"] / base["peak_rss_mb"]
+        flags = [name for name, ratio in [("time", time_ratio), ("rss", rss_ratio)] if ratio > 1 + threshold]
+        if flags:
+            regressions.append((key, flags))
+        print("{:<75} {:>10.4f} {:>10.4f} {:>7.2f} {:>10.1f} {:>10.1f} {:>7.2f} {}".format(
+            key, base["time"], head["time"], time_ratio,
+            base["peak_rss_mb"], head["peak_rss_mb"], rss_ratio,
+            "REGRESSION ({})".format(", ".join(flags)) if flags else "",
+        ))
+
+    return regressions
+
+
+def _parse_args(argv):
+
+    """"""
+
+    parser = argparse.ArgumentParser(description="seq-toolkit benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def _add_suite_args(subparser):
+        subparser.add_argument("--scales", nargs="+", default=DEFAULT_SCALES, choices=list(SCALES))
+        subparser.add_argument("--bench", default="*", help="glob over module.Class.time_method")
+        subparser.add_argument("--repeat", type=int, default=_DEFAULT_REPEAT)
+        subparser.add_argument("--timeout", type=int, default=_DEFAULT_TIMEOUT, help="seconds per benchmark")
+
+    run_parser = subparsers.add_parser("run", help="run the suite on the working tree")
+    _add_suite_args(run_parser)
+    run_parser.add_argument("--output", help="write results to this JSON file")
+
+    compare_parser = subparsers.add_parser("compare", help="compare two commits (or saved results)")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("head")
+    _add_suite_args(compare_parser)
+    compare_parser.add_argument(
+        "--threshold", type=float, default=_DEFAULT_THRESHOLD, help="flag slowdowns above this fraction"
+    )
+
+    single_parser = subparsers.add_parser("_single")
+    single_parser.add_argument("benchmark_id")
+    single_parser.add_argument("scale")
+    single_parser.add_argument("repeat", type=int)
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+
+    """"""
+
+    args = _parse_args(argv)
+
+    if args.command == "_single":
+        print(json.dumps(_run_single(args.benchmark_id, args.scale, args.repeat)))
+        return 0
+
+    if args.command == "run":
+        Results = _run_suite(args.scales, args.bench, args.repeat, args.timeout)
+        if args.output:
+            with open(args.output, "w") as results_file:
+                json.dump({"commit": _git("rev-parse", "HEAD"), "results": Results}, results_file, indent=1)
+        return 0
+
+    BaseResults = _load_or_run(args.base, args.scales, args.bench, args.repeat, args.timeout)
+    HeadResults = _load_or_run(args.head, args.scales, args.bench, args.repeat, args.timeout)
+    regressions = _compare_results(BaseResults, HeadResults, args.threshold)
+    print("\n{} regression(s) above {:.0%}".format(len(regressions), args.threshold))
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,16 +5,69 @@ __author__ = ", ".join(["Michael E. Vinyard"])
 __email__ = ", ".join(["vinyard@g.harvard.edu",])
 
 
-from ._gene_functions._GeneGenerator import _GeneGenerator as Gene
+# import packages #
+# --------------- #
+import importlib
 
-from ._motif_functions._query_motif_in_sequence import _query_motif_bistrand as query_motif
-from ._motif_functions._isolate_constraining_sequence_motif import _isolate_constraining_sequence_motif as isolate_searchable_motif
 
-from ._sequence_functions._SequenceManipulation import _SequenceManipulation as SequenceManipulator
-from ._sequence_functions._SequenceGenerator import _SequenceGenerator as Seq
+# public name: (module, attribute). Modules are imported on first access (PEP 562), so that
+# e.g. `seq_toolkit.SequenceManipulator` or the command-line interface does not pay for
+# importing pandas, pyranges, gtfparse or Biopython.
+_PUBLIC_API = {
+    "Gene": ("._gene_functions._GeneGenerator", "_GeneGenerator"),
+    "plot_gene_tracks": ("._gene_functions._plot_gene", "_plot_gene_tracks"),
 
-from ._genome_functions._fetch_chromosome import _fetch_chromosome_sequence as fetch_chromosome
-# from ._genome_functions._merge_reduce_features import _GenomicFeatures as GenomicFeatures
-from ._genome_functions._parse_reference import _parse_reference as parse_reference
+    "query_motif": ("._motif_functions._query_motif_in_sequence", "_query_motif_bistrand"),
+    "MotifSearcher": ("._motif_functions._MotifSearcher", "_MotifSearcher"),
+    "scan_genome": ("._motif_functions._scan_genome_for_motif", "_scan_genome_for_motif"),
+    "count_motif": ("._motif_functions._count_motif", "_count_motif"),
+    "count_motif_genome": ("._motif_functions._count_motif", "_count_motif_genome"),
+    "find_crispr_guides": ("._motif_functions._find_crispr_guides", "_find_crispr_guides"),
+    "FMIndex": ("._motif_functions._FMIndex", "_FMIndex"),
+    "scan_pwm": ("._motif_functions._pwm_scan", "_scan_pwm"),
+    "read_jaspar": ("._motif_functions._pwm_scan", "_read_jaspar"),
+    "isolate_searchable_motif": (
+        "._motif_functions._isolate_constraining_sequence_motif", "_isolate_constraining_sequence_motif"
+    ),
 
-from ._genome_functions._GenomicFeatures import _GenomicFeatures as GenomicFeatures
\ No newline at end of file
+    "SequenceManipulator": ("._sequence_functions._SequenceManipulation", "_SequenceManipulation"),
+    "Seq": ("._sequence_functions._SequenceGenerator", "_SequenceGenerator"),
+    "ReadSimulator": ("._sequence_functions._ReadSimulator", "_ReadSimulator"),
+    "simulate_variants": ("._sequence_functions._inject_variants", "_simulate_variants"),
+    "inject_variants": ("._sequence_functions._inject_variants", "_inject_variants"),
+    "write_vcf": ("._sequence_functions._inject_variants", "_write_vcf"),
+    "count_kmers": ("._sequence_functions._count_kmers", "_count_kmers"),
+    "composition_profile": ("._sequence_functions._composition_profile", "_composition_profile"),
+    "composition_profile_genome": ("._sequence_functions._composition_profile", "_composition_profile_genome"),
+
+    "fetch_chromosome": ("._genome_functions._fetch_chromosome", "_fetch_chromosome_sequence"),
+    "fetch_region": ("._genome_functions._fasta_index", "_fetch_sequence_region"),
+    "chromosome_sizes": ("._genome_functions._fetch_chromosome_sizes", "_fetch_chromosome_sizes"),
+    "parse_reference": ("._genome_functions._parse_reference", "_parse_reference"),
+    "GenomicFeatures": ("._genome_functions._GenomicFeatures", "_GenomicFeatures"),
+    "SequenceStore": ("._genome_functions._SequenceStore", "_SequenceStore"),
+    "extract_features": ("._genome_functions._extract_features", "_extract_features"),
+    "extract_transcripts": ("._genome_functions._extract_features", "_extract_transcripts"),
+
+    "Profiler": ("._utility_functions._instrumentation", "_Profiler"),
+}
+
+__all__ = list(_PUBLIC_API)
+
+
+def __getattr__(name):
+
+    """Import the module behind a public name on first access, then cache it here."""
+
+    if not name in _PUBLIC_API:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+    module_name, attribute = _PUBLIC_API[name]
+    value = getattr(importlib.import_module(module_name, __name__), attribute)
+    globals()[name] = value
+
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
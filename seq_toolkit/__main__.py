@@ -0,0 +1,14 @@
+# __main__.py
+
+__module_name__ = "__main__.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+import sys
+
+from ._cli_functions._cli import main
+
+
+if __name__ == "__main__":
+    sys.exit(main())
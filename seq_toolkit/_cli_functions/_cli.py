@@ -0,0 +1,338 @@
+
+# _cli.py
+
+__module_name__ = "_cli.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+"""
+seq-toolkit command-line interface.
+
+    seq-toolkit revcomp    [INPUT] [-o OUTPUT]                   FASTA (or one sequence per line) -> FASTA
+    seq-toolkit motif-scan MOTIF [INPUT] [-o OUTPUT] [--threads]  FASTA -> BED6
+    seq-toolkit merge      [INPUT] [-o OUTPUT]                   sorted BED -> merged BED3
+    seq-toolkit fetch      REFERENCE [REGION ...] [--bed BED]     regions of an indexed FASTA -> FASTA
+    seq-toolkit simulate   N_BASES [-n N_RECORDS] [--seed]        -> FASTA
+
+INPUT and OUTPUT default to stdin / stdout ("-"); files ending in .gz are (de)compressed.
+Each subcommand imports only what it uses, so e.g. `revcomp` never imports pandas.
+"""
+
+
+# import packages #
+# --------------- #
+import argparse
+import contextlib
+import gzip
+import os
+import sys
+
+
+_LINE_WIDTH = 60
+_DEFAULT_CHUNK_SIZE = 10_000_000
+_DEFAULT_MERGE_CHUNK_ROWS = 1_000_000
+_FETCH_BLOCK_LINES = 2 ** 16
+_BED_HEADER_PREFIXES = (b"#", b"track", b"browser")
+
+
+def _open_stream(path, mode):
+
+    """
+    Open `path` for reading ("rb") or writing ("wb", "w"); None or "-" is stdin / stdout.
+
+    Returns:
+    --------
+    stream
+        A context manager; stdin / stdout are not closed on exit.
+    """
+
+    if path in [None, "-"]:
+        stream = sys.stdin if "r" in mode else sys.stdout
+        return contextlib.nullcontext(stream.buffer if "b" in mode else stream)
+
+    if path.endswith(".gz"):
+        return gzip.open(path, mode if "b" in mode else mode + "t")
+
+    return open(path, mode)
+
+
+def _parse_region(region):
+
+    """
+    "chr1" or "chr1:1,001-2,000" (1-based, inclusive, as in samtools faidx) -> (chromosome, start, end),
+    0-based, half-open; end is None for a whole chromosome.
+    """
+
+    chromosome, _, span = region.rpartition(":")
+    if not chromosome or not "-" in span:
+        return region, 0, None
+
+    start, _, end = span.replace(",", "").partition("-")
+    if not (start.isdigit() and end.isdigit()) or int(start) < 1 or int(end) < int(start):
+        raise ValueError("Regions must be formatted as chrom or chrom:start-end. Got: {}".format(region))
+
+    return chromosome, int(start) - 1, int(end)
+
+
+def _run_revcomp(args):
+
+    """Reverse complement each FASTA record (or each line of raw sequence)."""
+
+    from .._sequence_functions._SequenceManipulation import _reverse_complement_bytes
+    from .._genome_functions._fasta_stream import _iterate_fasta_records, _write_fasta_record
+
+    with _open_stream(args.input, "rb") as in_file, _open_stream(args.output, "wb") as out_file:
+        if in_file.peek(1)[:1] == b">":
+            for header, sequence in _iterate_fasta_records(in_file):
+                _write_fasta_record(out_file, header, _reverse_complement_bytes(sequence), args.line_width)
+        else:
+            for line in in_file:
+                out_file.write(_reverse_complement_bytes(line.rstrip(b"\r\n")) + b"\n")
+
+
+def _run_motif_scan(args):
+
+    """Scan each FASTA record for a motif on both strands, window by window; write BED6."""
+
+    from .._motif_functions._MotifSearcher import _MotifSearcher
+    from .._motif_functions._scan_genome_for_motif import _scan_window, _map_genome_chunks, _chunk_overlap
+    from .._genome_functions._fasta_stream import _iterate_fasta_windows
+    from .._genome_functions._FeatureWriter import _FeatureWriter
+
+    overlap = _chunk_overlap(_MotifSearcher(args.motif))
+    motif_name = args.name or args.motif
+    collapse_palindromes = not args.keep_palindromes
+
+    with _open_stream(args.input, "rb") as in_file:
+        windows = _iterate_fasta_windows(in_file, args.chunk_size, overlap)
+        # full windows own the hits starting in their first chunk_size bases; the last
+        # (shorter) window of a record owns all of its hits
+        chunk_args = (
+            (
+                window_seq.decode("ascii"),
+                chromosome,
+                window_start,
+                args.motif,
+                True,
+                motif_name,
+                collapse_palindromes,
+                args.chunk_size if len(window_seq) == args.chunk_size + overlap else len(window_seq),
+            )
+            for chromosome, window_start, window_seq in windows
+        )
+        out_path = sys.stdout if args.output in [None, "-"] else args.output
+        with _FeatureWriter(out_path) as writer:
+            for hits_df in _map_genome_chunks(_scan_window, chunk_args, args.threads):
+                writer.write(hits_df)
+
+
+class _BedFeatureLines:
+
+    """
+    Read-only, file-like view of a BED stream without its header (track, browser, #) lines,
+    for `pandas.read_csv`.
+
+    Notes:
+    ------
+    (1) The stream is read in blocks of whole lines; only blocks containing a header line
+        (found with a byte search) are filtered line by line.
+    """
+
+    def __init__(self, stream):
+
+        self.stream = stream
+
+    def read(self, size=-1):
+
+        while True:
+            block = self.stream.read(size if size and size > 0 else -1)
+            if not block:
+                return block
+            if not block.endswith(b"\n"):
+                block += self.stream.readline()
+            if block.startswith(_BED_HEADER_PREFIXES) or any(
+                b"\n" + prefix in block for prefix in _BED_HEADER_PREFIXES
+            ):
+                block = b"".join(
+                    line for line in block.splitlines(keepends=True) if not line.startswith(_BED_HEADER_PREFIXES)
+                )
+            if block:
+                return block
+
+    def __iter__(self):
+        return iter(self.read, b"")
+
+
+def _run_merge(args):
+
+    """Merge overlapping and book-ended features of a BED stream sorted by chromosome, then start."""
+
+    import numpy as np
+    import pandas as pd
+
+    from .._genome_functions._interval_operations import _merge_sorted_feature_chunks
+    from .._genome_functions._FeatureWriter import _FeatureWriter
+
+    with _open_stream(args.input, "rb") as in_file:
+        if not in_file.peek(1):
+            return
+        chunks = pd.read_csv(
+            _BedFeatureLines(in_file),
+            sep="\t",
+            header=None,
+            usecols=[0, 1, 2],
+            names=["Chromosome", "Start", "End"],
+            dtype={"Chromosome": str, "Start": np.int64, "End": np.int64},
+            chunksize=args.chunk_size,
+        )
+        out_path = sys.stdout if args.output in [None, "-"] else args.output
+        with _FeatureWriter(out_path, "bed") as writer:
+            for merged_df in _merge_sorted_feature_chunks(chunks):
+                writer.write(merged_df)
+
+
+def _iterate_bed_regions(bed_path):
+
+    """(chromosome, start, end) from the first three columns of a BED file or stream."""
+
+    with _open_stream(bed_path, "rb") as bed:
+        for line in bed:
+            fields = line.decode().split()
+            if fields and not line.lstrip().startswith(_BED_HEADER_PREFIXES):
+                yield fields[0], int(fields[1]), int(fields[2])
+
+
+def _run_fetch(args):
+
+    """Write regions of an indexed reference as FASTA, reading each region in blocks."""
+
+    from .._genome_functions._fasta_index import _load_fasta_index, _fetch_region
+    from .._genome_functions._fasta_stream import _write_fasta_lines
+
+    if not args.regions and args.bed is None:
+        raise ValueError("Pass one or more regions, or --bed.")
+
+    FastaIndex = _load_fasta_index(args.reference)
+    regions = [_parse_region(region) for region in args.regions]
+    if args.bed is not None:
+        regions = _iterate_bed_regions(args.bed) if not regions else regions + list(_iterate_bed_regions(args.bed))
+
+    block_size = (args.line_width or _LINE_WIDTH) * _FETCH_BLOCK_LINES
+    with open(args.reference, "rb") as fasta, _open_stream(args.output, "wb") as out_file:
+        for chromosome, start, end in regions:
+            if not chromosome in FastaIndex:
+                raise ValueError("Chromosome not found in {}. Got: {}".format(args.reference, chromosome))
+            record = FastaIndex[chromosome]
+            end = record.length if end is None else min(end, record.length)
+            header = chromosome if (start, end) == (0, record.length) else "{}:{}-{}".format(chromosome, start + 1, end)
+            out_file.write(">{}\n".format(header).encode())
+            if not args.line_width:
+                _write_fasta_lines(out_file, _fetch_region(fasta, record, start, end).encode(), 0)
+                continue
+            for block_start in range(start, end, block_size):
+                block = _fetch_region(fasta, record, block_start, min(block_start + block_size, end))
+                _write_fasta_lines(out_file, block.encode(), args.line_width)
+
+
+def _run_simulate(args):
+
+    """Write random sequence records, generated one block at a time."""
+
+    import numpy as np
+
+    from .._sequence_functions._SequenceGenerator import _set_weight_simplex
+    from .._genome_functions._fasta_stream import _write_fasta_lines
+
+    rng = np.random.default_rng(args.seed)
+    weights = _set_weight_simplex(*args.weights)
+    bases = np.frombuffer(b"ACGT", dtype=np.uint8)
+    block_size = (args.line_width or _LINE_WIDTH) * _FETCH_BLOCK_LINES
+
+    with _open_stream(args.output, "wb") as out_file:
+        for record_idx in range(args.n_records):
+            out_file.write(">{}{}\n".format(args.prefix, record_idx + 1).encode())
+            if not args.line_width:
+                _write_fasta_lines(out_file, bases[rng.choice(4, args.n_bases, p=weights)].tobytes(), 0)
+                continue
+            for block_start in range(0, args.n_bases, block_size):
+                n_block_bases = min(block_size, args.n_bases - block_start)
+                _write_fasta_lines(out_file, bases[rng.choice(4, n_block_bases, p=weights)].tobytes(), args.line_width)
+
+
+def _build_parser():
+
+    """"""
+
+    parser = argparse.ArgumentParser(
+        prog="seq-toolkit", description="Streaming sequence tools. Inputs and outputs default to stdin / stdout."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def _add_io_args(subparser, input_help):
+        subparser.add_argument("input", nargs="?", default="-", help=input_help + " (default: stdin)")
+        subparser.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+
+    revcomp = subparsers.add_parser("revcomp", help="reverse complement sequences")
+    _add_io_args(revcomp, "FASTA, or one sequence per line")
+    revcomp.add_argument("--line-width", type=int, default=_LINE_WIDTH, help="0: do not wrap")
+    revcomp.set_defaults(run=_run_revcomp)
+
+    motif_scan = subparsers.add_parser("motif-scan", help="find a motif on both strands; write BED6")
+    motif_scan.add_argument("motif", help="IUPAC codes are supported; flanking Ns are trimmed")
+    _add_io_args(motif_scan, "FASTA")
+    motif_scan.add_argument("--name", help="BED name column (default: the motif)")
+    motif_scan.add_argument("--chunk-size", type=int, default=_DEFAULT_CHUNK_SIZE, help="bases scanned per task")
+    motif_scan.add_argument("--threads", type=int, default=1, help="worker processes")
+    motif_scan.add_argument(
+        "--keep-palindromes", action="store_true", help="report palindromic sites on both strands"
+    )
+    motif_scan.set_defaults(run=_run_motif_scan)
+
+    merge = subparsers.add_parser("merge", help="merge overlapping features of a sorted BED file")
+    _add_io_args(merge, "BED, sorted with sort -k1,1 -k2,2n")
+    merge.add_argument("--chunk-size", type=int, default=_DEFAULT_MERGE_CHUNK_ROWS, help="rows read at once")
+    merge.set_defaults(run=_run_merge)
+
+    fetch = subparsers.add_parser("fetch", help="extract regions of a FASTA reference")
+    fetch.add_argument("reference", help="FASTA file; REFERENCE.fai is used if present")
+    fetch.add_argument("regions", nargs="*", help="chrom or chrom:start-end (1-based, inclusive)")
+    fetch.add_argument("-b", "--bed", help="BED file of regions ('-': stdin)")
+    fetch.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    fetch.add_argument("--line-width", type=int, default=_LINE_WIDTH, help="0: do not wrap")
+    fetch.set_defaults(run=_run_fetch)
+
+    simulate = subparsers.add_parser("simulate", help="simulate random sequences")
+    simulate.add_argument("n_bases", type=int, help="bases per record")
+    simulate.add_argument("-n", "--n-records", type=int, default=1)
+    simulate.add_argument("--prefix", default="seq", help="record names: PREFIX1, PREFIX2, ...")
+    simulate.add_argument(
+        "--weights", type=float, nargs=4, default=[1, 1, 1, 1], metavar=("A", "C", "G", "T"),
+        help="relative base frequencies",
+    )
+    simulate.add_argument("--seed", type=int)
+    simulate.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    simulate.add_argument("--line-width", type=int, default=_LINE_WIDTH, help="0: do not wrap")
+    simulate.set_defaults(run=_run_simulate)
+
+    return parser
+
+
+def main(argv=None):
+
+    """Console entry point: `seq-toolkit`."""
+
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        args.run(args)
+    except ValueError as error:
+        parser.exit(2, "seq-toolkit {}: error: {}\n".format(args.command, error))
+    except BrokenPipeError:
+        # downstream closed the pipe (e.g. `| head`): silence the flush at exit
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 1
+
+    return 0
@@ -8,16 +8,17 @@ __email__ = ", ".join(["vinyard@g.harvard.edu",])
 
 # package imports #
 # --------------- #
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-import vinplots
 
 
 # local imports #
 # ------------- #
 from .._sequence_functions._SequenceGenerator import _SequenceGenerator
 from ._construct_gene import _construct_gene
+from ._plot_gene import _plot_gene
+from .._genome_functions._extract_features import _extract_features
+from .._utility_functions._instrumentation import _instrumented
 
 
 def _define_gene_exons(gene_length, n_exons=15, min_exon_length=50, max_exon_length=2500):
@@ -62,90 +63,6 @@ def _define_gene_exons(gene_length, n_exons=15, min_exon_length=50, max_exon_len
 
     return exon_df
 
-def _construct_gene_plot(n_bases, n_ticks):
-    
-    """
-    Create the framework for the gene figure. 
-    
-    Parameters:
-    -----------
-    n_bases
-        Length of the gene being plotted. 
-    
-    n_ticks
-        Number of ticks along the x-axis. 
-        type: int
-        
-    Returns:
-    --------
-    fig, ax
-    """
-
-    fig = vinplots.Plot()
-    fig.construct(nplots=1, ncols=1, figsize_width=2.5)
-    fig.modify_spines(ax="all", spines_to_delete=['top', 'right', 'left'])
-    ax = fig.AxesDict[0][0]
-    xt = ax.set_xticks(np.linspace(0, n_bases, n_ticks))
-    yt = ax.set_yticks([])
-    
-    return fig, ax
-
-def _plot_gene(n_bases, gene_df, color="navy", n_ticks=11, save=False):
-    
-    """
-    Plot a simulated gene. 
-
-    Parameters:
-    -----------
-    n_bases
-        Length of plotted gene.
-        
-    gene_df
-        pandas DataFrame with columns: ['Start', 'End'] denoting the boundaries of the gene UTRs, introns, and exons.
-        type: pandas.DataFrame
-        
-    color
-        type: str
-        default: "navy"
-        
-    n_ticks
-        Number of ticks along the gene plot's x-axis.
-        type: int
-        default: 11
-        
-    save
-        If not False, pass a string, which will trigger the object to save with figname=`save`.
-        type: bool or str
-        default: False
-        
-    Returns:
-    --------
-    None, prints (and/or saves) plot.
-
-    Notes:
-    ------
-    (1) requires prior running of `Gene.create()`
-    (2) 500 is conveniently/arbitrarily chosen as a scalar for offsetting the text-labels of exon spans. 
-        May not suit all use-cases and could be updated in the future if needed. 
-    """    
-    
-    fig, ax = _construct_gene_plot(n_bases, n_ticks)
-    plt.ylim(.95, 1.1)
-    
-    plt.hlines(1, gene_df.Start.min(), gene_df.End.max(), color=color, zorder=2)
-    text_offset = (gene_df.End.max() - gene_df.Start.min()) / 500
-    
-    exon_df = gene_df.loc[gene_df.Feature == "exon"]
-    
-    for i, exon in exon_df.iterrows():
-        plt.vlines(exon.Start, 0.95, 1.025, color="lightgrey", linestyle="--", lw=1)
-        plt.vlines(exon.End, 0.95, 1.025, color="lightgrey", linestyle="--", lw=1)
-        plt.text(x=exon.Start + text_offset, y=1.03, s="{}-{}".format(exon.Start, exon.End), rotation=25)
-        plt.hlines(1, exon.Start, exon.End, color=color, lw=15, zorder=2)
-    
-    if save:
-        fig.savefig(save)
-
 class _GeneGenerator:
     
     def __init__(self, A=1, C=1, G=1, T=1):
@@ -170,6 +87,7 @@ class _GeneGenerator:
         self.Gene = {}
         self.SeqGen = _SequenceGenerator(A, C, G, T)
 
+    @_instrumented("Gene.create")
     def create(self, 
                gene_length=50000,
                n_exons=15, 
@@ -234,7 +152,9 @@ class _GeneGenerator:
         """
         
         self.gene_length = gene_length
+        self.start_key, self.end_key, self.feature_key = start_key, end_key, feature_key
         self.Gene["seq"] = self.seq = self.SeqGen.simulate(gene_length, return_seq=True)
+        self._seq_buffer = self.seq.encode("ascii")
         
         self.exon_df, self.intron_df, self.gene_df= _construct_gene(gene_length, 
                                           n_exons, 
@@ -250,7 +170,58 @@ class _GeneGenerator:
         if return_gene:
             return self.seq
         
-    def plot(self, color="navy", n_ticks=11, save=False):
+    def extract(self, feature="exon", spliced=False):
+
+        """
+        Sequences of the gene's features.
+
+        Parameters:
+        -----------
+        feature
+            "exon", "intron" or "UTR"; None: every feature.
+            type: str
+            default: "exon"
+
+        spliced
+            Join the features into one sequence (e.g. exons into the mRNA).
+            type: bool
+            default: False
+
+        Returns:
+        --------
+        features
+            `features[i]` is a zero-copy view into the gene sequence; `features.fetch(i)`
+            and `features.to_dict()` return str.
+            type: FeatureSequences
+
+        Notes:
+        ------
+        (1) requires prior running of `Gene.create()`
+        """
+
+        return _extract_features(
+            self.gene_df, self._seq_buffer, feature, spliced, self.start_key, self.end_key, self.feature_key
+        )
+
+    def transcript(self):
+
+        """Spliced mRNA: every exon, joined in one step. (str)"""
+
+        return self.extract("exon", spliced=True).fetch(0)
+
+    def introns(self):
+
+        """Intron sequences, as zero-copy views (see `extract`)."""
+
+        return self.extract("intron")
+
+    def UTRs(self):
+
+        """5' and 3' UTR sequences, as zero-copy views (see `extract`)."""
+
+        return self.extract("UTR")
+
+    def plot(self, color="navy", n_ticks=11, save=False, label_exons=True):
         
         """
         Plot a simulated gene. 
@@ -271,6 +242,11 @@ class _GeneGenerator:
             type: bool or str
             default: False
         
+        label_exons
+            Annotate each exon with its span.
+            type: bool
+            default: True
+        
         Returns:
         --------
         None, prints plot.
@@ -281,4 +257,14 @@ class _GeneGenerator:
         (2) requires prior running of `Gene.create()`
         """
         
-        _plot_gene(self.gene_length, self.gene_df, color, n_ticks, save)
+        _plot_gene(
+            self.gene_length,
+            self.gene_df,
+            color,
+            n_ticks,
+            save,
+            self.start_key,
+            self.end_key,
+            self.feature_key,
+            label_exons,
+        )
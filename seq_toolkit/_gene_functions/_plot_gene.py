@@ -0,0 +1,295 @@
+
+# _plot_gene.py
+
+__module_name__ = "_plot_gene.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+# package imports #
+# --------------- #
+import numpy as np
+import pandas as pd
+
+
+def _construct_gene_plot(n_bases, n_ticks):
+
+    """
+    Create the framework for the gene figure.
+
+    Parameters:
+    -----------
+    n_bases
+        Length of the gene being plotted.
+
+    n_ticks
+        Number of ticks along the x-axis.
+        type: int
+
+    Returns:
+    --------
+    fig, ax
+
+    Notes:
+    ------
+    (1) vinplots (and with it, matplotlib) is imported here, on first use, rather than
+        when `seq_toolkit` is imported.
+    """
+
+    import vinplots
+
+    fig = vinplots.Plot()
+    fig.construct(nplots=1, ncols=1, figsize_width=2.5)
+    fig.modify_spines(ax="all", spines_to_delete=['top', 'right', 'left'])
+    ax = fig.AxesDict[0][0]
+    xt = ax.set_xticks(np.linspace(0, n_bases, n_ticks))
+    yt = ax.set_yticks([])
+
+    return fig, ax
+
+
+def _rectangle_vertices(starts, ends, y, height):
+
+    """Vertices of one rectangle per (start, end) span, centered on `y`: shape (n, 4, 2)."""
+
+    starts, ends = np.asarray(starts, dtype=float), np.asarray(ends, dtype=float)
+    bottom = np.broadcast_to(np.asarray(y, dtype=float) - height / 2, starts.shape)
+    top = bottom + height
+
+    return np.stack(
+        [np.stack([starts, bottom], axis=-1),
+         np.stack([starts, top], axis=-1),
+         np.stack([ends, top], axis=-1),
+         np.stack([ends, bottom], axis=-1)],
+        axis=1,
+    )
+
+
+def _horizontal_segments(starts, ends, y):
+
+    """Segments for a `LineCollection`: shape (n, 2, 2)."""
+
+    starts, ends = np.asarray(starts, dtype=float), np.asarray(ends, dtype=float)
+    y = np.broadcast_to(np.asarray(y, dtype=float), starts.shape)
+
+    return np.stack([np.stack([starts, y], axis=-1), np.stack([ends, y], axis=-1)], axis=1)
+
+
+def _vertical_segments(x, y_min, y_max):
+
+    """Segments for a `LineCollection`: shape (n, 2, 2)."""
+
+    x = np.asarray(x, dtype=float)
+
+    return np.stack(
+        [np.stack([x, np.full(x.shape, y_min)], axis=-1), np.stack([x, np.full(x.shape, y_max)], axis=-1)],
+        axis=1,
+    )
+
+
+def _plot_gene(
+    n_bases,
+    gene_df,
+    color="navy",
+    n_ticks=11,
+    save=False,
+    start_key="gene_feature.start",
+    end_key="gene_feature.end",
+    feature_key="gene_feature",
+    label_exons=True,
+):
+
+    """
+    Plot a simulated gene.
+
+    Parameters:
+    -----------
+    n_bases
+        Length of plotted gene.
+
+    gene_df
+        pandas DataFrame with columns: [start_key, end_key, feature_key] denoting the
+        boundaries of the gene UTRs, introns, and exons.
+        type: pandas.DataFrame
+
+    color
+        type: str
+        default: "navy"
+
+    n_ticks
+        Number of ticks along the gene plot's x-axis.
+        type: int
+        default: 11
+
+    save
+        If not False, pass a string, which will trigger the object to save with figname=`save`.
+        type: bool or str
+        default: False
+
+    start_key, end_key, feature_key
+        Column titles of `gene_df`, as passed to `Gene.create`.
+        type: str
+
+    label_exons
+        Annotate each exon with its span.
+        type: bool
+        default: True
+
+    Returns:
+    --------
+    None, prints (and/or saves) plot.
+
+    Notes:
+    ------
+    (1) requires prior running of `Gene.create()`
+    (2) 500 is conveniently/arbitrarily chosen as a scalar for offsetting the text-labels of exon spans.
+        May not suit all use-cases and could be updated in the future if needed.
+    (3) Exon blocks, exon boundary guides and the gene body are each drawn as a single
+        matplotlib collection, however many exons the gene has; only the text labels
+        are drawn per exon.
+    """
+
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection, PolyCollection
+
+    fig, ax = _construct_gene_plot(n_bases, n_ticks)
+    plt.ylim(.95, 1.1)
+
+    starts, ends = gene_df[start_key].to_numpy(), gene_df[end_key].to_numpy()
+    ax.add_collection(
+        LineCollection(_horizontal_segments([starts.min()], [ends.max()], 1), colors=color, zorder=2)
+    )
+    text_offset = (ends.max() - starts.min()) / 500
+
+    exon_df = gene_df.loc[gene_df[feature_key] == "exon"]
+    exon_starts, exon_ends = exon_df[start_key].to_numpy(), exon_df[end_key].to_numpy()
+
+    ax.add_collection(
+        LineCollection(
+            _vertical_segments(np.concatenate([exon_starts, exon_ends]), 0.95, 1.025),
+            colors="lightgrey",
+            linestyles="--",
+            linewidths=1,
+        )
+    )
+    ax.add_collection(
+        PolyCollection(
+            _rectangle_vertices(exon_starts, exon_ends, 1, 0.03), facecolors=color, edgecolors="none", zorder=2
+        )
+    )
+
+    if label_exons:
+        for exon_start, exon_end in zip(exon_starts, exon_ends):
+            plt.text(x=exon_start + text_offset, y=1.03, s="{}-{}".format(exon_start, exon_end), rotation=25)
+
+    if save:
+        ax.figure.savefig(save)
+
+
+def _format_gene_tracks(genes, start_key, end_key, feature_key):
+
+    """One long-format DataFrame (with a "track" column) from a list or dict of `Gene` objects or gene DataFrames."""
+
+    if isinstance(genes, dict):
+        track_names, genes = list(genes.keys()), list(genes.values())
+    else:
+        track_names, genes = None, list(genes)
+
+    gene_dfs = [getattr(gene, "gene_df", gene)[[start_key, end_key, feature_key]] for gene in genes]
+    track_df = pd.concat(gene_dfs, ignore_index=True)
+    track_df["track"] = np.repeat(np.arange(len(gene_dfs)), [len(gene_df) for gene_df in gene_dfs])
+
+    return track_df, track_names
+
+
+def _plot_gene_tracks(
+    genes,
+    color="navy",
+    n_ticks=11,
+    save=False,
+    start_key="gene_feature.start",
+    end_key="gene_feature.end",
+    feature_key="gene_feature",
+    track_height=0.6,
+):
+
+    """
+    Plot many gene models, one per row, in a single figure.
+
+    Parameters:
+    -----------
+    genes
+        `Gene` objects (after `Gene.create()`) or gene DataFrames. If a dict, keys are used
+        as track labels.
+        type: list or dict
+
+    color
+        type: str
+        default: "navy"
+
+    n_ticks
+        Number of ticks along the x-axis.
+        type: int
+        default: 11
+
+    save
+        If not False, pass a string, which will trigger the object to save with figname=`save`.
+        type: bool or str
+        default: False
+
+    start_key, end_key, feature_key
+        Column titles of the gene DataFrames, as passed to `Gene.create`.
+        type: str
+
+    track_height
+        Height of exon blocks, as a fraction of the distance between tracks.
+        type: float
+        default: 0.6
+
+    Returns:
+    --------
+    fig, ax
+
+    Notes:
+    ------
+    (1) All gene bodies are drawn as one `LineCollection` and all exons as one
+        `PolyCollection` (the collection type behind `broken_barh`), so figures with
+        thousands of gene models render in a single draw call per layer.
+    (2) Track labels are only shown for up to 50 tracks.
+    """
+
+    from matplotlib.collections import LineCollection, PolyCollection
+
+    track_df, track_names = _format_gene_tracks(genes, start_key, end_key, feature_key)
+    n_tracks = track_df["track"].max() + 1
+
+    gene_bounds = track_df.groupby("track").agg(start=(start_key, "min"), end=(end_key, "max"))
+    fig, ax = _construct_gene_plot(gene_bounds["end"].max(), n_ticks)
+
+    ax.add_collection(
+        LineCollection(
+            _horizontal_segments(gene_bounds["start"], gene_bounds["end"], gene_bounds.index.to_numpy()),
+            colors=color,
+            linewidths=0.75,
+        )
+    )
+
+    exon_df = track_df.loc[track_df[feature_key] == "exon"]
+    ax.add_collection(
+        PolyCollection(
+            _rectangle_vertices(exon_df[start_key], exon_df[end_key], exon_df["track"], track_height),
+            facecolors=color,
+            edgecolors="none",
+        )
+    )
+
+    ax.set_xlim(gene_bounds["start"].min(), gene_bounds["end"].max())
+    ax.set_ylim(n_tracks - 0.5, -0.5)
+    if track_names is not None and n_tracks <= 50:
+        ax.set_yticks(np.arange(n_tracks))
+        ax.set_yticklabels(track_names)
+
+    if save:
+        ax.figure.savefig(save)
+
+    return fig, ax
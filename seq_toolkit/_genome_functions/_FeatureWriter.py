@@ -0,0 +1,126 @@
+
+# _FeatureWriter.py
+
+__module_name__ = "_FeatureWriter.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+def _infer_out_format(out_path):
+
+    """"""
+
+    if isinstance(out_path, str) and out_path.endswith((".parquet", ".pq")):
+        return "parquet"
+
+    return "bed"
+
+
+class _FeatureWriter:
+
+    """
+    Stream batches of features to a BED (tab-separated, no header) or Parquet file.
+
+    Parameters:
+    -----------
+    out_path
+        Path, or an open text file handle (e.g. `sys.stdout`) for BED output; a handle is
+        not closed by the writer.
+        type: str or file
+
+    out_format
+        One of: "bed", "parquet". Inferred from `out_path` if not passed.
+        type: str
+        default: None
+
+    Notes:
+    ------
+    (1) Batches are written as they arrive; nothing is held in memory between batches.
+    (2) Parquet output requires `pyarrow` (`pip install seq-toolkit[parquet]`), imported
+        only when a Parquet file is opened. Each batch becomes one row group. If no
+        features are written, an empty table is written, with the columns of the (empty)
+        batches passed; empty object columns are typed as strings.
+    """
+
+    def __init__(self, out_path, out_format=None):
+
+        self.out_path = out_path
+        self.out_format = out_format or _infer_out_format(out_path)
+        self.n_written = 0
+
+        if self.out_format == "parquet":
+            import pyarrow
+            import pyarrow.parquet
+
+            self._pyarrow = pyarrow
+            self._parquet_writer = None
+            self._empty_batch_df = None
+        elif self.out_format == "bed":
+            self._owns_file = not hasattr(out_path, "write")
+            self._bed_file = open(out_path, "w") if self._owns_file else out_path
+        else:
+            raise ValueError("out_format must be one of: 'bed', 'parquet'. Got: {}".format(self.out_format))
+
+    def write(self, batch_df):
+
+        """
+        Append a batch of features.
+
+        Parameters:
+        -----------
+        batch_df
+            Columns are written in order (for BED: chrom, start, end, ...).
+            type: pandas.DataFrame
+        """
+
+        if len(batch_df) == 0:
+            if self.out_format == "parquet" and self._empty_batch_df is None:
+                self._empty_batch_df = batch_df
+            return
+
+        if self.out_format == "bed":
+            batch_df.to_csv(self._bed_file, sep="\t", header=False, index=False)
+        else:
+            table = self._pyarrow.Table.from_pandas(batch_df, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = self._pyarrow.parquet.ParquetWriter(self.out_path, table.schema)
+            self._parquet_writer.write_table(table)
+
+        self.n_written += len(batch_df)
+
+    def close(self):
+
+        """"""
+
+        if self.out_format == "bed":
+            if self._owns_file:
+                self._bed_file.close()
+            else:
+                self._bed_file.flush()
+        elif self._parquet_writer is not None:
+            self._parquet_writer.close()
+        else:
+            self._write_empty_table()
+
+    def _write_empty_table(self):
+
+        """Write a table with no rows, so that downstream readers find a file either way."""
+
+        if self._empty_batch_df is None:
+            schema = self._pyarrow.schema([])
+        else:
+            schema = self._pyarrow.Schema.from_pandas(self._empty_batch_df, preserve_index=False)
+            schema = self._pyarrow.schema(
+                [
+                    field.with_type(self._pyarrow.string()) if self._pyarrow.types.is_null(field.type) else field
+                    for field in schema
+                ],
+                metadata=schema.metadata,
+            )
+        self._pyarrow.parquet.write_table(schema.empty_table(), self.out_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
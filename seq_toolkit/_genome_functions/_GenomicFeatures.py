@@ -20,8 +20,35 @@ except:
     os.system("sudo apt-get install gcc")
     os.system("pip install pyranges")
     import pyranges
+from natsort import natsorted
 
 
+# local imports #
+# ------------- #
+from ._fetch_chromosome_sizes import _fetch_chromosome_sizes
+from ._interval_operations import (
+    _as_interval_arrays,
+    _merge_intervals,
+    _features_frame,
+    _intersect_features,
+    _subtract_features,
+    _complement_features,
+    _closest_features,
+)
+from .._utility_functions._instrumentation import _instrumented, _stage
+
+
+def _as_features_df(features):
+
+    """Accept either a _GenomicFeatures object or a DataFrame of features."""
+
+    if isinstance(features, _GenomicFeatures):
+        return features.df
+
+    return features
+
+
+@_instrumented("cluster", count=len)
 def _cluster_df_features(df):
 
     """
@@ -48,27 +75,202 @@ def _cluster_overlapping_features(df):
     return clustered_df, grouped_df
 
 
+def _chromosome_categorical(chromosomes, lengths=None):
+
+    """
+    Chromosome column of merged features: categories in natural order (chr1, chr2, chr10),
+    the order in which `pyranges` reports clusters.
+
+    Parameters:
+    -----------
+    chromosomes
+        One value per feature or, with `lengths`, the distinct chromosomes in natural order.
+        type: array-like
+
+    lengths
+        Number of features on each of `chromosomes`.
+        type: list
+        default: None
+    """
+
+    if lengths is None:
+        chromosomes = np.asarray(chromosomes, dtype=object)
+        return pd.Categorical(chromosomes, categories=natsorted(set(chromosomes)))
+
+    return pd.Categorical.from_codes(np.repeat(np.arange(len(chromosomes)), lengths), categories=chromosomes)
+
+
+def _insert_merged_intervals(merged_starts, merged_ends, starts, ends):
+
+    """
+    Merge new intervals into a disjoint, sorted set of merged intervals.
+
+    Parameters:
+    -----------
+    merged_starts, merged_ends
+        Disjoint, sorted intervals (output of `_merge_intervals`).
+        type: numpy.ndarray
+
+    starts, ends
+        New intervals, sorted by start.
+        type: numpy.ndarray
+
+    Returns:
+    --------
+    merged_starts, merged_ends
+        type: numpy.ndarray
+
+    Notes:
+    ------
+    (1) Only the existing intervals that overlap or abut a new interval (each found with
+        two binary searches) are re-merged, together with the new intervals; the result
+        is inserted into the remaining intervals by sorted insertion. The work per batch
+        is a binary search and a copy, rather than a re-sort and re-merge of everything.
+    """
+
+    starts, ends = _merge_intervals(starts, ends)
+
+    first = np.searchsorted(merged_ends, starts, side="left")
+    stop = np.searchsorted(merged_starts, ends, side="right")
+    n_touched = np.maximum(stop - first, 0)
+    touched = np.unique(np.repeat(first, n_touched) + np.arange(n_touched.sum()) - np.repeat(np.cumsum(n_touched) - n_touched, n_touched))
+
+    if len(touched):
+        starts, ends = np.concatenate([merged_starts[touched], starts]), np.concatenate([merged_ends[touched], ends])
+        order = np.argsort(starts, kind="stable")
+        starts, ends = _merge_intervals(starts[order], ends[order])
+        merged_starts, merged_ends = np.delete(merged_starts, touched), np.delete(merged_ends, touched)
+
+    insert_idx = np.searchsorted(merged_starts, starts)
+
+    return np.insert(merged_starts, insert_idx, starts), np.insert(merged_ends, insert_idx, ends)
+
+
 class _GenomicFeatures:
 
     """general module for merge-reducing a pandas DataFrame with start and stop feature designations."""
 
-    def __init__(self, df):
+    def __init__(self, df=None, incremental=False):
+
+        """
+        Parameters:
+        -----------
+        df
+            Requires the standard notation: df[['Chromosome', 'Start', 'End']]
+            type: pandas.DataFrame
+            default: None
+
+        incremental
+            Keep merged features as sorted per-chromosome arrays and accept further
+            features with `add()`; `merged_df` is then always up to date. Implied when
+            no `df` is passed.
+            type: bool
+            default: False
+
+        Notes:
+        ------
+        (1) Otherwise, features are clustered up front and merged by `merge()`.
+        """
+
+        self.incremental = incremental or df is None
+        self._batches, self._df, self._merged_df = [], None, None
+
+        if self.incremental:
+            self._MergedIntervals = {}
+            if df is not None:
+                self.add(df)
+        else:
+            self._batches.append(df)
+            self._clustered_df, self._grouped_df = _cluster_overlapping_features(df)
+
+    @property
+    def df(self):
+
+        """Every feature passed so far (batches are concatenated on first access)."""
+
+        if self._df is None:
+            if not self._batches:
+                return _features_frame([], [], [])
+            self._df = self._batches[0] if len(self._batches) == 1 else pd.concat(self._batches, ignore_index=True)
+            self._batches = [self._df]
+
+        return self._df
+
+    def add(self, df):
+
+        """
+        Merge a batch of features into the merged set (incremental mode).
 
-        """"""
+        Parameters:
+        -----------
+        df
+            Requires the standard notation: df[['Chromosome', 'Start', 'End']]; any order.
+            type: pandas.DataFrame
 
-        self.df = df
-        self._clustered_df, self._grouped_df = _cluster_overlapping_features(df)
+        Returns:
+        --------
+        None, updates `merged_df`.
+
+        Notes:
+        ------
+        (1) Per chromosome, the batch is sorted and merged, and only the merged features
+            it overlaps are revisited (see `_insert_merged_intervals`).
+        (2) After any sequence of batches, `merged_df` equals a one-shot
+            `GenomicFeatures(all_features).merge()`.
+        """
+
+        if not self.incremental:
+            raise ValueError("add() requires GenomicFeatures(..., incremental=True). Got: incremental=False")
+
+        with _stage("merge_insert") as stage:
+            for chromosome, df_chrom in df.groupby("Chromosome", sort=False, observed=True):
+                starts, ends, _ = _as_interval_arrays(df_chrom)
+                if chromosome in self._MergedIntervals:
+                    self._MergedIntervals[chromosome] = _insert_merged_intervals(*self._MergedIntervals[chromosome], starts, ends)
+                else:
+                    self._MergedIntervals[chromosome] = _merge_intervals(starts, ends)
+            stage.count(len(df))
+
+        self._batches.append(df)
+        self._df, self._merged_df = None, None
+
+    @property
+    def merged_df(self):
+
+        """
+        Merged features: columns ['Chromosome', 'Start', 'End'], ordered as by `pyranges`
+        (chromosomes in natural order, then by Start). Chromosome is categorical, so that
+        reading `merged_df` after each batch does not rebuild a column of strings.
+        """
+
+        if self._merged_df is None:
+            if not self.incremental:
+                raise AttributeError("merged_df is available after merge() (or with incremental=True).")
+            chromosomes = natsorted(self._MergedIntervals.keys())
+            if chromosomes:
+                starts, ends = zip(*[self._MergedIntervals[chromosome] for chromosome in chromosomes])
+                lengths = [len(chrom_starts) for chrom_starts in starts]
+                self._merged_df = _features_frame(
+                    _chromosome_categorical(chromosomes, lengths), np.concatenate(starts), np.concatenate(ends)
+                )
+            else:
+                self._merged_df = _features_frame(_chromosome_categorical([]), [], [])
+
+        return self._merged_df
 
     def merge(self):
 
-        self._chrom_vals = self._grouped_df["Chromosome"].aggregate(np.unique).values
-        self._start_vals = self._grouped_df["Start"].min()
-        self._end_vals = self._grouped_df["End"].max()
+        if self.incremental:
+            return
 
-        self.merged_df = pd.DataFrame(
-            [self._chrom_vals, self._start_vals, self._end_vals],
-            index=["Chromosome", "Start", "End"],
-        ).T
+        with _stage("merge") as stage:
+            # each cluster lies on a single chromosome
+            self._chrom_vals = self._grouped_df["Chromosome"].first().astype(str).to_numpy(dtype=object)
+            self._start_vals = self._grouped_df["Start"].min()
+            self._end_vals = self._grouped_df["End"].max()
+
+            self._merged_df = _features_frame(_chromosome_categorical(self._chrom_vals), self._start_vals, self._end_vals)
+            stage.count(len(self._merged_df))
 
     def write_bed(self, out_path="merged_features.bed"):
 
@@ -76,4 +278,109 @@ class _GenomicFeatures:
         Can be downloaded and visualized directly in IGV.
         """
 
-        self.merged_df.to_csv(out_path, sep="\t", header=False, index=False)
\ No newline at end of file
+        self.merged_df.to_csv(out_path, sep="\t", header=False, index=False)
+
+    def intersect(self, other):
+
+        """
+        Portions of each feature that overlap any feature in `other`.
+
+        Parameters:
+        -----------
+        other
+            Requires the standard notation: df[['Chromosome', 'Start', 'End']]
+            type: pandas.DataFrame or GenomicFeatures
+
+        Returns:
+        --------
+        intersected_df
+            Every column of the features, with Start and End trimmed to the overlap; in
+            the order of the features.
+            type: pandas.DataFrame
+
+        Notes:
+        ------
+        (1) Implemented as a sorted sweep over numpy arrays, per chromosome.
+        (2) `other` is merged first, so its own columns are not carried through.
+        """
+
+        return _intersect_features(self.df, _as_features_df(other))
+
+    def subtract(self, other, remove_overlapping=False):
+
+        """
+        Remove the bases covered by `other` from each feature.
+
+        Parameters:
+        -----------
+        other
+            Requires the standard notation: df[['Chromosome', 'Start', 'End']]
+            type: pandas.DataFrame or GenomicFeatures
+
+        remove_overlapping
+            If True, drop features overlapping `other` entirely rather than trimming
+            them. Useful for blacklist filtering.
+            type: bool
+            default: False
+
+        Returns:
+        --------
+        subtracted_df
+            Every column of the features, with Start and End trimmed; in the order of
+            the features.
+            type: pandas.DataFrame
+        """
+
+        return _subtract_features(self.df, _as_features_df(other), remove_overlapping)
+
+    def complement(self, chrom_sizes):
+
+        """
+        Regions of the genome not covered by any feature.
+
+        Parameters:
+        -----------
+        chrom_sizes
+            Chromosome lengths keyed by chromosome name, or a path to a reference
+            genome fasta file (lengths are read from its .fai index, if present).
+            type: dict or str
+
+        Returns:
+        --------
+        complement_df
+            type: pandas.DataFrame
+        """
+
+        if isinstance(chrom_sizes, str):
+            chrom_sizes = _fetch_chromosome_sizes(chrom_sizes)
+
+        return _complement_features(self.df, chrom_sizes)
+
+    def closest(self, other):
+
+        """
+        Report the nearest feature in `other` for each feature.
+
+        Parameters:
+        -----------
+        other
+            Requires the standard notation: df[['Chromosome', 'Start', 'End']]
+            type: pandas.DataFrame or GenomicFeatures
+
+        Returns:
+        --------
+        closest_df
+            Every column of the features, then every column of `other` but Chromosome,
+            suffixed "_b" (e.g. 'Start_b', 'End_b', 'Name_b'), then 'Distance'; in the
+            order of the features.
+            type: pandas.DataFrame
+
+        Notes:
+        ------
+        (1) Overlapping features have Distance = 0.
+        (2) One feature of `other` is reported per feature. Of two equally close features,
+            the one with lower coordinates is reported; of several overlapping features,
+            the one reaching furthest right.
+        """
+
+        return _closest_features(self.df, _as_features_df(other))
\ No newline at end of file
@@ -0,0 +1,313 @@
+
+# _SequenceStore.py
+
+__module_name__ = "_SequenceStore.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+# import packages #
+# --------------- #
+import json
+import mmap
+import os
+import re
+import secrets
+import struct
+import tempfile
+import weakref
+
+
+# local imports #
+# ------------- #
+from ._fasta_index import _load_fasta_index, _fetch_region_bytes
+
+
+_MAGIC = b"SQTKSTR1"
+_PREAMBLE = struct.Struct("<8sQ")  # magic, header length
+_LOAD_BLOCK_SIZE = 2 ** 24
+_VALID_NAME = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+def _shared_memory_dir():
+
+    """/dev/shm (memory-backed) where available; otherwise the temporary directory."""
+
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        return "/dev/shm"
+
+    return tempfile.gettempdir()
+
+
+def _store_path(name):
+
+    """"""
+
+    if not _VALID_NAME.match(name):
+        raise ValueError("SequenceStore names may contain letters, digits, '_', '.' and '-'. Got: {}".format(name))
+
+    return os.path.join(_shared_memory_dir(), name)
+
+
+def _unlink_store(path, owner_pid):
+
+    """Remove the store's name, from the creating process only (not from forked workers)."""
+
+    if os.getpid() == owner_pid and os.path.exists(path):
+        os.unlink(path)
+
+
+def _attach_sequence_store(name):
+
+    """Unpickling a `_SequenceStore` attaches to it by name."""
+
+    return _SequenceStore.attach(name)
+
+
+class _SequenceStore:
+
+    """
+    Chromosome sequences loaded once into shared memory, for zero-copy access from many processes.
+
+    Parameters:
+    -----------
+    ref_seq_path
+        Path to a reference genome fasta file.
+        type: str
+        default: None
+
+    sequences
+        Alternatively, {name: sequence}.
+        type: dict
+        default: None
+
+    chromosomes
+        Chromosomes of `ref_seq_path` to load. By default, every chromosome.
+        type: list
+        default: None
+
+    name
+        Name under which other processes attach. By default, a random name.
+        type: str
+        default: None
+
+    Usage:
+    ------
+        def count_ebox(store, chromosome):
+            return len(seq_toolkit.query_motif(store[chromosome], "CANNTG", verbose=False))
+
+        with seq_toolkit.SequenceStore("genome.fa") as store:
+            with ProcessPoolExecutor(8) as executor:
+                counts = list(executor.map(count_ebox, itertools.repeat(store), store.chromosomes))
+
+    Notes:
+    ------
+    (1) Sequences are stored once, as ASCII bytes, in a memory-mapped file in /dev/shm
+        (the mechanism behind `multiprocessing.shared_memory`). Any process can attach with
+        `SequenceStore.attach(name)`; a store passed to a worker process is pickled as its
+        name only and re-attached on arrival, so no sequence is serialized.
+    (2) `view()` (and `store[chromosome]`) returns a read-only memoryview over shared memory.
+        `query_motif`, `MotifSearcher`, `count_motif`, `count_kmers`, `composition_profile`,
+        `scan_pwm`, `FMIndex` and `SequenceManipulator` accept these views directly; encoding
+        reads them block by block, without copying the whole sequence.
+    (3) The creating process removes the store's name on `unlink()`, on leaving a `with`
+        block, or at exit. Processes that are already attached keep their mapping.
+    """
+
+    def __init__(self, ref_seq_path=None, sequences=None, chromosomes=None, name=None):
+
+        if (ref_seq_path is None) == (sequences is None):
+            raise ValueError("Pass exactly one of: ref_seq_path, sequences. Got: {}, {}".format(ref_seq_path, type(sequences)))
+
+        if sequences is not None:
+            sequences = {
+                chromosome: sequence.encode("ascii") if isinstance(sequence, str) else bytes(sequence)
+                for chromosome, sequence in sequences.items()
+            }
+            lengths = {chromosome: len(sequence) for chromosome, sequence in sequences.items()}
+        else:
+            FastaIndex = _load_fasta_index(ref_seq_path)
+            if chromosomes is None:
+                chromosomes = list(FastaIndex.keys())
+            lengths = {chromosome: FastaIndex[chromosome].length for chromosome in chromosomes}
+
+        self.name = name or "seq_toolkit_{}".format(secrets.token_hex(8))
+        self.path = _store_path(self.name)
+        self._set_layout(lengths)
+
+        header = json.dumps({"chromosomes": [[chromosome, *self._spans[chromosome]] for chromosome in lengths]}).encode()
+        self._data_offset = _PREAMBLE.size + len(header)
+        size = self._data_offset + sum(lengths.values())
+
+        descriptor = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_RDWR, 0o600)
+        self.owner = True
+        self._finalizer = weakref.finalize(self, _unlink_store, self.path, os.getpid())
+        try:
+            os.ftruncate(descriptor, max(size, 1))
+            self._mmap = mmap.mmap(descriptor, max(size, 1))
+        finally:
+            os.close(descriptor)
+
+        self._mmap[: self._data_offset] = _PREAMBLE.pack(_MAGIC, len(header)) + header
+        if sequences is not None:
+            for chromosome, sequence in sequences.items():
+                self._write(chromosome, 0, sequence)
+        else:
+            with open(ref_seq_path, "rb") as fasta:
+                for chromosome in lengths:
+                    for block_start in range(0, lengths[chromosome], _LOAD_BLOCK_SIZE):
+                        block_end = block_start + _LOAD_BLOCK_SIZE
+                        self._write(chromosome, block_start, _fetch_region_bytes(fasta, FastaIndex[chromosome], block_start, block_end))
+
+        self._buffer = memoryview(self._mmap).toreadonly()
+
+    @classmethod
+    def attach(cls, name):
+
+        """
+        Attach to an existing store by name, e.g. from a worker process.
+
+        Returns:
+        --------
+        store
+            type: SequenceStore
+        """
+
+        store = cls.__new__(cls)
+        store.name, store.path, store.owner = name, _store_path(name), False
+
+        if not os.path.exists(store.path):
+            raise ValueError("No SequenceStore named {}. Got: {}".format(name, store.path))
+
+        descriptor = os.open(store.path, os.O_RDONLY)
+        try:
+            store._mmap = mmap.mmap(descriptor, 0, access=mmap.ACCESS_READ)
+        finally:
+            os.close(descriptor)
+
+        magic, header_length = _PREAMBLE.unpack_from(store._mmap)
+        if magic != _MAGIC:
+            raise ValueError("Not a SequenceStore. Got: {}".format(store.path))
+        store._data_offset = _PREAMBLE.size + header_length
+        header = json.loads(bytes(store._mmap[_PREAMBLE.size : store._data_offset]))
+        store._set_layout({chromosome: length for chromosome, offset, length in header["chromosomes"]})
+        store._buffer = memoryview(store._mmap)
+
+        return store
+
+    def _set_layout(self, lengths):
+
+        """{chromosome: (offset, length)}: chromosomes are stored back to back, in order."""
+
+        self._spans, offset = {}, 0
+        for chromosome, length in lengths.items():
+            self._spans[chromosome] = (offset, length)
+            offset += length
+
+    def _write(self, chromosome, start, sequence):
+
+        """"""
+
+        offset = self._data_offset + self._spans[chromosome][0] + start
+        self._mmap[offset : offset + len(sequence)] = sequence
+
+    @property
+    def chromosomes(self):
+        return list(self._spans.keys())
+
+    @property
+    def lengths(self):
+
+        """{chromosome: length}"""
+
+        return {chromosome: length for chromosome, (offset, length) in self._spans.items()}
+
+    def view(self, chromosome, start=0, end=None):
+
+        """
+        Zero-copy, read-only view of [start, end) of a chromosome.
+
+        Parameters:
+        -----------
+        chromosome
+            type: str
+
+        start, end
+            0-based, half-open coordinates; clipped to the chromosome. By default, the
+            whole chromosome.
+            type: int
+
+        Returns:
+        --------
+        region_view
+            One byte per base (ASCII). `bytes(view)` or `fetch()` makes a copy.
+            type: memoryview
+        """
+
+        if not chromosome in self._spans:
+            raise ValueError("Chromosome not in SequenceStore {}. Got: {}".format(self.name, chromosome))
+
+        offset, length = self._spans[chromosome]
+        end = length if end is None else min(end, length)
+        start = min(max(start, 0), end)
+
+        return self._buffer[self._data_offset + offset + start : self._data_offset + offset + end]
+
+    def fetch(self, chromosome, start=0, end=None):
+
+        """As `view`, copied out as a str (e.g. for functions that require one)."""
+
+        return bytes(self.view(chromosome, start, end)).decode("ascii")
+
+    def __getitem__(self, chromosome):
+        return self.view(chromosome)
+
+    def __contains__(self, chromosome):
+        return chromosome in self._spans
+
+    def __iter__(self):
+        return iter(self._spans)
+
+    def __len__(self):
+        return len(self._spans)
+
+    @property
+    def nbytes(self):
+        return sum(self.lengths.values())
+
+    def close(self):
+
+        """
+        Detach this process. The mapping is released once no view into it remains, so
+        views handed out earlier stay valid.
+        """
+
+        self._buffer = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+        self._mmap = None
+
+    def unlink(self):
+
+        """Remove the store's name, so that no new process can attach. Only the creating process should call this."""
+
+        if self.owner:
+            self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+
+        self.close()
+        self.unlink()
+
+        return False
+
+    def __reduce__(self):
+        return (_attach_sequence_store, (self.name,))
+
+    def __repr__(self):
+        return "SequenceStore(name={!r}, chromosomes={}, bases={})".format(self.name, len(self), self.nbytes)
@@ -0,0 +1,378 @@
+
+# _extract_features.py
+
+__module_name__ = "_extract_features.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+# import packages #
+# --------------- #
+import numpy as np
+import pandas as pd
+
+
+# local imports #
+# ------------- #
+from ._fasta_index import _load_fasta_index, _fetch_region_bytes
+from ._fasta_stream import _write_fasta_record
+from .._sequence_functions._SequenceManipulation import _reverse_complement_bytes
+from .._utility_functions._instrumentation import _instrumented, _stage
+
+
+class _FeatureSequences:
+
+    """
+    Sequences of many features, held as offsets into one contiguous buffer.
+
+    Parameters:
+    -----------
+    buffer
+        type: bytes or any buffer (e.g. a gene sequence or a `SequenceStore` view)
+
+    starts, ends
+        Span of each feature within `buffer`.
+        type: numpy.ndarray
+
+    names
+        type: numpy.ndarray or list
+
+    Notes:
+    ------
+    (1) `features[i]` or `features[name]` is a zero-copy memoryview into the buffer;
+        `fetch()`, `to_dict()` and `to_fasta()` copy sequences out.
+    """
+
+    def __init__(self, buffer, starts, ends, names):
+
+        self.buffer = buffer
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.names = np.asarray(names, dtype=object)
+        self._view = memoryview(buffer).cast("B")
+        self._NameIndex = None
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def lengths(self):
+        return self.ends - self.starts
+
+    def _index(self, key):
+
+        """"""
+
+        if isinstance(key, (int, np.integer)):
+            return key
+
+        if self._NameIndex is None:
+            self._NameIndex = {name: idx for idx, name in enumerate(self.names)}
+        if not key in self._NameIndex:
+            raise ValueError("No feature with this name. Got: {}".format(key))
+
+        return self._NameIndex[key]
+
+    def __getitem__(self, key):
+
+        idx = self._index(key)
+
+        return self._view[self.starts[idx] : self.ends[idx]]
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def fetch(self, key):
+
+        """Sequence of one feature (by position or name), as a str."""
+
+        return bytes(self[key]).decode("ascii")
+
+    def to_dict(self):
+
+        """{name: sequence (str)}; only the features' own spans are copied out of the buffer."""
+
+        return {
+            name: bytes(self._view[start:end]).decode("ascii")
+            for name, start, end in zip(self.names, self.starts.tolist(), self.ends.tolist())
+        }
+
+    def to_fasta(self, out_path, line_width=60):
+
+        """Write every feature as a FASTA record."""
+
+        with open(out_path, "wb") as out_file:
+            for name, start, end in zip(self.names, self.starts, self.ends):
+                _write_fasta_record(out_file, str(name), self._view[start:end].tobytes(), line_width)
+
+    def __repr__(self):
+        return "FeatureSequences(features={}, bases={})".format(len(self), int(self.lengths.sum()))
+
+
+def _splice_intervals(source, starts, ends, group_idx, is_minus):
+
+    """
+    Join the intervals of each group (e.g. the exons of each transcript) into one buffer.
+
+    Parameters:
+    -----------
+    source
+        type: bytes or any buffer
+
+    starts, ends
+        0-based, half-open intervals in `source`.
+        type: numpy.ndarray
+
+    group_idx
+        Group (0, 1, ...) of each interval.
+        type: numpy.ndarray
+
+    is_minus
+        Whether each group lies on the minus strand.
+        type: numpy.ndarray of bool
+
+    Returns:
+    --------
+    buffer
+        type: bytes
+
+    group_starts, group_ends
+        Span of each group in `buffer`.
+        type: numpy.ndarray
+
+    Notes:
+    ------
+    (1) Within a group, intervals are joined in ascending order; minus-strand groups are
+        then reverse complemented.
+    (2) All plus-strand groups are built with a single concatenation. Minus-strand groups are
+        joined in reverse group order, then reverse complemented as one sequence:
+        since rc(T2 + T1) = rc(T1) + rc(T2), this yields every transcript, in order,
+        without a per-transcript pass.
+    """
+
+    n_groups = len(is_minus)
+    interval_lengths = ends - starts
+    group_lengths = np.bincount(group_idx, weights=interval_lengths, minlength=n_groups).astype(np.int64)
+    interval_minus = is_minus[group_idx]
+    source = np.frombuffer(source, dtype=np.uint8)
+
+    def _join(interval_order):
+        # numpy slices, unlike memoryview slices, are not tracked by the garbage collector
+        if not len(interval_order):
+            return b""
+        return np.concatenate(
+            [source[start:end] for start, end in zip(starts[interval_order].tolist(), ends[interval_order].tolist())]
+        ).tobytes()
+
+    # plus strand: groups in ascending order; minus strand: groups in descending order
+    sort_group = np.where(interval_minus, -group_idx, group_idx)
+    order = np.lexsort([starts, sort_group, interval_minus])
+    n_plus_intervals = int((~interval_minus).sum())
+    plus_order, minus_order = order[:n_plus_intervals], order[n_plus_intervals:]
+    plus_buffer, minus_buffer = _join(plus_order), _join(minus_order)
+
+    group_starts = np.empty(n_groups, dtype=np.int64)
+    for strand_groups, base_offset in [(np.flatnonzero(~is_minus), 0), (np.flatnonzero(is_minus), len(plus_buffer))]:
+        strand_lengths = group_lengths[strand_groups]
+        group_starts[strand_groups] = base_offset + np.cumsum(strand_lengths) - strand_lengths
+
+    if minus_buffer:
+        buffer = plus_buffer + _reverse_complement_bytes(minus_buffer)
+    else:
+        buffer = plus_buffer
+
+    return buffer, group_starts, group_starts + group_lengths
+
+
+def _as_buffer(sequence):
+
+    """str -> ASCII bytes; buffers (bytes, `SequenceStore` views, ...) are used as they are."""
+
+    if isinstance(sequence, str):
+        return sequence.encode("ascii")
+
+    return sequence
+
+
+@_instrumented("extract_features", count=len)
+def _extract_features(
+    gene_df,
+    sequence,
+    feature="exon",
+    spliced=False,
+    start_key="gene_feature.start",
+    end_key="gene_feature.end",
+    feature_key="gene_feature",
+    group_key=None,
+    strand_key=None,
+):
+
+    """
+    Extract the sequences of features of a gene_df-style table from one sequence.
+
+    Parameters:
+    -----------
+    gene_df
+        Features with 0-based, half-open coordinates, e.g. `Gene.gene_df`.
+        type: pandas.DataFrame
+
+    sequence
+        The sequence that coordinates refer to, e.g. `Gene.seq` or a fetched chromosome.
+        type: str, bytes, or any buffer (e.g. a `SequenceStore` view)
+
+    feature
+        Value of `feature_key` to extract (e.g. "exon", "intron", "UTR"); None: every row.
+        type: str
+        default: "exon"
+
+    spliced
+        Join the features of each group (e.g. the exons of each transcript) into one
+        sequence, rather than returning each feature separately.
+        type: bool
+        default: False
+
+    start_key, end_key, feature_key
+        Columns of `gene_df`. The defaults match `Gene`.
+        type: str
+
+    group_key
+        Column identifying the transcript of each feature, when `spliced`. By default,
+        every feature belongs to one transcript.
+        type: str
+        default: None
+
+    strand_key
+        Column of "+" / "-"; minus-strand features are reverse complemented. By default,
+        every feature is on the plus strand.
+        type: str
+        default: None
+
+    Returns:
+    --------
+    features
+        Offsets into one contiguous buffer; `features[i]` is a zero-copy view.
+        type: FeatureSequences
+
+    Notes:
+    ------
+    (1) Unspliced plus-strand features are views into `sequence` itself (after encoding
+        a str once). Spliced transcripts are built with a single join.
+    """
+
+    if feature is not None:
+        gene_df = gene_df.loc[gene_df[feature_key] == feature]
+
+    starts = gene_df[start_key].to_numpy(dtype=np.int64)
+    ends = gene_df[end_key].to_numpy(dtype=np.int64)
+    interval_minus = np.zeros(len(gene_df), dtype=bool) if strand_key is None else (gene_df[strand_key] == "-").to_numpy()
+
+    if spliced:
+        if group_key is None:
+            group_idx, names = np.zeros(len(gene_df), dtype=np.int64), np.array(["transcript"], dtype=object)
+        else:
+            group_idx, names = pd.factorize(gene_df[group_key])
+        is_minus = np.zeros(len(names), dtype=bool)
+        is_minus[group_idx[interval_minus]] = True
+    else:
+        group_idx, is_minus = np.arange(len(gene_df)), interval_minus
+        names = np.char.add("{}_".format(feature or "feature"), np.arange(1, len(gene_df) + 1).astype(str))
+        if not is_minus.any():
+            # each feature is a view into the sequence itself: nothing is copied
+            return _FeatureSequences(_as_buffer(sequence), starts, ends, names)
+
+    buffer, group_starts, group_ends = _splice_intervals(_as_buffer(sequence), starts, ends, group_idx, is_minus)
+
+    return _FeatureSequences(buffer, group_starts, group_ends, names)
+
+
+@_instrumented("extract_transcripts", count=len)
+def _extract_transcripts(gtf, reference, feature="exon", group_key="transcript_id", chromosomes=None):
+
+    """
+    Extract the spliced sequence of every transcript of a GTF from an indexed reference.
+
+    Parameters:
+    -----------
+    gtf
+        As returned by `parse_reference`: columns "seqname", "feature", "start", "end"
+        (1-based, inclusive), "strand" and `group_key`.
+        type: pandas.DataFrame
+
+    reference
+        Path to an (indexed) reference fasta file, or a `SequenceStore`.
+        type: str or SequenceStore
+
+    feature
+        Features joined into each transcript, e.g. "exon" or "CDS".
+        type: str
+        default: "exon"
+
+    group_key
+        type: str
+        default: "transcript_id"
+
+    chromosomes
+        Only extract transcripts on these chromosomes. By default, every chromosome.
+        type: list
+        default: None
+
+    Returns:
+    --------
+    transcripts
+        Named by `group_key`, in order of first appearance in `gtf`; minus-strand
+        transcripts are reverse complemented.
+        type: FeatureSequences
+
+    Notes:
+    ------
+    (1) Each chromosome is read once (or viewed in place in a `SequenceStore`); all of its
+        transcripts are built from it with a single join, then it is released. Only the
+        transcript sequences are kept.
+    """
+
+    if not group_key in gtf.columns:
+        raise ValueError("The GTF table must have a {} column. Got: {}".format(group_key, list(gtf.columns)))
+
+    exon_df = gtf.loc[gtf["feature"] == feature]
+    if chromosomes is not None:
+        exon_df = exon_df.loc[exon_df["seqname"].isin(chromosomes)]
+
+    group_idx, names = pd.factorize(exon_df[group_key])
+    starts = exon_df["start"].to_numpy(dtype=np.int64) - 1
+    ends = exon_df["end"].to_numpy(dtype=np.int64)
+    is_minus = np.zeros(len(names), dtype=bool)
+    is_minus[group_idx[(exon_df["strand"] == "-").to_numpy()]] = True
+
+    is_store = hasattr(reference, "view")
+    FastaIndex = None if is_store else _load_fasta_index(reference)
+    fasta = None if is_store else open(reference, "rb")
+
+    buffers, group_starts, group_ends, buffer_offset = [], np.zeros(len(names), dtype=np.int64), np.zeros(len(names), dtype=np.int64), 0
+    try:
+        for chromosome, row_idx in exon_df.groupby("seqname", sort=False).indices.items():
+            if is_store:
+                if not chromosome in reference:
+                    raise ValueError("Chromosome not found in the SequenceStore. Got: {}".format(chromosome))
+                source = reference.view(chromosome)
+            else:
+                if not chromosome in FastaIndex:
+                    raise ValueError("Chromosome not found in {}. Got: {}".format(reference, chromosome))
+                with _stage("fasta_fetch") as stage:
+                    source = _fetch_region_bytes(fasta, FastaIndex[chromosome], 0, FastaIndex[chromosome].length)
+                    stage.count(len(source))
+
+            chrom_groups, local_group_idx = np.unique(group_idx[row_idx], return_inverse=True)
+            buffer, local_starts, local_ends = _splice_intervals(
+                source, starts[row_idx], ends[row_idx], local_group_idx.ravel(), is_minus[chrom_groups]
+            )
+            group_starts[chrom_groups] = buffer_offset + local_starts
+            group_ends[chrom_groups] = buffer_offset + local_ends
+            buffers.append(buffer)
+            buffer_offset += len(buffer)
+    finally:
+        if fasta is not None:
+            fasta.close()
+
+    buffer = buffers[0] if len(buffers) == 1 else b"".join(buffers)
+
+    return _FeatureSequences(buffer, group_starts, group_ends, np.asarray(names, dtype=object))
@@ -0,0 +1,184 @@
+# _fasta_index.py
+
+__module_name__ = "_fasta_index.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+# import packages #
+# --------------- #
+from collections import namedtuple
+import os
+
+
+# local imports #
+# ------------- #
+from .._utility_functions._instrumentation import _instrumented
+
+
+_FastaIndexRecord = namedtuple(
+    "_FastaIndexRecord", ["name", "length", "offset", "line_bases", "line_bytes"]
+)
+
+
+def _read_fasta_index(fai_path):
+
+    """Read a samtools FASTA index (.fai) into {chromosome: _FastaIndexRecord}."""
+
+    FastaIndex = {}
+    with open(fai_path) as fai:
+        for line in fai:
+            fields = line.rstrip("\n").split("\t")
+            FastaIndex[fields[0]] = _FastaIndexRecord(fields[0], *[int(field) for field in fields[1:5]])
+
+    return FastaIndex
+
+
+def _build_fasta_index(ref_seq_path):
+
+    """
+    Index a fasta file in a single streaming pass, without holding any sequence in memory.
+
+    Parameters:
+    -----------
+    ref_seq_path
+        Path to a reference genome fasta file.
+        type: str
+
+    Returns:
+    --------
+    FastaIndex
+        {chromosome: _FastaIndexRecord}, with the same fields as a samtools .fai index.
+        type: dict
+
+    Notes:
+    ------
+    (1) As with samtools, every sequence line of a record (except the last) is assumed to
+        have the same length.
+    """
+
+    FastaIndex = {}
+    name = None
+    byte_offset = 0
+
+    with open(ref_seq_path, "rb") as fasta:
+        for line in fasta:
+            if line.startswith(b">"):
+                if name is not None:
+                    FastaIndex[name] = _FastaIndexRecord(name, length, offset, line_bases, line_bytes)
+                name = line[1:].split()[0].decode()
+                length, offset, line_bases, line_bytes = 0, byte_offset + len(line), 0, 0
+            else:
+                n_bases = len(line.rstrip(b"\r\n"))
+                if line_bases == 0:
+                    line_bases, line_bytes = n_bases, len(line)
+                length += n_bases
+            byte_offset += len(line)
+
+    if name is not None:
+        FastaIndex[name] = _FastaIndexRecord(name, length, offset, line_bases, line_bytes)
+
+    return FastaIndex
+
+
+def _load_fasta_index(ref_seq_path):
+
+    """Use `ref_seq_path` + ".fai" if it exists; otherwise index the fasta file directly."""
+
+    fai_path = "{}.fai".format(ref_seq_path)
+    if os.path.exists(fai_path):
+        return _read_fasta_index(fai_path)
+
+    return _build_fasta_index(ref_seq_path)
+
+
+def _write_fasta_index(FastaIndex, fai_path):
+
+    """Write an index built by `_build_fasta_index` in samtools .fai format."""
+
+    with open(fai_path, "w") as fai:
+        for record in FastaIndex.values():
+            fai.write("\t".join([str(field) for field in record]) + "\n")
+
+
+def _fetch_region_bytes(fasta, record, start, end):
+
+    """As `_fetch_region`, returning the region as bytes."""
+
+    start, end = max(start, 0), min(end, record.length)
+    if end <= start:
+        return b""
+
+    def _byte_position(position):
+        line, column = divmod(position, record.line_bases)
+        return record.offset + line * record.line_bytes + column
+
+    byte_start = _byte_position(start)
+    fasta.seek(byte_start)
+    region = fasta.read(_byte_position(end) - byte_start)
+
+    return region.replace(b"\n", b"").replace(b"\r", b"")
+
+
+@_instrumented("fasta_fetch", count=len)
+def _fetch_region(fasta, record, start, end):
+
+    """
+    Read [start, end) of one chromosome from an open (binary) fasta file handle.
+
+    Parameters:
+    -----------
+    fasta
+        Open file handle, in binary mode.
+
+    record
+        Index record of the chromosome.
+        type: _FastaIndexRecord
+
+    start, end
+        0-based, half-open coordinates; clipped to the chromosome.
+        type: int
+
+    Returns:
+    --------
+    region_seq
+        type: str
+    """
+
+    return _fetch_region_bytes(fasta, record, start, end).decode("ascii")
+
+
+@_instrumented("fetch_region", count=len)
+def _fetch_sequence_region(ref_seq_path, chromosome, start, end, FastaIndex=None):
+
+    """
+    Get [start, end) of a chromosome from a reference genome without reading the whole chromosome.
+
+    Parameters:
+    -----------
+    ref_seq_path [ required ]
+        Path to a reference genome fasta file.
+        type: str
+
+    chromosome [ required ]
+        type: str
+
+    start, end [ required ]
+        0-based, half-open coordinates.
+        type: int
+
+    FastaIndex [ optional ]
+        Output of `_load_fasta_index`; pass it when fetching many regions.
+        type: dict
+
+    Returns:
+    --------
+    region_seq
+        type: str
+    """
+
+    if FastaIndex is None:
+        FastaIndex = _load_fasta_index(ref_seq_path)
+
+    with open(ref_seq_path, "rb") as fasta:
+        return _fetch_region(fasta, FastaIndex[chromosome], start, end)
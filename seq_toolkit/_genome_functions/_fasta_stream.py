@@ -0,0 +1,167 @@
+
+# _fasta_stream.py
+
+__module_name__ = "_fasta_stream.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+_BLOCK_SIZE = 2 ** 22
+_LINE_WIDTH = 60
+
+
+def _iterate_fasta_pieces(fasta, block_size=_BLOCK_SIZE):
+
+    """
+    Parse a FASTA stream one block at a time.
+
+    Parameters:
+    -----------
+    fasta
+        File handle opened in binary mode (e.g. `sys.stdin.buffer`); need not be seekable.
+
+    block_size
+        Number of bytes read at once.
+        type: int
+        default: 2 ** 22
+
+    Returns:
+    --------
+    pieces
+        (header, sequence) pairs: header is the header line without ">"; sequence is a
+        piece of that record's sequence with line breaks removed, or None at the start
+        of each record (so that records without sequence are still reported).
+        type: generator of (str, bytes)
+
+    Notes:
+    ------
+    (1) Only one block (plus one partial line) is held in memory, whatever the record length.
+    """
+
+    header = None
+    pending = b""
+    while True:
+        block = fasta.read(block_size)
+        data = pending + block
+        if not block:
+            if not data:
+                return
+            data, pending = data + b"\n", b""
+        else:
+            cut = data.rfind(b"\n") + 1
+            data, pending = data[:cut], data[cut:]
+
+        position = 0
+        while position < len(data):
+            if data[position] == 62:  # ">"
+                line_end = data.index(b"\n", position)
+                header = data[position + 1 : line_end].rstrip(b"\r").decode()
+                yield header, None
+                position = line_end + 1
+                continue
+            next_header = data.find(b"\n>", position)
+            piece_end = len(data) if next_header < 0 else next_header + 1
+            if header is None:
+                if data[position:piece_end].strip():
+                    raise ValueError("FASTA input must begin with a header line ('>').")
+            else:
+                yield header, data[position:piece_end].replace(b"\n", b"").replace(b"\r", b"")
+            position = piece_end
+
+
+def _iterate_fasta_records(fasta, block_size=_BLOCK_SIZE):
+
+    """(header, sequence) for each record of a FASTA stream; one record is held in memory at a time."""
+
+    header, pieces = None, []
+    for piece_header, piece in _iterate_fasta_pieces(fasta, block_size):
+        if piece is None:
+            if header is not None:
+                yield header, b"".join(pieces)
+            header, pieces = piece_header, []
+        else:
+            pieces.append(piece)
+
+    if header is not None:
+        yield header, b"".join(pieces)
+
+
+def _iterate_fasta_windows(fasta, window_size, overlap=0, block_size=_BLOCK_SIZE):
+
+    """
+    Split each record of a FASTA stream into windows of `window_size` bases, extended by
+    `overlap` bases (as in `_define_genome_chunks`).
+
+    Returns:
+    --------
+    windows
+        (name, window_start, window_sequence); name is the first word of the header and
+        window_start is 0-based.
+        type: generator of (str, int, bytes)
+    """
+
+    name, window_start, buffer = None, 0, bytearray()
+    for header, piece in _iterate_fasta_pieces(fasta, block_size):
+        if piece is None:
+            if buffer:
+                yield name, window_start, bytes(buffer)
+            name, window_start, buffer = (header.split() or [""])[0], 0, bytearray()
+            continue
+        buffer += piece
+        while len(buffer) >= window_size + overlap:
+            yield name, window_start, bytes(buffer[: window_size + overlap])
+            del buffer[:window_size]
+            window_start += window_size
+
+    if buffer:
+        yield name, window_start, bytes(buffer)
+
+
+def _write_fasta_lines(out_file, sequence, line_width=_LINE_WIDTH):
+
+    """
+    Write a sequence to a binary file handle, wrapped at `line_width` bases (0: no wrapping).
+
+    Notes:
+    ------
+    (1) A long sequence can be written in consecutive blocks, provided each block but
+        the last is a multiple of `line_width` bases long.
+    """
+
+    if not sequence:
+        return
+
+    if not line_width:
+        out_file.write(sequence + b"\n")
+        return
+
+    out_file.write(
+        b"\n".join([sequence[line_start : line_start + line_width] for line_start in range(0, len(sequence), line_width)])
+        + b"\n"
+    )
+
+
+def _write_fasta_record(out_file, header, sequence, line_width=_LINE_WIDTH):
+
+    """
+    Write one record to a binary file handle, wrapping the sequence at `line_width` bases.
+
+    Parameters:
+    -----------
+    header
+        Header line, without ">".
+        type: str
+
+    sequence
+        type: bytes
+    """
+
+    out_file.write(b">" + header.encode() + b"\n")
+    if not line_width:
+        _write_fasta_lines(out_file, sequence, line_width)
+        return
+
+    # one block of lines at a time, to bound the size of each write
+    block_size = line_width * 2 ** 16
+    for block_start in range(0, len(sequence), block_size):
+        _write_fasta_lines(out_file, sequence[block_start : block_start + block_size], line_width)
@@ -4,6 +4,13 @@
 # --------------- #
 from Bio import SeqIO
 
+
+# local imports #
+# ------------- #
+from .._utility_functions._instrumentation import _instrumented, _stage
+
+
+@_instrumented("fetch_chromosome")
 def _fetch_chromosome_sequence(ref_seq_path, query_chromosome, return_length=False):
 
     """
@@ -34,10 +41,12 @@ def _fetch_chromosome_sequence(ref_seq_path, query_chromosome, return_length=Fal
     (1) if return_length is true, a list is returned to avoid setting two outputs.
     """
 
-    for record in SeqIO.parse(ref_seq_path, "fasta"):
+    with _stage("fasta_parse") as stage:
+        for record in SeqIO.parse(ref_seq_path, "fasta"):
+            stage.count(len(record))
 
-        if record.description.split()[0] == query_chromosome:
-            chromosome_reference_seq = str(record.seq)
+            if record.description.split()[0] == query_chromosome:
+                chromosome_reference_seq = str(record.seq)
 
     if return_length:
         return [chromosome_reference_seq, len(chromosome_reference_seq)]
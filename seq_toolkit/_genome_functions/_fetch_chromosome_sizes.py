@@ -0,0 +1,38 @@
+# _fetch_chromosome_sizes.py
+
+__module_name__ = "_fetch_chromosome_sizes.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+# local imports #
+# ------------- #
+from ._fasta_index import _load_fasta_index
+
+
+def _fetch_chromosome_sizes(ref_seq_path):
+
+    """
+    Get the length of every chromosome in a reference genome.
+
+    Parameters:
+    -----------
+    ref_seq_path [ required ]
+        Path to a reference genome fasta file.
+        type: str
+
+    Returns:
+    --------
+    ChromSizes
+        Chromosome lengths, keyed by chromosome name (in file order).
+        type: dict
+
+    Notes:
+    ------
+    (1) If a FASTA index (`ref_seq_path` + ".fai") exists, lengths are read from it
+        directly. Otherwise, the fasta file is indexed in one streaming pass.
+    """
+
+    FastaIndex = _load_fasta_index(ref_seq_path)
+
+    return {chromosome: record.length for chromosome, record in FastaIndex.items()}
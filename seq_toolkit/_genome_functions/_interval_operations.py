@@ -0,0 +1,524 @@
+
+__module_name__ = "_interval_operations.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(
+    [
+        "vinyard@g.harvard.edu",
+    ]
+)
+
+
+# package imports #
+# --------------- #
+import numpy as np
+import pandas as pd
+
+
+def _sort_intervals(starts, ends):
+
+    """Sort intervals by start; returns the sorted starts, ends and the sorting permutation."""
+
+    order = np.argsort(starts, kind="stable")
+
+    return starts[order], ends[order], order
+
+
+def _coordinate_arrays(df):
+
+    """Start and End of every row of `df`, in row order, as int64 arrays."""
+
+    return df["Start"].to_numpy(dtype=np.int64), df["End"].to_numpy(dtype=np.int64)
+
+
+def _as_interval_arrays(df):
+
+    """
+    Sort a DataFrame of features by start position and return int64 coordinate arrays.
+
+    Parameters:
+    -----------
+    df
+        Features of a single chromosome. Requires the standard notation: df[['Start', 'End']]
+        type: pandas.DataFrame
+
+    Returns:
+    --------
+    starts, ends, order
+        Sorted start and end positions and the permutation that sorts `df`.
+    """
+
+    return _sort_intervals(*_coordinate_arrays(df))
+
+
+def _merge_intervals(starts, ends):
+
+    """
+    Merge overlapping and book-ended intervals in a single sweep.
+
+    Parameters:
+    -----------
+    starts, ends
+        Interval boundaries, sorted by start.
+        type: numpy.ndarray
+
+    Returns:
+    --------
+    merged_starts, merged_ends
+        Disjoint, sorted intervals.
+        type: numpy.ndarray
+
+    Notes:
+    ------
+    (1) A new merged interval begins wherever a start lies beyond the running maximum
+        of all preceding ends. Book-ended intervals are merged, as in `pyranges.cluster`.
+    """
+
+    if len(starts) == 0:
+        return starts.copy(), ends.copy()
+
+    running_end = np.maximum.accumulate(ends)
+    is_new = np.empty(len(starts), dtype=bool)
+    is_new[0] = True
+    is_new[1:] = starts[1:] > running_end[:-1]
+
+    first = np.flatnonzero(is_new)
+    last = np.append(first[1:], len(starts)) - 1
+
+    return starts[first], running_end[last]
+
+
+def _intersect_sorted(starts, ends, merged_starts, merged_ends):
+
+    """
+    Overlap a set of intervals with a disjoint, sorted set of intervals.
+
+    Parameters:
+    -----------
+    starts, ends
+        Query intervals (any order).
+        type: numpy.ndarray
+
+    merged_starts, merged_ends
+        Disjoint, sorted target intervals (e.g. the output of `_merge_intervals`).
+        type: numpy.ndarray
+
+    Returns:
+    --------
+    query_idx, overlap_starts, overlap_ends
+        Index of the query interval each overlapping segment came from and the segment boundaries.
+        type: numpy.ndarray
+
+    Notes:
+    ------
+    (1) Since the targets are disjoint and sorted, the targets overlapping a query are
+        a contiguous block located with two binary searches.
+    """
+
+    first = np.searchsorted(merged_ends, starts, side="right")
+    stop = np.searchsorted(merged_starts, ends, side="left")
+    n_hits = np.maximum(stop - first, 0)
+
+    query_idx = np.repeat(np.arange(len(starts)), n_hits)
+    block_offset = np.arange(n_hits.sum()) - np.repeat(np.cumsum(n_hits) - n_hits, n_hits)
+    target_idx = np.repeat(first, n_hits) + block_offset
+
+    overlap_starts = np.maximum(starts[query_idx], merged_starts[target_idx])
+    overlap_ends = np.minimum(ends[query_idx], merged_ends[target_idx])
+    nonempty = overlap_starts < overlap_ends
+
+    return query_idx[nonempty], overlap_starts[nonempty], overlap_ends[nonempty]
+
+
+def _gaps(merged_starts, merged_ends, chrom_size=None):
+
+    """
+    Complement of a disjoint, sorted set of intervals over [0, chrom_size).
+
+    If `chrom_size` is None, the final gap extends to the largest representable position.
+    """
+
+    if chrom_size is None:
+        chrom_size = np.iinfo(np.int64).max
+
+    gap_starts = np.append(0, merged_ends)
+    gap_ends = np.append(merged_starts, chrom_size)
+    keep = gap_starts < gap_ends
+
+    return gap_starts[keep], gap_ends[keep]
+
+
+def _closest_sorted(starts, ends, target_starts, target_ends):
+
+    """
+    For each query interval, find the nearest target interval.
+
+    Parameters:
+    -----------
+    starts, ends
+        Query intervals (any order).
+        type: numpy.ndarray
+
+    target_starts, target_ends
+        Target intervals, sorted by start. Need not be disjoint.
+        type: numpy.ndarray
+
+    Returns:
+    --------
+    target_idx, distance
+        Index (into the sorted targets) of the closest target and the number of bases
+        separating it from the query; overlapping features have distance 0.
+
+    Notes:
+    ------
+    (1) Upstream candidate: among targets starting before the query ends, the one
+        reaching furthest right (a running maximum over the sorted ends).
+    (2) Downstream candidate: the first target starting at or after the query end.
+    (3) If both candidates are equally close, the upstream one is reported. Of several
+        overlapping targets, only the upstream candidate is reported.
+    """
+
+    n_targets = len(target_starts)
+    running_end = np.maximum.accumulate(target_ends)
+    running_argmax = np.maximum.accumulate(
+        np.where(target_ends == running_end, np.arange(n_targets), 0)
+    )
+
+    downstream = np.searchsorted(target_starts, ends, side="left")
+    upstream = downstream - 1
+
+    has_upstream = upstream >= 0
+    has_downstream = downstream < n_targets
+
+    upstream_idx = running_argmax[np.maximum(upstream, 0)]
+    upstream_dist = np.maximum(starts - running_end[np.maximum(upstream, 0)], 0)
+    upstream_dist = np.where(has_upstream, upstream_dist, np.iinfo(np.int64).max)
+
+    downstream_idx = np.minimum(downstream, n_targets - 1)
+    downstream_dist = target_starts[downstream_idx] - ends
+    downstream_dist = np.where(has_downstream, downstream_dist, np.iinfo(np.int64).max)
+
+    use_upstream = upstream_dist <= downstream_dist
+    target_idx = np.where(use_upstream, upstream_idx, downstream_idx)
+    distance = np.where(use_upstream, upstream_dist, downstream_dist)
+
+    return target_idx, distance
+
+
+def _iterate_chromosomes(df, other=None):
+
+    """
+    Yield (chromosome, df_idx, other_idx) for every chromosome in `df`: the positions of its
+    rows in `df` and in `other` (None if `other` has no features on it).
+    """
+
+    other_groups = {} if other is None else other.groupby("Chromosome", sort=False, observed=True).indices
+
+    for chromosome, df_idx in df.groupby("Chromosome", sort=False, observed=True).indices.items():
+        yield chromosome, df_idx, other_groups.get(chromosome)
+
+
+def _features_frame(chromosomes, starts, ends):
+
+    """"""
+
+    return pd.DataFrame(
+        {
+            "Chromosome": chromosomes,
+            "Start": np.asarray(starts, dtype=np.int64),
+            "End": np.asarray(ends, dtype=np.int64),
+        }
+    )
+
+
+def _concat_features(frames):
+
+    """"""
+
+    if len(frames) == 0:
+        return _features_frame([], [], [])
+
+    return pd.concat(frames).reset_index(drop=True)
+
+
+def _carry_columns(df, row_idx, starts, ends):
+
+    """
+    Rows `row_idx` of `df`, with every column carried through and new Start and End
+    positions; in the row order of `df`, then by Start.
+    """
+
+    row_idx, starts, ends = np.concatenate(row_idx), np.concatenate(starts), np.concatenate(ends)
+    order = np.lexsort([starts, row_idx])
+
+    features_df = df.iloc[row_idx[order]].reset_index(drop=True)
+    features_df["Start"] = starts[order]
+    features_df["End"] = ends[order]
+
+    return features_df
+
+
+def _empty_positions():
+
+    """"""
+
+    return [np.empty(0, dtype=np.int64)]
+
+
+def _intersect_features(df, other_df):
+
+    """
+    Portions of each feature in `df` that overlap any feature in `other_df`.
+
+    Parameters:
+    -----------
+    df, other_df
+        Requires the standard notation: df[['Chromosome', 'Start', 'End']]
+        type: pandas.DataFrame
+
+    Returns:
+    --------
+    intersected_df
+        Every column of `df`, with Start and End trimmed to the overlap; in the row order
+        of `df` (a feature overlapping several separate features of `other_df` yields one
+        row per overlap, by Start).
+        type: pandas.DataFrame
+
+    Notes:
+    ------
+    (1) `other_df` is merged first, so its own columns are not carried through: an overlap
+        may span several of its features.
+    """
+
+    starts, ends = _coordinate_arrays(df)
+    other_starts, other_ends = _coordinate_arrays(other_df)
+
+    row_idx, overlap_starts, overlap_ends = _empty_positions(), _empty_positions(), _empty_positions()
+    for chromosome, df_idx, other_idx in _iterate_chromosomes(df, other_df):
+        if other_idx is None:
+            continue
+        merged_starts, merged_ends = _merge_intervals(
+            *_sort_intervals(other_starts[other_idx], other_ends[other_idx])[:2]
+        )
+        query_idx, chrom_starts, chrom_ends = _intersect_sorted(
+            starts[df_idx], ends[df_idx], merged_starts, merged_ends
+        )
+        row_idx.append(df_idx[query_idx])
+        overlap_starts.append(chrom_starts)
+        overlap_ends.append(chrom_ends)
+
+    return _carry_columns(df, row_idx, overlap_starts, overlap_ends)
+
+
+def _subtract_features(df, other_df, remove_overlapping=False):
+
+    """
+    Remove the bases covered by `other_df` from each feature in `df`.
+
+    Parameters:
+    -----------
+    df, other_df
+        Requires the standard notation: df[['Chromosome', 'Start', 'End']]
+        type: pandas.DataFrame
+
+    remove_overlapping
+        If True, drop any feature overlapping `other_df` entirely rather than
+        trimming it (e.g. blacklist filtering).
+        type: bool
+        default: False
+
+    Returns:
+    --------
+    subtracted_df
+        Every column of `df`, with Start and End trimmed; in the row order of `df`
+        (a feature split by `other_df` yields one row per remaining piece, by Start).
+        type: pandas.DataFrame
+    """
+
+    starts, ends = _coordinate_arrays(df)
+    other_starts, other_ends = _coordinate_arrays(other_df)
+
+    row_idx, kept_starts, kept_ends = _empty_positions(), _empty_positions(), _empty_positions()
+    for chromosome, df_idx, other_idx in _iterate_chromosomes(df, other_df):
+        chrom_starts, chrom_ends = starts[df_idx], ends[df_idx]
+        if other_idx is None:
+            query_idx = np.arange(len(df_idx))
+        else:
+            merged_starts, merged_ends = _merge_intervals(
+                *_sort_intervals(other_starts[other_idx], other_ends[other_idx])[:2]
+            )
+            if remove_overlapping:
+                keep = np.ones(len(df_idx), dtype=bool)
+                keep[_intersect_sorted(chrom_starts, chrom_ends, merged_starts, merged_ends)[0]] = False
+                query_idx = np.flatnonzero(keep)
+            else:
+                gap_starts, gap_ends = _gaps(merged_starts, merged_ends)
+                query_idx, chrom_starts, chrom_ends = _intersect_sorted(
+                    chrom_starts, chrom_ends, gap_starts, gap_ends
+                )
+                row_idx.append(df_idx[query_idx])
+                kept_starts.append(chrom_starts)
+                kept_ends.append(chrom_ends)
+                continue
+        row_idx.append(df_idx[query_idx])
+        kept_starts.append(chrom_starts[query_idx])
+        kept_ends.append(chrom_ends[query_idx])
+
+    return _carry_columns(df, row_idx, kept_starts, kept_ends)
+
+
+def _complement_features(df, chrom_sizes):
+
+    """
+    Regions of each chromosome not covered by any feature in `df`.
+
+    Parameters:
+    -----------
+    df
+        Requires the standard notation: df[['Chromosome', 'Start', 'End']]
+        type: pandas.DataFrame
+
+    chrom_sizes
+        Chromosome lengths, keyed by chromosome name. Chromosomes without
+        features are returned whole.
+        type: dict
+
+    Returns:
+    --------
+    complement_df
+        type: pandas.DataFrame
+    """
+
+    groups = dict(tuple(df.groupby("Chromosome", sort=False)))
+
+    frames = []
+    for chromosome, chrom_size in chrom_sizes.items():
+        if chromosome in groups:
+            merged_starts, merged_ends = _merge_intervals(
+                *_as_interval_arrays(groups[chromosome])[:2]
+            )
+        else:
+            merged_starts = merged_ends = np.empty(0, dtype=np.int64)
+        gap_starts, gap_ends = _gaps(
+            np.minimum(merged_starts, chrom_size), np.minimum(merged_ends, chrom_size), chrom_size
+        )
+        frames.append(_features_frame(chromosome, gap_starts, gap_ends))
+
+    return _concat_features(frames)
+
+
+def _closest_features(df, other_df):
+
+    """
+    Report the nearest feature of `other_df` for each feature in `df`.
+
+    Parameters:
+    -----------
+    df, other_df
+        Requires the standard notation: df[['Chromosome', 'Start', 'End']]
+        type: pandas.DataFrame
+
+    Returns:
+    --------
+    closest_df
+        Every column of `df`, then every column of `other_df` but Chromosome, suffixed
+        "_b" (e.g. 'Start_b', 'End_b', 'Name_b'), then 'Distance'; in the row order of `df`.
+        Features on chromosomes absent from `other_df` are dropped.
+        type: pandas.DataFrame
+
+    Notes:
+    ------
+    (1) One feature of `other_df` is reported per feature; see `_closest_sorted` for how
+        it is chosen among equally close features.
+    """
+
+    starts, ends = _coordinate_arrays(df)
+    other_starts, other_ends = _coordinate_arrays(other_df)
+
+    row_idx, target_rows, distances = _empty_positions(), _empty_positions(), _empty_positions()
+    for chromosome, df_idx, other_idx in _iterate_chromosomes(df, other_df):
+        if other_idx is None:
+            continue
+        target_starts, target_ends, target_order = _sort_intervals(other_starts[other_idx], other_ends[other_idx])
+        target_idx, distance = _closest_sorted(starts[df_idx], ends[df_idx], target_starts, target_ends)
+        row_idx.append(df_idx)
+        target_rows.append(other_idx[target_order[target_idx]])
+        distances.append(distance)
+
+    row_idx, target_rows, distances = np.concatenate(row_idx), np.concatenate(target_rows), np.concatenate(distances)
+    order = np.argsort(row_idx, kind="stable")
+
+    closest_df = pd.concat(
+        [
+            df.iloc[row_idx[order]].reset_index(drop=True),
+            other_df.drop(columns="Chromosome").iloc[target_rows[order]].reset_index(drop=True).add_suffix("_b"),
+        ],
+        axis=1,
+    )
+    closest_df["Distance"] = distances[order]
+
+    return closest_df
+
+
+def _merge_sorted_feature_chunks(chunks):
+
+    """
+    Merge a stream of features sorted by chromosome, then start (e.g. `sort -k1,1 -k2,2n`),
+    holding only one chunk in memory at a time.
+
+    Parameters:
+    -----------
+    chunks
+        DataFrames, in stream order. Requires the standard notation: df[['Chromosome', 'Start', 'End']]
+        type: iterable of pandas.DataFrame
+
+    Returns:
+    --------
+    merged_chunks
+        Merged features (overlapping and book-ended features are merged, as in `_merge_intervals`).
+        type: generator of pandas.DataFrame
+
+    Notes:
+    ------
+    (1) The last merged interval of each chunk is held back, since features in the next
+        chunk may extend it.
+    (2) Raises a ValueError if the stream is not sorted.
+    """
+
+    finished_chromosomes = set()
+    chromosome, carry_start, carry_end = None, None, None
+    for chunk_df in chunks:
+        if len(chunk_df) == 0:
+            continue
+        chromosomes = chunk_df["Chromosome"].to_numpy()
+        starts = chunk_df["Start"].to_numpy(dtype=np.int64)
+        ends = chunk_df["End"].to_numpy(dtype=np.int64)
+        run_bounds = np.flatnonzero(chromosomes[1:] != chromosomes[:-1]) + 1
+
+        frames = []
+        for run_start, run_end in zip(np.append(0, run_bounds), np.append(run_bounds, len(chromosomes))):
+            run_starts, run_ends = starts[run_start:run_end], ends[run_start:run_end]
+            if chromosomes[run_start] == chromosome:
+                run_starts, run_ends = np.append(carry_start, run_starts), np.append(carry_end, run_ends)
+            else:
+                if chromosome is not None:
+                    frames.append(_features_frame(chromosome, [carry_start], [carry_end]))
+                    finished_chromosomes.add(chromosome)
+                chromosome = chromosomes[run_start]
+                if chromosome in finished_chromosomes:
+                    raise ValueError(
+                        "Features must be sorted by chromosome, then start (e.g. sort -k1,1 -k2,2n). "
+                        "Got: {} after other chromosomes.".format(chromosome)
+                    )
+            if np.any(run_starts[1:] < run_starts[:-1]):
+                raise ValueError(
+                    "Features must be sorted by chromosome, then start (e.g. sort -k1,1 -k2,2n). "
+                    "Got: unsorted starts on {}.".format(chromosome)
+                )
+            merged_starts, merged_ends = _merge_intervals(run_starts, run_ends)
+            frames.append(_features_frame(chromosome, merged_starts[:-1], merged_ends[:-1]))
+            carry_start, carry_end = merged_starts[-1], merged_ends[-1]
+
+        yield _concat_features(frames)
+
+    if chromosome is not None:
+        yield _features_frame(chromosome, [carry_start], [carry_end])
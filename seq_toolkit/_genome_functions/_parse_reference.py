@@ -11,6 +11,12 @@ import os
 import pandas as pd
 
 
+# local imports #
+# ------------- #
+from .._utility_functions._instrumentation import _instrumented, _stage
+
+
+@_instrumented("parse_reference")
 def _parse_reference(reference_directory):
     
     """
@@ -40,10 +46,16 @@ def _parse_reference(reference_directory):
 
     if os.path.exists(gtf_tsv):
         print("Loading GTF annotation file from {}...\n".format(gtf_tsv))
-        gtf = pd.read_csv(gtf_tsv, sep="\t")
+        with _stage("gtf_load") as stage:
+            gtf = pd.read_csv(gtf_tsv, sep="\t")
+            stage.count(len(gtf))
     else:
         print("Loading GTF annotation file from {}...\n".format(gtf_path))
-        gtf = read_gtf(gtf_path)
+        with _stage("gtf_load") as stage:
+            gtf = read_gtf(gtf_path)
+            stage.count(len(gtf))
+        # gene / transcript ids are kept (when present) for `extract_transcripts`
+        id_columns = [column for column in ["gene_id", "transcript_id"] if column in gtf.columns]
         gtf[["seqname",
                  "feature",
                  "gene_type",
@@ -51,6 +63,6 @@ def _parse_reference(reference_directory):
                  "start",
                  "end",
                  "strand",
-                 "exon_number",]].to_csv(gtf_tsv, sep="\t", index=False)
+                 "exon_number",] + id_columns].to_csv(gtf_tsv, sep="\t", index=False)
         
     return gtf, ref_genome_path
\ No newline at end of file
@@ -0,0 +1,324 @@
+
+# _FMIndex.py
+
+__module_name__ = "_FMIndex.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+# import packages #
+# --------------- #
+import json
+import numpy as np
+import os
+
+
+# local imports #
+# ------------- #
+from ._format_motif_hits import _format_motif_hits
+from .._sequence_functions._encode_sequence import _build_translation_table, _translate_sequence
+from .._sequence_functions._SequenceManipulation import _reverse_complement_bytes
+
+
+# text alphabet: end-of-text sentinel, strand separator, A, C, G, T, any other base
+_END, _SEPARATOR = 0, 1
+_N_SYMBOLS = 7
+_TEXT_CODES = {"A": 2, "C": 3, "G": 4, "T": 5}
+_TEXT_TABLE = _build_translation_table(_TEXT_CODES, default=6)
+_COMPLEMENT_CODES = np.array([_END, _SEPARATOR, 5, 4, 3, 2, 6], dtype=np.uint8)
+
+_CHECKPOINT_INTERVAL = 128
+_PACKED_SYMBOLS = 21  # 21 x 3 bits fit in a uint64
+_INDEX_FILES = ["bwt", "suffix_array", "occ_checkpoints", "C"]
+
+
+def _is_palindrome(motif):
+
+    """Whether an exact motif is its own reverse complement (e.g. GAATTC)."""
+
+    motif = motif.upper().encode("ascii")
+
+    return motif == _reverse_complement_bytes(motif)
+
+
+def _encode_text(sequence):
+
+    """Encode `sequence` + separator + reverse complement + end-of-text sentinel."""
+
+    forward = _translate_sequence(sequence, _TEXT_TABLE)
+    reverse_complement = _COMPLEMENT_CODES[forward[::-1]]
+
+    return np.concatenate([forward, [_SEPARATOR], reverse_complement, [_END]]).astype(np.uint8)
+
+
+def _build_suffix_array(text):
+
+    """
+    Suffix array by prefix doubling, vectorized with numpy.
+
+    Parameters:
+    -----------
+    text
+        Encoded text, ending with a unique smallest sentinel.
+        type: numpy.ndarray (uint8)
+
+    Returns:
+    --------
+    suffix_array
+        type: numpy.ndarray (int64)
+
+    Notes:
+    ------
+    (1) Suffixes are first ranked by their leading 21 symbols (packed into one uint64),
+        then by doubling prefix lengths with a lexsort over (rank[i], rank[i + k]) until
+        all ranks are distinct: O(n log n) per round, with few rounds on genomic text.
+    """
+
+    n = len(text)
+    n_packed = min(_PACKED_SYMBOLS, n)
+
+    # +1 so that positions beyond the end of the text (0) sort before any symbol
+    padded = np.zeros(n + n_packed, dtype=np.uint64)
+    padded[:n] = text.astype(np.uint64) + 1
+
+    key = np.zeros(n, dtype=np.uint64)
+    for j in range(n_packed):
+        key = (key << np.uint64(3)) | padded[j : j + n]
+
+    rank = np.unique(key, return_inverse=True)[1].astype(np.int64).ravel()
+
+    k = n_packed
+    while rank.max() < n - 1:
+        second = np.full(n, -1, dtype=np.int64)
+        second[: n - k] = rank[k:]
+        order = np.lexsort([second, rank])
+        rank_sorted, second_sorted = rank[order], second[order]
+        is_new = np.empty(n, dtype=bool)
+        is_new[0] = True
+        is_new[1:] = (rank_sorted[1:] != rank_sorted[:-1]) | (second_sorted[1:] != second_sorted[:-1])
+        rank = np.empty(n, dtype=np.int64)
+        rank[order] = np.cumsum(is_new) - 1
+        k *= 2
+
+    suffix_array = np.empty(n, dtype=np.int64)
+    suffix_array[rank] = np.arange(n)
+
+    return suffix_array
+
+
+class _FMIndex:
+
+    """
+    Full-text (FM) index over a sequence and its reverse complement, for repeated exact queries.
+
+    Parameters:
+    -----------
+    sequence
+        Sequence to be indexed. If None, an index may be loaded with `FMIndex.load`.
+        type: str
+        default: None
+
+    checkpoint_interval
+        Spacing of the stored occurrence counts; trades memory for query time.
+        type: int
+        default: 128
+
+    Notes:
+    ------
+    (1) `count` uses FM-index backward search: one rank lookup per motif base, each a
+        checkpoint read plus a scan of at most `checkpoint_interval` BWT symbols. Query
+        time is proportional to the motif length, not the sequence length.
+    (2) `locate` reads hit positions directly from the stored suffix array, so it adds
+        time proportional to the number of hits.
+    (3) Because the reverse complement is indexed too, a single backward search finds the
+        motif on both strands.
+    (4) `save` writes .npy files that `load` memory-maps: an index is built once and
+        shared, read-only, across processes and sessions.
+    """
+
+    def __init__(self, sequence=None, checkpoint_interval=_CHECKPOINT_INTERVAL):
+
+        self.checkpoint_interval = checkpoint_interval
+        if sequence is not None:
+            self._build(sequence)
+
+    def _build(self, sequence):
+
+        """"""
+
+        self.sequence_length = len(sequence)
+        text = _encode_text(sequence)
+        self.suffix_array = _build_suffix_array(text)
+        if len(text) < 2 ** 31:
+            self.suffix_array = self.suffix_array.astype(np.int32)
+
+        self.bwt = text[self.suffix_array - 1]
+
+        symbol_counts = np.bincount(text, minlength=_N_SYMBOLS)
+        self.C = np.concatenate([[0], np.cumsum(symbol_counts)[:-1]]).astype(np.int64)
+
+        interval = self.checkpoint_interval
+        n_checkpoints = len(self.bwt) // interval + 1
+        # block_counts[k]: symbol counts in bwt[(k - 1) * interval : k * interval]
+        block_ids = np.arange(len(self.bwt)) // interval + 1
+        in_checkpoint = block_ids < n_checkpoints
+        block_counts = np.bincount(
+            block_ids[in_checkpoint] * _N_SYMBOLS + self.bwt[in_checkpoint],
+            minlength=n_checkpoints * _N_SYMBOLS,
+        ).reshape(n_checkpoints, _N_SYMBOLS)
+        self.occ_checkpoints = np.cumsum(block_counts, axis=0)
+
+    def _occ(self, symbol, position):
+
+        """Number of occurrences of `symbol` in bwt[:position]."""
+
+        checkpoint = position // self.checkpoint_interval
+        block_start = checkpoint * self.checkpoint_interval
+
+        return int(self.occ_checkpoints[checkpoint, symbol]) + int(
+            np.count_nonzero(self.bwt[block_start:position] == symbol)
+        )
+
+    def _backward_search(self, motif):
+
+        """Suffix-array interval [low, high) of suffixes prefixed by `motif`."""
+
+        motif = motif.upper()
+        if len(motif) == 0 or set(motif) - set(_TEXT_CODES):
+            raise ValueError("FMIndex queries require exact {A, C, G, T} motifs. Got: {}".format(motif))
+
+        low, high = 0, len(self.bwt)
+        for base in reversed(motif):
+            symbol = _TEXT_CODES[base]
+            low = int(self.C[symbol]) + self._occ(symbol, low)
+            high = int(self.C[symbol]) + self._occ(symbol, high)
+            if low >= high:
+                return 0, 0
+
+        return low, high
+
+    def count(self, motif, collapse_palindromes=True):
+
+        """
+        Number of occurrences of a motif on both strands.
+
+        Parameters:
+        -----------
+        motif
+            Exact motif composed of {A, C, G, T}.
+            type: str
+
+        collapse_palindromes
+            As in `query_motif`: count each site of a motif that is its own reverse
+            complement (e.g. GAATTC) once rather than once per strand.
+            type: bool
+            default: True
+
+        Returns:
+        --------
+        n_hits
+            type: int
+        """
+
+        low, high = self._backward_search(motif)
+
+        if collapse_palindromes and _is_palindrome(motif):
+            # each site is found once on the sequence and once on its reverse complement
+            return (high - low) // 2
+
+        return high - low
+
+    def locate(self, motif, motif_key=False, sort=True, as_frame=True, collapse_palindromes=True):
+
+        """
+        All occurrences of a motif on both strands.
+
+        Parameters:
+        -----------
+        motif
+            Exact motif composed of {A, C, G, T}.
+            type: str
+
+        motif_key, sort, as_frame
+            As in `query_motif`.
+
+        collapse_palindromes
+            As in `query_motif`: report each site of a motif that is its own reverse
+            complement once, on the "+" strand.
+            type: bool
+            default: True
+
+        Returns:
+        --------
+        motif_df
+            Same layout and coordinate convention as `query_motif`.
+            type: pandas.DataFrame or numpy.ndarray
+        """
+
+        if not motif_key:
+            motif_key = "motif"
+
+        low, high = self._backward_search(motif)
+        text_positions = np.asarray(self.suffix_array[low:high], dtype=np.int64)
+
+        # positions past the separator lie on the reverse complement
+        motif_length, n = len(motif), self.sequence_length
+        is_minus = text_positions > n
+        if collapse_palindromes and _is_palindrome(motif):
+            text_positions, is_minus = text_positions[~is_minus], is_minus[~is_minus]
+        starts = np.where(is_minus, 2 * n + 1 - text_positions - motif_length, text_positions)
+
+        return _format_motif_hits(starts, starts + motif_length, is_minus, motif_key, sort, as_frame)
+
+    def save(self, index_dir):
+
+        """
+        Write the index to `index_dir` (created if needed) as .npy files.
+
+        Parameters:
+        -----------
+        index_dir
+            type: str
+        """
+
+        os.makedirs(index_dir, exist_ok=True)
+        for name in _INDEX_FILES:
+            np.save(os.path.join(index_dir, "{}.npy".format(name)), getattr(self, name))
+
+        with open(os.path.join(index_dir, "index.json"), "w") as meta:
+            json.dump(
+                {"sequence_length": self.sequence_length, "checkpoint_interval": self.checkpoint_interval},
+                meta,
+            )
+
+    @classmethod
+    def load(cls, index_dir, mmap_mode="r"):
+
+        """
+        Load an index written by `save`, memory-mapping its arrays.
+
+        Parameters:
+        -----------
+        index_dir
+            type: str
+
+        mmap_mode
+            Passed to `numpy.load`. Use None to read the arrays into memory.
+            type: str
+            default: "r"
+
+        Returns:
+        --------
+        fm_index
+            type: FMIndex
+        """
+
+        with open(os.path.join(index_dir, "index.json")) as meta:
+            Meta = json.load(meta)
+
+        fm_index = cls(checkpoint_interval=Meta["checkpoint_interval"])
+        fm_index.sequence_length = Meta["sequence_length"]
+        for name in _INDEX_FILES:
+            setattr(fm_index, name, np.load(os.path.join(index_dir, "{}.npy".format(name)), mmap_mode=mmap_mode))
+
+        return fm_index
@@ -0,0 +1,307 @@
+
+# _MotifSearcher.py
+
+__module_name__ = "_MotifSearcher.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+# import packages #
+# --------------- #
+from collections import namedtuple
+from functools import lru_cache
+import numpy as np
+import regex
+import _sre
+
+try:
+    from re import _parser as _sre_parse  # Python >= 3.11
+except ImportError:
+    import sre_parse as _sre_parse
+
+
+# local imports #
+# ------------- #
+from ._format_motif_hits import _format_motif_hits
+from ._isolate_constraining_sequence_motif import _isolate_constraining_sequence_motif
+from ._mismatch_search import _match_iupac_motif_mismatches, _match_iupac_motif_edit_distance
+from ._iupac_motif import (
+    _is_iupac_motif,
+    _compile_iupac_motif,
+    _order_match_columns,
+    _reverse_complement_masks,
+    _match_iupac_motif,
+)
+from .._sequence_functions._encode_sequence import _encode_sequence, _as_bytes
+from .._sequence_functions._SequenceManipulation import _reverse_complement_bytes
+from .._utility_functions._instrumentation import _instrumented, _stage
+
+
+_COMPILED_MOTIF_CACHE_SIZE = 4096
+
+_CompiledMotif = namedtuple(
+    "_CompiledMotif",
+    ["motif", "searchable_motif", "masks", "rc_masks", "columns", "rc_columns", "pattern", "is_palindrome"],
+)
+
+
+@lru_cache(maxsize=_COMPILED_MOTIF_CACHE_SIZE)
+def _compile_motif(motif, trim_n=True):
+
+    """
+    Compile a motif once; repeated calls with the same motif and options hit the LRU cache.
+
+    Parameters:
+    -----------
+    motif
+        type: str
+
+    trim_n
+        Strip flanking Ns from the motif before compiling (as in `isolate_searchable_motif`).
+        type: bool
+        default: True
+
+    Returns:
+    --------
+    compiled_motif
+        IUPAC motifs are compiled to forward and reverse-complement bitmasks and flagged
+        if they are their own reverse complement (e.g. GAATTC); any other motif is
+        compiled as a `regex` pattern.
+        type: _CompiledMotif
+    """
+
+    searchable_motif = _isolate_constraining_sequence_motif(motif) if trim_n else motif
+
+    if _is_iupac_motif(searchable_motif):
+        masks = _compile_iupac_motif(searchable_motif)
+        rc_masks = _reverse_complement_masks(masks)
+        columns = _order_match_columns(masks)
+        rc_columns = _order_match_columns(rc_masks)
+        for array in [masks, rc_masks, columns, rc_columns]:
+            array.setflags(write=False)
+        is_palindrome = bool(np.array_equal(masks, rc_masks))
+        return _CompiledMotif(motif, searchable_motif, masks, rc_masks, columns, rc_columns, None, is_palindrome)
+
+    return _CompiledMotif(
+        motif, searchable_motif, None, None, None, None, regex.compile(searchable_motif), False
+    )
+
+
+def _max_match_length(compiled_motif):
+
+    """
+    Length of the longest possible match of a compiled motif; None if unbounded (e.g. GA[AT]+TC)
+    or if the pattern uses `regex`-only syntax that the standard library parser cannot size.
+    """
+
+    if compiled_motif.pattern is None:
+        return len(compiled_motif.searchable_motif)
+
+    try:
+        max_length = _sre_parse.parse(compiled_motif.searchable_motif).getwidth()[1]
+    except _sre_parse.error:
+        return None
+
+    return None if max_length >= _sre.MAXREPEAT else int(max_length)
+
+
+def _regex_match_spans(pattern, sequence):
+
+    """"""
+
+    spans = np.fromiter(
+        (position for match in pattern.finditer(sequence, overlapped=True) for position in match.span()),
+        dtype=np.int64,
+    )
+
+    return spans[0::2], spans[1::2]
+
+
+class _MotifSearcher:
+
+    """
+    Search one motif on both strands of many sequences, compiling it only once.
+
+    Parameters:
+    -----------
+    motif
+        String to be searched. IUPAC nucleotide codes are supported.
+        type: str
+
+    motif_key
+        String to indicate the column title for the motif start, end and strand.
+        type: str
+        default: "motif"
+
+    trim_n
+        Strip flanking Ns from the motif before searching.
+        type: bool
+        default: True
+
+    max_mismatches
+        Report hits within this distance of the motif. Hits carry a "{motif_key}.mismatches"
+        column. Requires an IUPAC motif.
+        type: int
+        default: 0
+
+    distance
+        One of: "hamming" (substitutions only), "edit" (substitutions and indels; see
+        `_match_iupac_motif_edit_distance`). Only used if `max_mismatches` > 0.
+        type: str
+        default: "hamming"
+
+    collapse_palindromes
+        For motifs that are their own reverse complement (e.g. GAATTC), report each site
+        once, on the "+" strand. If False, each site is reported on both strands.
+        type: bool
+        default: True
+
+    Notes:
+    ------
+    (1) Compiled motifs (including their reverse complement) are held in a bounded
+        LRU cache keyed by motif and options, shared by every `MotifSearcher` and by
+        `query_motif`.
+    (2) For IUPAC motifs, the minus strand is searched by matching the motif's reverse
+        complement on the forward sequence; no reverse-complemented copy of the
+        sequence is built.
+    (3) Reverse-complement palindromic motifs are matched once: the minus strand would
+        yield exactly the same sites.
+    """
+
+    def __init__(
+        self,
+        motif,
+        motif_key=False,
+        trim_n=True,
+        max_mismatches=0,
+        distance="hamming",
+        collapse_palindromes=True,
+    ):
+
+        if not motif_key:
+            motif_key = "motif"
+
+        self.compiled_motif = _compile_motif(motif, trim_n)
+        self.motif = motif
+        self.searchable_motif = self.compiled_motif.searchable_motif
+        self.motif_length = len(self.searchable_motif)
+        self.max_match_length = _max_match_length(self.compiled_motif)
+
+        self.motif_key = motif_key
+        self.max_mismatches = max_mismatches
+        self.distance = distance
+        self.is_palindrome = self.compiled_motif.is_palindrome
+        self.collapse_palindromes = collapse_palindromes
+
+        if max_mismatches and self.compiled_motif.pattern is not None:
+            raise ValueError("Mismatch-tolerant search requires an IUPAC motif. Got: {}".format(motif))
+        if not distance in ["hamming", "edit"]:
+            raise ValueError("distance must be one of: 'hamming', 'edit'. Got: {}".format(distance))
+
+    def _scan_spans(self, sequence):
+
+        """Forward-strand 0-based, half-open [start, end) spans of plus- and minus-strand hits."""
+
+        compiled_motif = self.compiled_motif
+        if compiled_motif.pattern is None:
+            with _stage("iupac_scan") as stage:
+                encoded_sequence = _encode_sequence(sequence)
+                pos_starts = _match_iupac_motif(
+                    encoded_sequence, compiled_motif.masks, columns=compiled_motif.columns
+                )
+                if self.is_palindrome:
+                    neg_starts = pos_starts[:0] if self.collapse_palindromes else pos_starts.copy()
+                else:
+                    neg_starts = _match_iupac_motif(
+                        encoded_sequence, compiled_motif.rc_masks, columns=compiled_motif.rc_columns
+                    )
+                stage.count(len(sequence))
+            return pos_starts, pos_starts + self.motif_length, neg_starts, neg_starts + self.motif_length
+
+        # soft-masked (lower-case) bases are matched as upper case, as by the IUPAC matcher
+        sequence_bytes = _as_bytes(sequence).upper()
+        sequence = sequence_bytes.decode("ascii")
+        rc_sequence = _reverse_complement_bytes(sequence_bytes).decode("ascii")
+        with _stage("regex_scan") as stage:
+            pos_starts, pos_ends = _regex_match_spans(compiled_motif.pattern, sequence)
+            rc_starts, rc_ends = _regex_match_spans(compiled_motif.pattern, rc_sequence)
+            stage.count(2 * len(sequence))
+        return pos_starts, pos_ends, len(sequence) - rc_ends, len(sequence) - rc_starts
+
+    def _scan_mismatch_spans(self, sequence):
+
+        """As `_scan_spans`, for mismatch-tolerant search; also returns per-strand mismatch counts."""
+
+        with _stage("mismatch_scan") as stage:
+            encoded_sequence = _encode_sequence(sequence)
+            strand_masks = [self.compiled_motif.masks]
+            if not self.is_palindrome:
+                strand_masks.append(self.compiled_motif.rc_masks)
+
+            Spans = []
+            for masks in strand_masks:
+                if self.distance == "hamming":
+                    starts, mismatches = _match_iupac_motif_mismatches(encoded_sequence, masks, self.max_mismatches)
+                    Spans.append((starts, starts + self.motif_length, mismatches))
+                else:
+                    ends, mismatches = _match_iupac_motif_edit_distance(encoded_sequence, masks, self.max_mismatches)
+                    Spans.append((np.maximum(ends - self.motif_length, 0), ends, mismatches))
+
+            stage.count(len(sequence))
+
+        if self.is_palindrome:
+            pos_spans = Spans[0]
+            if self.collapse_palindromes:
+                Spans.append(tuple(span[:0] for span in pos_spans))
+            else:
+                Spans.append(tuple(span.copy() for span in pos_spans))
+
+        (pos_starts, pos_ends, pos_mismatches), (neg_starts, neg_ends, neg_mismatches) = Spans
+
+        return pos_starts, pos_ends, neg_starts, neg_ends, pos_mismatches, neg_mismatches
+
+    @_instrumented("MotifSearcher.scan", count=len)
+    def scan(self, sequence, sort=True, as_frame=True):
+
+        """
+        Find all occurrences of the motif on both strands of a sequence.
+
+        Parameters:
+        -----------
+        sequence
+            type: str
+
+        sort
+            Sort hits by start. If False, plus-strand hits precede minus-strand hits.
+            type: bool
+            default: True
+
+        as_frame
+            Return a pandas DataFrame. If False, return a numpy structured array.
+            type: bool
+            default: True
+
+        Returns:
+        --------
+        motif_hits
+            Same layout and coordinate convention as `query_motif`. For edit-distance
+            search, spans are nominal: (end - motif length, end).
+            type: pandas.DataFrame or numpy.ndarray
+        """
+
+        if self.max_mismatches:
+            pos_starts, pos_ends, neg_starts, neg_ends, pos_mismatches, neg_mismatches = self._scan_mismatch_spans(sequence)
+            mismatches = np.concatenate([pos_mismatches, neg_mismatches])
+        else:
+            pos_starts, pos_ends, neg_starts, neg_ends = self._scan_spans(sequence)
+            mismatches = None
+
+        return _format_motif_hits(
+            np.concatenate([pos_starts, neg_starts]),
+            np.concatenate([pos_ends, neg_ends]),
+            np.repeat([False, True], [len(pos_starts), len(neg_starts)]),
+            self.motif_key,
+            sort,
+            as_frame,
+            mismatches=mismatches,
+        )
@@ -0,0 +1,254 @@
+
+# _aho_corasick.py
+
+__module_name__ = "_aho_corasick.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+# import packages #
+# --------------- #
+from array import array
+from collections import deque
+import numpy as np
+
+
+# local imports #
+# ------------- #
+from ._format_motif_hits import _format_motif_hits
+from ._isolate_constraining_sequence_motif import _isolate_constraining_sequence_motif
+from .._sequence_functions._SequenceManipulation import _SequenceManipulation
+from .._sequence_functions._encode_sequence import _as_bytes
+from .._utility_functions._instrumentation import _stage
+
+
+_ALPHABET = "ACGT"
+_N_SYMBOLS = len(_ALPHABET) + 1  # final symbol: any base outside {A, C, G, T}
+_SYMBOL_TABLE = bytes(
+    [_ALPHABET.index(chr(i).upper()) if chr(i).upper() in _ALPHABET else len(_ALPHABET) for i in range(256)]
+)
+
+
+class _AhoCorasickAutomaton:
+
+    """
+    Aho-Corasick automaton over the DNA alphabet, compiled to a dense transition table.
+
+    Parameters:
+    -----------
+    patterns
+        Exact patterns composed of {A, C, G, T}.
+        type: list of str
+
+    Notes:
+    ------
+    (1) Failure links are folded into the transition table after construction, so
+        scanning is a single table lookup per base with no backtracking.
+    (2) Any base outside {A, C, G, T} (e.g. N) returns the automaton to the root.
+    """
+
+    def __init__(self, patterns):
+
+        self.patterns = list(patterns)
+        self.pattern_lengths = np.array([len(pattern) for pattern in self.patterns], dtype=np.int64)
+        self._build_trie()
+        self._build_transitions()
+
+    def _build_trie(self):
+
+        """"""
+
+        self._children = [{}]
+        self._outputs = [[]]
+
+        for pattern_idx, pattern in enumerate(self.patterns):
+            state = 0
+            for base in pattern:
+                symbol = _ALPHABET.index(base)
+                if not symbol in self._children[state]:
+                    self._children.append({})
+                    self._outputs.append([])
+                    self._children[state][symbol] = len(self._children) - 1
+                state = self._children[state][symbol]
+            self._outputs[state].append(pattern_idx)
+
+    def _build_transitions(self):
+
+        """Breadth-first construction of failure links, folded into a dense DFA."""
+
+        n_states = len(self._children)
+        transitions = [0] * (n_states * _N_SYMBOLS)
+        fail = [0] * n_states
+
+        queue = deque()
+        for symbol in range(len(_ALPHABET)):
+            child = self._children[0].get(symbol, 0)
+            transitions[symbol] = child
+            if child:
+                queue.append(child)
+
+        while queue:
+            state = queue.popleft()
+            self._outputs[state] = self._outputs[state] + self._outputs[fail[state]]
+            for symbol in range(len(_ALPHABET)):
+                child = self._children[state].get(symbol)
+                if child is None:
+                    transitions[state * _N_SYMBOLS + symbol] = transitions[fail[state] * _N_SYMBOLS + symbol]
+                else:
+                    fail[child] = transitions[fail[state] * _N_SYMBOLS + symbol]
+                    transitions[state * _N_SYMBOLS + symbol] = child
+                    queue.append(child)
+
+        self._transitions = transitions
+        self._outputs = [tuple(output) for output in self._outputs]
+
+    def scan(self, sequence):
+
+        """
+        Find every (overlapping) occurrence of every pattern in a single pass.
+
+        Parameters:
+        -----------
+        sequence
+            type: str
+
+        Returns:
+        --------
+        pattern_idx, starts
+            Index of the matched pattern and 0-based start position of each hit.
+            type: numpy.ndarray
+        """
+
+        transitions = self._transitions
+        outputs = self._outputs
+
+        # growable, typed (8 bytes / hit) buffers rather than lists of Python ints
+        hit_ends, hit_patterns = array("q"), array("q")
+        state = 0
+        for position, symbol in enumerate(_as_bytes(sequence).translate(_SYMBOL_TABLE)):
+            state = transitions[state * _N_SYMBOLS + symbol]
+            if outputs[state]:
+                for pattern_idx in outputs[state]:
+                    hit_ends.append(position)
+                    hit_patterns.append(pattern_idx)
+
+        pattern_idx = np.frombuffer(hit_patterns, dtype=np.int64)
+        starts = np.frombuffer(hit_ends, dtype=np.int64) + 1 - self.pattern_lengths[pattern_idx]
+
+        return pattern_idx, starts
+
+
+def _format_motif_dict(motifs):
+
+    """Accept a list of motifs (ids are the motifs themselves) or a dict of {motif_id: motif}."""
+
+    if isinstance(motifs, dict):
+        return dict(motifs)
+
+    return {motif: motif for motif in motifs}
+
+
+def _query_motifs_bistrand(
+    sequence, motifs, motif_key=False, verbose=True, sort=True, as_frame=True, collapse_palindromes=True
+):
+
+    """
+    Look for many motifs on both strands of a given DNA sequence in a single pass.
+
+    Parameters:
+    -----------
+    sequence
+        String to be searched for the motifs.
+        type: str
+
+    motifs
+        Motifs to be searched. If a dict, keys are used as motif ids.
+        type: list or dict
+
+    motif_key
+        String to indicate the column title for the motif id, start, end and strand.
+        type: str
+
+    verbose
+        Indicates if messages to the user should be printed or silenced.
+        type: bool
+        default: True
+
+    sort
+        Sort hits by start position, then motif id.
+        type: bool
+        default: True
+
+    as_frame
+        Return a pandas DataFrame. If False, return a numpy structured array.
+        type: bool
+        default: True
+
+    collapse_palindromes
+        Report sites of motifs that are their own reverse complement once, on the "+" strand.
+        type: bool
+        default: True
+
+    Returns:
+    --------
+    motif_df
+        Long-format pandas DataFrame with one row per hit and a "{motif_key}.id" column.
+        Coordinates follow the same convention as `query_motif`.
+        type: pandas.DataFrame or numpy.ndarray
+
+    Notes:
+    ------
+    (1) The reverse complement of each motif is added to the same automaton, so both
+        strands are searched in one pass over the forward sequence; the sequence is
+        never reverse-complemented. A palindromic motif is added only once.
+    (2) Motifs are stripped of flanking Ns. Remaining bases must be exact {A, C, G, T}.
+    """
+
+    if not motif_key:
+        motif_key = "motif"
+
+    MotifDict = _format_motif_dict(motifs)
+    motif_ids = list(MotifDict.keys())
+
+    patterns, pattern_motif, pattern_strand = [], [], []
+    for motif_idx, motif in enumerate(MotifDict.values()):
+        searchable_motif = _isolate_constraining_sequence_motif(motif.upper())
+        if len(searchable_motif) == 0 or set(searchable_motif) - set(_ALPHABET):
+            raise ValueError(
+                "Multi-motif search requires exact {A, C, G, T} motifs. Got: {}".format(motif)
+            )
+        rc_motif = _SequenceManipulation(searchable_motif).reverse_complement()
+        patterns.append(searchable_motif)
+        pattern_motif.append(motif_idx)
+        pattern_strand.append("+")
+        if rc_motif != searchable_motif or not collapse_palindromes:
+            patterns.append(rc_motif)
+            pattern_motif.append(motif_idx)
+            pattern_strand.append("-")
+
+    if verbose:
+        import licorice
+
+        n_motifs = licorice.font_format(str(len(motif_ids)), ["BOLD", "GREEN"])
+        print("Searching both strands of the provided sequence for {} motifs ...".format(n_motifs))
+
+    automaton = _AhoCorasickAutomaton(patterns)
+    with _stage("multi_motif_scan") as stage:
+        pattern_idx, starts = automaton.scan(sequence)
+        stage.count(len(sequence))
+
+    motif_df = _format_motif_hits(
+        starts,
+        starts + automaton.pattern_lengths[pattern_idx],
+        np.array(pattern_strand)[pattern_idx] == "-",
+        motif_key,
+        sort,
+        as_frame,
+        motif_codes=np.array(pattern_motif, dtype=np.int32)[pattern_idx],
+        motif_ids=motif_ids,
+    )
+
+    if verbose:
+        print("\nIdentified {} instances of {} motifs in the provided sequence.".format(len(motif_df), len(motif_ids)))
+
+    return motif_df
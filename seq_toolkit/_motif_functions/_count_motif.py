@@ -0,0 +1,272 @@
+
+# _count_motif.py
+
+__module_name__ = "_count_motif.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+# import packages #
+# --------------- #
+import numpy as np
+import os
+
+
+# local imports #
+# ------------- #
+from ._iupac_motif import _CHUNK_SIZE
+from ._MotifSearcher import _MotifSearcher
+from ._scan_genome_for_motif import _DEFAULT_CHUNK_SIZE, _define_genome_chunks, _map_genome_chunks
+from .._genome_functions._fasta_index import _load_fasta_index, _fetch_region
+from .._utility_functions._instrumentation import _instrumented
+
+
+_STRANDS = ["+", "-"]
+
+
+def _init_strand_counts(sequence_length, window_size):
+
+    """{"+": count, "-": count}, as ints or as one array of per-window counts per strand."""
+
+    if window_size is None:
+        return {strand: 0 for strand in _STRANDS}
+
+    n_windows = -(-sequence_length // window_size)
+
+    return {strand: np.zeros(n_windows, dtype=np.int64) for strand in _STRANDS}
+
+
+def _add_strand_counts(StrandCounts, strand, starts, window_size):
+
+    """Reduce hit start positions into running totals (or per-window counts)."""
+
+    if window_size is None:
+        StrandCounts[strand] += len(starts)
+        return
+
+    if len(starts) == 0:
+        return
+
+    windows = starts // window_size
+    first_window = windows.min()
+    window_counts = np.bincount(windows - first_window)
+    StrandCounts[strand][first_window : first_window + len(window_counts)] += window_counts
+
+
+def _count_chunk(searcher, chunk_seq):
+
+    """Forward-strand start positions of plus- and minus-strand hits in one chunk."""
+
+    if searcher.max_mismatches:
+        pos_starts, _, neg_starts, _, _, _ = searcher._scan_mismatch_spans(chunk_seq)
+    else:
+        pos_starts, _, neg_starts, _ = searcher._scan_spans(chunk_seq)
+
+    return pos_starts, neg_starts
+
+
+def _check_countable(searcher):
+
+    """"""
+
+    if searcher.compiled_motif.pattern is not None or searcher.distance != "hamming":
+        raise ValueError("Counting requires an IUPAC motif and Hamming distance. Got: {}".format(searcher.motif))
+
+
+@_instrumented("count_motif")
+def _count_motif(
+    sequence,
+    motif,
+    window_size=None,
+    trim_n=True,
+    max_mismatches=0,
+    chunk_size=_CHUNK_SIZE,
+    collapse_palindromes=True,
+):
+
+    """
+    Count occurrences of a motif on each strand, in total or per fixed-size window.
+
+    Parameters:
+    -----------
+    sequence
+        type: str
+
+    motif
+        IUPAC motif.
+        type: str
+
+    window_size
+        If passed, count hits per window of this many bases (by hit start position).
+        type: int
+        default: None
+
+    trim_n
+        Strip flanking Ns from the motif before searching.
+        type: bool
+        default: True
+
+    max_mismatches
+        Count hits within this Hamming distance of the motif.
+        type: int
+        default: 0
+
+    chunk_size
+        Number of bases searched at once.
+        type: int
+
+    collapse_palindromes
+        Count each site of a motif that is its own reverse complement once, as "+".
+        type: bool
+        default: True
+
+    Returns:
+    --------
+    StrandCounts
+        {"+": n_hits, "-": n_hits}, or {"+": counts, "-": counts} with one count per window.
+        type: dict
+
+    Notes:
+    ------
+    (1) The sequence is searched in chunks overlapping by (motif length - 1) bases and each
+        chunk's hits are immediately reduced into the counts; hit coordinates are never
+        collected, so memory does not grow with the number of hits.
+    """
+
+    searcher = _MotifSearcher(
+        motif, trim_n=trim_n, max_mismatches=max_mismatches, collapse_palindromes=collapse_palindromes
+    )
+    _check_countable(searcher)
+
+    StrandCounts = _init_strand_counts(len(sequence), window_size)
+    n_positions = len(sequence) - searcher.motif_length + 1
+    for chunk_start in range(0, max(n_positions, 0), chunk_size):
+        chunk_seq = sequence[chunk_start : chunk_start + chunk_size + searcher.motif_length - 1]
+        for strand, starts in zip(_STRANDS, _count_chunk(searcher, chunk_seq)):
+            _add_strand_counts(StrandCounts, strand, starts + chunk_start, window_size)
+
+    return StrandCounts
+
+
+def _count_genome_chunk(
+    ref_seq_path, record, chunk_start, chunk_end, motif, trim_n, max_mismatches, window_size, collapse_palindromes
+):
+
+    """Worker: counts for one window of the reference, as {strand: (first_window, counts)} or {strand: n}."""
+
+    with open(ref_seq_path, "rb") as fasta:
+        chunk_seq = _fetch_region(fasta, record, chunk_start, chunk_end)
+
+    searcher = _MotifSearcher(
+        motif, trim_n=trim_n, max_mismatches=max_mismatches, collapse_palindromes=collapse_palindromes
+    )
+
+    ChunkCounts = {}
+    for strand, starts in zip(_STRANDS, _count_chunk(searcher, chunk_seq)):
+        if window_size is None:
+            ChunkCounts[strand] = len(starts)
+        elif len(starts):
+            windows = (starts + chunk_start) // window_size
+            ChunkCounts[strand] = (windows.min(), np.bincount(windows - windows.min()))
+
+    return record.name, ChunkCounts
+
+
+@_instrumented("count_motif_genome")
+def _count_motif_genome(
+    ref_seq_path,
+    motif,
+    window_size=None,
+    chromosomes=None,
+    trim_n=True,
+    max_mismatches=0,
+    chunk_size=_DEFAULT_CHUNK_SIZE,
+    n_workers=None,
+    collapse_palindromes=True,
+):
+
+    """
+    Count occurrences of a motif on each strand of every chromosome, streaming the reference.
+
+    Parameters:
+    -----------
+    ref_seq_path [ required ]
+        Path to a reference genome fasta file.
+        type: str
+
+    motif [ required ]
+        IUPAC motif, e.g. "CG" for CpG density.
+        type: str
+
+    window_size
+        If passed, count hits per window of this many bases.
+        type: int
+        default: None
+
+    chromosomes
+        Chromosomes to scan. By default, every chromosome in the reference.
+        type: list
+
+    trim_n, max_mismatches, collapse_palindromes
+        As in `count_motif`.
+
+    chunk_size
+        Number of bases read and searched per task.
+        type: int
+        default: 10_000_000
+
+    n_workers
+        Number of worker processes. If 1, chunks are counted in the calling process.
+        type: int
+        default: os.cpu_count()
+
+    Returns:
+    --------
+    GenomeCounts
+        {chromosome: {"+": n_hits or per-window counts, "-": ...}}
+        type: dict
+
+    Notes:
+    ------
+    (1) Chunks are read from disk by each worker, searched and reduced to counts before
+        being returned; at most 2 x `n_workers` chunks are in flight, so memory is bounded
+        by `chunk_size` (plus one count per window).
+    """
+
+    FastaIndex = _load_fasta_index(ref_seq_path)
+    searcher = _MotifSearcher(motif, trim_n=trim_n, max_mismatches=max_mismatches)
+    _check_countable(searcher)
+
+    chunks = _define_genome_chunks(FastaIndex, chunk_size, searcher.motif_length - 1, chromosomes)
+    GenomeCounts = {
+        chromosome: _init_strand_counts(FastaIndex[chromosome].length, window_size)
+        for chromosome, _, _ in chunks
+    }
+
+    if n_workers is None:
+        n_workers = os.cpu_count()
+
+    chunk_args = (
+        (
+            ref_seq_path,
+            FastaIndex[chromosome],
+            chunk_start,
+            chunk_end,
+            motif,
+            trim_n,
+            max_mismatches,
+            window_size,
+            collapse_palindromes,
+        )
+        for chromosome, chunk_start, chunk_end in chunks
+    )
+
+    for chromosome, ChunkCounts in _map_genome_chunks(_count_genome_chunk, chunk_args, n_workers):
+        for strand, chunk_counts in ChunkCounts.items():
+            if window_size is None:
+                GenomeCounts[chromosome][strand] += chunk_counts
+            else:
+                first_window, window_counts = chunk_counts
+                GenomeCounts[chromosome][strand][first_window : first_window + len(window_counts)] += window_counts
+
+    return GenomeCounts
@@ -0,0 +1,290 @@
+
+# _find_crispr_guides.py
+
+__module_name__ = "_find_crispr_guides.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+# import packages #
+# --------------- #
+import numpy as np
+import os
+import pandas as pd
+
+
+# local imports #
+# ------------- #
+from ._iupac_motif import _ANY_BASE, _is_iupac_motif, _compile_iupac_motif, _reverse_complement_masks, _match_iupac_motif
+from ._scan_genome_for_motif import _DEFAULT_CHUNK_SIZE, _define_genome_chunks, _map_genome_chunks
+from .._genome_functions._fasta_index import _load_fasta_index, _fetch_region
+from .._genome_functions._FeatureWriter import _FeatureWriter
+from .._sequence_functions._encode_sequence import _encode_sequence, _build_translation_table, _as_bytes
+from .._utility_functions._instrumentation import _instrumented
+
+
+_PAM_SIDES = ["3prime", "5prime"]
+_COMPLEMENT_TABLE = np.frombuffer(
+    _build_translation_table({"A": ord("T"), "C": ord("G"), "G": ord("C"), "T": ord("A")}, default=ord("N")),
+    dtype=np.uint8,
+)
+_GC_BITMASK = 2 | 4
+
+
+def _check_guide_design(pam, guide_length, pam_side):
+
+    """"""
+
+    if not _is_iupac_motif(pam):
+        raise ValueError("pam must be composed of IUPAC nucleotide codes. Got: {}".format(pam))
+    if guide_length < 1:
+        raise ValueError("guide_length must be positive. Got: {}".format(guide_length))
+    if not pam_side in _PAM_SIDES:
+        raise ValueError("pam_side must be one of: {}. Got: {}".format(", ".join(_PAM_SIDES), pam_side))
+
+
+def _site_offsets(pam_length, guide_length, pam_side):
+
+    """
+    Offsets of the guide and the PAM within a site (guide + PAM, as read on the forward strand).
+
+    Returns:
+    --------
+    (pos_guide, pos_pam), (neg_guide, neg_pam)
+        Offset from the site start, for plus- and minus-strand sites.
+        type: tuple
+    """
+
+    if pam_side == "3prime":
+        return (0, guide_length), (pam_length, 0)
+
+    return (pam_length, 0), (0, guide_length)
+
+
+def _gather_sequences(sequence_bytes, starts, length, is_minus):
+
+    """Sequences of `length` bases at each start, reverse-complemented where `is_minus`."""
+
+    if len(starts) == 0:
+        return np.empty(0, dtype=object)
+
+    sequences = sequence_bytes[starts[:, None] + np.arange(length)]
+    sequences[is_minus] = _COMPLEMENT_TABLE[sequences[is_minus][:, ::-1]]
+
+    return np.ascontiguousarray(sequences).view("S{}".format(length)).ravel().astype(str).astype(object)
+
+
+def _find_guides_in_sequence(sequence, pam="NGG", guide_length=20, pam_side="3prime", offset=0):
+
+    """
+    Enumerate every protospacer adjacent to a PAM, on both strands of a sequence.
+
+    Parameters:
+    -----------
+    sequence
+        type: str
+
+    pam
+        PAM sequence, 5' to 3', in IUPAC nucleotide codes (e.g. "NGG", "NAG", "TTTV").
+        type: str
+        default: "NGG"
+
+    guide_length
+        Protospacer length.
+        type: int
+        default: 20
+
+    pam_side
+        Side of the protospacer on which the PAM lies: "3prime" (Cas9) or "5prime" (Cas12a).
+        type: str
+        default: "3prime"
+
+    offset
+        Added to every reported coordinate, e.g. the position of `sequence` in its chromosome.
+        type: int
+        default: 0
+
+    Returns:
+    --------
+    guide_df
+        One row per guide: start, end (forward-strand, 0-based, half-open protospacer
+        span), guide (5' to 3'), gc (fraction of G/C in the guide), strand and pam (as
+        observed, 5' to 3'). Sorted by start, then strand.
+        type: pandas.DataFrame
+
+    Notes:
+    ------
+    (1) The PAM is matched with the IUPAC bitmask matcher; the minus strand is searched with
+        the reverse-complemented site on the forward sequence.
+    (2) Guides spanning a base other than {A, C, G, T} are not reported.
+    """
+
+    _check_guide_design(pam, guide_length, pam_side)
+
+    pam_masks = _compile_iupac_motif(pam)
+    pam_length = len(pam_masks)
+    any_guide = np.full(guide_length, _ANY_BASE, dtype=np.uint8)
+    if pam_side == "3prime":
+        site_masks = np.concatenate([any_guide, pam_masks])
+    else:
+        site_masks = np.concatenate([pam_masks, any_guide])
+
+    sequence_bytes = np.frombuffer(_as_bytes(sequence).upper(), dtype=np.uint8)
+    encoded_sequence = _encode_sequence(sequence)
+
+    # running counts of unknown and G/C bases: per-guide sums in O(1)
+    unknown_cumsum = np.concatenate([[0], np.cumsum(encoded_sequence == 0, dtype=np.int64)])
+    gc_cumsum = np.concatenate([[0], np.cumsum((encoded_sequence & _GC_BITMASK) != 0, dtype=np.int64)])
+
+    Starts, IsMinus, PamStarts = [], [], []
+    for is_minus, masks, (guide_offset, pam_offset) in zip(
+        [False, True],
+        [site_masks, _reverse_complement_masks(site_masks)],
+        _site_offsets(pam_length, guide_length, pam_side),
+    ):
+        site_starts = _match_iupac_motif(encoded_sequence, masks)
+        guide_starts = site_starts + guide_offset
+        is_known = unknown_cumsum[guide_starts + guide_length] == unknown_cumsum[guide_starts]
+        Starts.append(guide_starts[is_known])
+        PamStarts.append(site_starts[is_known] + pam_offset)
+        IsMinus.append(np.full(is_known.sum(), is_minus))
+
+    starts, pam_starts, is_minus = np.concatenate(Starts), np.concatenate(PamStarts), np.concatenate(IsMinus)
+    order = np.lexsort([is_minus, starts])
+    starts, pam_starts, is_minus = starts[order], pam_starts[order], is_minus[order]
+
+    gc = (gc_cumsum[starts + guide_length] - gc_cumsum[starts]) / guide_length
+
+    return pd.DataFrame(
+        {
+            "start": starts + offset,
+            "end": starts + guide_length + offset,
+            "guide": _gather_sequences(sequence_bytes, starts, guide_length, is_minus),
+            "gc": gc.astype(np.float32),
+            "strand": np.where(is_minus, "-", "+").astype(object),
+            "pam": _gather_sequences(sequence_bytes, pam_starts, pam_length, is_minus),
+        }
+    )
+
+
+def _find_guides_chunk(ref_seq_path, record, chunk_start, chunk_end, pam, guide_length, pam_side):
+
+    """
+    Worker: return the guides starting in [chunk_start, chunk_end) as a BED-like DataFrame.
+
+    The window read from disk is padded by one site length on each side, so that every
+    guide is reported by exactly one chunk, whichever strand its PAM lies on.
+    """
+
+    site_length = guide_length + len(pam)
+    window_start = max(chunk_start - site_length, 0)
+    window_end = min(chunk_end + site_length, record.length)
+    with open(ref_seq_path, "rb") as fasta:
+        window_seq = _fetch_region(fasta, record, window_start, window_end)
+
+    guide_df = _find_guides_in_sequence(window_seq, pam, guide_length, pam_side, offset=window_start)
+    guide_df = guide_df.loc[(guide_df["start"] >= chunk_start) & (guide_df["start"] < chunk_end)]
+    guide_df.insert(0, "chrom", record.name)
+
+    return guide_df.reset_index(drop=True)
+
+
+@_instrumented("find_crispr_guides")
+def _find_crispr_guides(
+    ref_seq_path,
+    out_path,
+    pam="NGG",
+    guide_length=20,
+    pam_side="3prime",
+    chromosomes=None,
+    chunk_size=_DEFAULT_CHUNK_SIZE,
+    n_workers=None,
+    out_format=None,
+):
+
+    """
+    Enumerate CRISPR guides (protospacer + PAM sites) on both strands of a reference genome.
+
+    Parameters:
+    -----------
+    ref_seq_path [ required ]
+        Path to a reference genome fasta file.
+        type: str
+
+    out_path [ required ]
+        Path to the output Parquet or BED file.
+        type: str
+
+    pam
+        PAM sequence, 5' to 3', in IUPAC nucleotide codes: e.g. "NGG" (SpCas9), "NAG",
+        "TTTV" (Cas12a, with `pam_side="5prime"`).
+        type: str
+        default: "NGG"
+
+    guide_length
+        Protospacer length.
+        type: int
+        default: 20
+
+    pam_side
+        Side of the protospacer on which the PAM lies: "3prime" (Cas9) or "5prime" (Cas12a).
+        type: str
+        default: "3prime"
+
+    chromosomes
+        Chromosomes to scan. By default, every chromosome in the reference.
+        type: list
+        default: None
+
+    chunk_size
+        Number of bases scanned per task; bounds the memory used by each worker.
+        type: int
+        default: 10_000_000
+
+    n_workers
+        Number of worker processes. If 1, chunks are scanned in the calling process.
+        type: int
+        default: os.cpu_count()
+
+    out_format
+        One of: "parquet", "bed". Inferred from `out_path` if not passed.
+        type: str
+        default: None
+
+    Returns:
+    --------
+    n_guides
+        Number of guides written to `out_path`.
+        type: int
+
+    Notes:
+    ------
+    (1) Columns: chrom, start, end (forward-strand, 0-based, half-open protospacer span),
+        guide (5' to 3' on its strand), gc (G/C fraction), strand, pam (as observed).
+    (2) As in `scan_genome`, the reference is read in windows of `chunk_size` bases (padded
+        by one site length on each side), each worker reads its own window from disk and
+        results are written in reference order as they complete. Memory is bounded by
+        `chunk_size` per worker, not by chromosome or genome size. Output is sorted by
+        chrom (in reference order), start and strand, independently of `chunk_size`.
+    (3) N is matched by the PAM's N positions only; guides spanning an N (e.g. in
+        assembly gaps) are not reported.
+    """
+
+    _check_guide_design(pam, guide_length, pam_side)
+
+    FastaIndex = _load_fasta_index(ref_seq_path)
+    chunks = _define_genome_chunks(FastaIndex, chunk_size, 0, chromosomes)
+
+    if n_workers is None:
+        n_workers = os.cpu_count()
+
+    chunk_args = (
+        (ref_seq_path, FastaIndex[chromosome], chunk_start, chunk_end, pam, guide_length, pam_side)
+        for chromosome, chunk_start, chunk_end in chunks
+    )
+
+    with _FeatureWriter(out_path, out_format) as writer:
+        for guide_df in _map_genome_chunks(_find_guides_chunk, chunk_args, n_workers):
+            writer.write(guide_df)
+
+    return writer.n_written
@@ -6,11 +6,6 @@ __author__ = ", ".join(["Michael E. Vinyard"])
 __email__ = ", ".join(["vinyard@g.harvard.edu",])
 
 
-# import packages #
-# --------------- #
-import licorice
-
-
 def _isolate_constraining_sequence_motif(motif, verbose=False):
     
     """
@@ -32,14 +27,16 @@ def _isolate_constraining_sequence_motif(motif, verbose=False):
         words, only N values that are on the end of sequences are
         trimmed.
     
-    (2) To be implemented: Searchable motif generatator that subs 
-        {A, G, T, C} for N wherein N is searchable / in the middle 
-        of the motif. 
+    (2) Internal N values, and any other IUPAC degenerate base, are
+        searched as such by `query_motif`, which compiles the motif
+        to a per-position bitmask (see `_iupac_motif.py`).
     """
     
     motif_ = motif.strip('N')
     
     if verbose:
+        import licorice
+
         m = licorice.font_format(motif, ['BOLD'])
         m_=licorice.font_format(motif_, ['BOLD', 'GREEN'])
         print("\nSearching for motif: {} (from {})\n".format(m_, m,))
@@ -0,0 +1,164 @@
+
+# _iupac_motif.py
+
+__module_name__ = "_iupac_motif.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+# import packages #
+# --------------- #
+import numpy as np
+
+
+# local imports #
+# ------------- #
+from .._sequence_functions._encode_sequence import _BASE_BITMASKS, _encode_sequence
+
+
+_IUPAC_CODES = {
+    "A": "A",
+    "C": "C",
+    "G": "G",
+    "T": "T",
+    "R": "AG",
+    "Y": "CT",
+    "S": "CG",
+    "W": "AT",
+    "K": "GT",
+    "M": "AC",
+    "B": "CGT",
+    "D": "AGT",
+    "H": "ACT",
+    "V": "ACG",
+    "N": "ACGT",
+}
+
+_IUPAC_BITMASKS = {
+    code: sum(_BASE_BITMASKS[base] for base in bases) for code, bases in _IUPAC_CODES.items()
+}
+
+# complementing a bitmask reverses its bit order: A (1) <-> T (8), C (2) <-> G (4)
+_COMPLEMENT_BITMASKS = np.array(
+    [int("{:04b}".format(mask)[::-1], 2) for mask in range(16)], dtype=np.uint8
+)
+
+_ANY_BASE = _IUPAC_BITMASKS["N"]
+_CHUNK_SIZE = 2 ** 22
+
+
+def _is_iupac_motif(motif):
+
+    """Check that a motif is composed only of IUPAC nucleotide codes."""
+
+    return len(motif) > 0 and set(motif.upper()) <= set(_IUPAC_CODES)
+
+
+def _compile_iupac_motif(motif):
+
+    """
+    Compile a motif to one bitmask per position.
+
+    Parameters:
+    -----------
+    motif
+        Motif composed of IUPAC nucleotide codes: {A, C, G, T, R, Y, S, W, K, M, B, D, H, V, N}
+        type: str
+
+    Returns:
+    --------
+    motif_masks
+        The set of bases accepted at each position, encoded as in `_encode_sequence`.
+        type: numpy.ndarray (uint8)
+    """
+
+    return np.array([_IUPAC_BITMASKS[code] for code in motif.upper()], dtype=np.uint8)
+
+
+def _reverse_complement_masks(motif_masks):
+
+    """Reverse complement of a compiled motif."""
+
+    return _COMPLEMENT_BITMASKS[motif_masks[::-1]]
+
+
+def _order_match_columns(motif_masks):
+
+    """Motif columns that constrain the match (not N), ordered from most to least specific."""
+
+    columns = np.flatnonzero(motif_masks != _ANY_BASE)
+    n_bits = np.array([bin(mask).count("1") for mask in motif_masks[columns]], dtype=np.int64)
+
+    return columns[np.argsort(n_bits, kind="stable")]
+
+
+def _match_iupac_motif(encoded_sequence, motif_masks, chunk_size=_CHUNK_SIZE, columns=None):
+
+    """
+    Find every (overlapping) position at which a compiled motif matches.
+
+    Parameters:
+    -----------
+    encoded_sequence
+        Output of `_encode_sequence`.
+        type: numpy.ndarray (uint8)
+
+    motif_masks
+        Output of `_compile_iupac_motif`.
+        type: numpy.ndarray (uint8)
+
+    chunk_size
+        Number of candidate positions evaluated at once; bounds temporary memory.
+        type: int
+
+    columns
+        Precomputed output of `_order_match_columns(motif_masks)`. Computed if not passed.
+        type: numpy.ndarray
+
+    Returns:
+    --------
+    starts
+        0-based start positions of each match.
+        type: numpy.ndarray (int64)
+
+    Notes:
+    ------
+    (1) A position matches when, for every motif column, the sequence base is one of
+        the bases accepted by that column (`sequence & mask != 0`).
+    (2) N columns accept any base and are skipped. The remaining columns are checked from
+        most to least specific: the first over the whole chunk, then each subsequent
+        column only on the surviving candidates. Degenerate motifs therefore cost about
+        the same as exact motifs of the same specificity, with no expansion into
+        alternative patterns.
+    (3) Sequence positions that are not {A, C, G, T} only match N motif columns.
+    """
+
+    motif_length = len(motif_masks)
+    n_positions = len(encoded_sequence) - motif_length + 1
+    if n_positions <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    if columns is None:
+        columns = _order_match_columns(motif_masks)
+    if len(columns) == 0:
+        return np.arange(n_positions, dtype=np.int64)
+
+    first_column, first_mask = columns[0], motif_masks[columns[0]]
+
+    Hits = []
+    for chunk_start in range(0, n_positions, chunk_size):
+        chunk_stop = min(chunk_start + chunk_size, n_positions)
+        window = encoded_sequence[chunk_start + first_column : chunk_stop + first_column]
+        candidates = np.flatnonzero(window & first_mask) + chunk_start
+        for column in columns[1:]:
+            candidates = candidates[(encoded_sequence[candidates + column] & motif_masks[column]) != 0]
+        Hits.append(candidates)
+
+    return np.concatenate(Hits).astype(np.int64, copy=False)
+
+
+def _search_iupac_motif(sequence, motif):
+
+    """Convenience wrapper: encode `sequence`, compile `motif` and return match start positions."""
+
+    return _match_iupac_motif(_encode_sequence(sequence), _compile_iupac_motif(motif))
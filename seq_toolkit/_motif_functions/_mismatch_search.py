@@ -0,0 +1,155 @@
+
+# _mismatch_search.py
+
+__module_name__ = "_mismatch_search.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+# import packages #
+# --------------- #
+from array import array
+import numpy as np
+
+
+# local imports #
+# ------------- #
+from ._iupac_motif import _ANY_BASE, _CHUNK_SIZE
+
+
+def _match_iupac_motif_mismatches(encoded_sequence, motif_masks, max_mismatches, chunk_size=_CHUNK_SIZE):
+
+    """
+    Find every position at which a compiled motif matches with at most `max_mismatches` substitutions.
+
+    Parameters:
+    -----------
+    encoded_sequence
+        Output of `_encode_sequence`.
+        type: numpy.ndarray (uint8)
+
+    motif_masks
+        Output of `_compile_iupac_motif`.
+        type: numpy.ndarray (uint8)
+
+    max_mismatches
+        Maximum Hamming distance.
+        type: int
+
+    chunk_size
+        Number of candidate positions evaluated at once; bounds temporary memory.
+        type: int
+
+    Returns:
+    --------
+    starts, mismatches
+        0-based start position and number of mismatches of each hit.
+        type: numpy.ndarray (int64), numpy.ndarray (uint8)
+
+    Notes:
+    ------
+    (1) Mismatch counts are accumulated one motif column at a time, bit-parallel over all
+        positions of a chunk (`sequence & mask == 0` marks a mismatch). The first
+        `max_mismatches` + 1 columns are evaluated densely; from then on, positions
+        exceeding `max_mismatches` are dropped and the remaining columns are gathered only
+        at surviving candidates. Work is linear in sequence length for a fixed motif.
+    (2) N columns never mismatch. Sequence bases other than {A, C, G, T} mismatch every
+        other column.
+    """
+
+    motif_length = len(motif_masks)
+    n_positions = len(encoded_sequence) - motif_length + 1
+    if n_positions <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint8)
+
+    columns = np.flatnonzero(motif_masks != _ANY_BASE)
+    dense_columns, sparse_columns = columns[: max_mismatches + 1], columns[max_mismatches + 1 :]
+
+    Starts, Mismatches = [], []
+    for chunk_start in range(0, n_positions, chunk_size):
+        chunk_stop = min(chunk_start + chunk_size, n_positions)
+        mismatches = np.zeros(chunk_stop - chunk_start, dtype=np.uint8)
+        for column in dense_columns:
+            window = encoded_sequence[chunk_start + column : chunk_stop + column]
+            mismatches += (window & motif_masks[column]) == 0
+        candidates = np.flatnonzero(mismatches <= max_mismatches)
+        mismatches = mismatches[candidates]
+        candidates += chunk_start
+        for column in sparse_columns:
+            mismatches += (encoded_sequence[candidates + column] & motif_masks[column]) == 0
+            keep = mismatches <= max_mismatches
+            candidates, mismatches = candidates[keep], mismatches[keep]
+        Starts.append(candidates)
+        Mismatches.append(mismatches)
+
+    return np.concatenate(Starts).astype(np.int64, copy=False), np.concatenate(Mismatches)
+
+
+def _match_iupac_motif_edit_distance(encoded_sequence, motif_masks, max_distance):
+
+    """
+    Find every end position at which a compiled motif aligns with edit distance <= `max_distance`.
+
+    Parameters:
+    -----------
+    encoded_sequence
+        Output of `_encode_sequence`.
+        type: numpy.ndarray (uint8)
+
+    motif_masks
+        Output of `_compile_iupac_motif`.
+        type: numpy.ndarray (uint8)
+
+    max_distance
+        Maximum edit (Levenshtein) distance.
+        type: int
+
+    Returns:
+    --------
+    ends, distances
+        0-based, exclusive end position and edit distance of each hit.
+        type: numpy.ndarray (int64), numpy.ndarray (uint8)
+
+    Notes:
+    ------
+    (1) Myers' (1999) bit-vector algorithm: one column of the dynamic-programming matrix is
+        updated per sequence base with a constant number of word operations, i.e. linear
+        in sequence length for motifs of up to 64 bp.
+    (2) Every end position within `max_distance` is reported, so an exact match is typically
+        flanked by neighboring hits of distance 1, ..., `max_distance`.
+    (3) This is a per-base loop; Hamming-distance search is much faster when indels are
+        not of interest.
+    """
+
+    motif_length = len(motif_masks)
+    full = (1 << motif_length) - 1
+    high_bit = 1 << (motif_length - 1)
+
+    # Peq[code]: bit j is set if the sequence base `code` is accepted by motif column j
+    Peq = [0] * 16
+    for code in range(16):
+        for column, mask in enumerate(motif_masks.tolist()):
+            if code & mask:
+                Peq[code] |= 1 << column
+
+    Pv, Mv, score = full, 0, motif_length
+    ends, distances = array("q"), array("q")
+    for position, code in enumerate(encoded_sequence.tobytes()):
+        Eq = Peq[code]
+        Xv = Eq | Mv
+        Xh = (((Eq & Pv) + Pv) ^ Pv) | Eq
+        Ph = Mv | (~(Xh | Pv) & full)
+        Mh = Pv & Xh
+        if Ph & high_bit:
+            score += 1
+        elif Mh & high_bit:
+            score -= 1
+        Ph = (Ph << 1) & full
+        Mh = (Mh << 1) & full
+        Pv = Mh | (~(Xv | Ph) & full)
+        Mv = Ph & Xv
+        if score <= max_distance:
+            ends.append(position + 1)
+            distances.append(score)
+
+    return np.frombuffer(ends, dtype=np.int64), np.frombuffer(distances, dtype=np.int64).astype(np.uint8)
@@ -0,0 +1,368 @@
+
+# _pwm_scan.py
+
+__module_name__ = "_pwm_scan.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+# import packages #
+# --------------- #
+import numpy as np
+import pandas as pd
+
+
+# local imports #
+# ------------- #
+from ._format_motif_hits import _format_motif_hits
+from .._sequence_functions._encode_sequence import _encode_sequence_indices
+from .._utility_functions._instrumentation import _instrumented
+
+
+_CHUNK_SIZE = 2 ** 22
+_UNIFORM_BACKGROUND = (0.25, 0.25, 0.25, 0.25)
+_PWM_BASES = "ACGT"
+
+
+def _read_jaspar(jaspar_path):
+
+    """
+    Read position frequency matrices from a JASPAR-format file.
+
+    Parameters:
+    -----------
+    jaspar_path
+        Path to a JASPAR file, e.g.:
+
+            >MA0004.1 Arnt
+            A  [ 4 19  0  0  0  0 ]
+            C  [16  0 20  0  0  0 ]
+            G  [ 0  1  0 20  0 20 ]
+            T  [ 0  0  0  0 20  0 ]
+
+        type: str
+
+    Returns:
+    --------
+    MatrixDict
+        {"MA0004.1 Arnt": count matrix of shape (motif_length, 4), columns A, C, G, T}
+        type: dict
+    """
+
+    MatrixDict = {}
+    name, rows = None, []
+    with open(jaspar_path) as jaspar:
+        for line in jaspar:
+            line = line.strip()
+            if line.startswith(">"):
+                name, rows = line[1:].strip(), []
+            elif line:
+                counts = line.split("[")[-1].split("]")[0].split()
+                rows.append([float(count) for count in counts])
+                if len(rows) == 4:
+                    MatrixDict[name] = np.array(rows).T
+
+    return MatrixDict
+
+
+def _position_matrix(matrix, orientation=None):
+
+    """
+    Matrix of shape (motif_length, 4), columns A, C, G, T.
+
+    Parameters:
+    -----------
+    matrix
+        type: numpy.ndarray or pandas.DataFrame
+
+    orientation
+        One of: "positions" (rows are motif positions; shape (motif_length, 4)), "bases"
+        (rows are A, C, G, T, as in JASPAR; shape (4, motif_length)). By default, a DataFrame
+        labelled A, C, G, T is oriented by its labels; otherwise, a matrix with 4 rows and
+        any other number of columns is read as "bases", and any other (including 4 x 4) as
+        "positions".
+        type: str
+        default: None
+    """
+
+    if not orientation in [None, "positions", "bases"]:
+        raise ValueError("orientation must be one of: 'positions', 'bases'. Got: {}".format(orientation))
+
+    if orientation is None and isinstance(matrix, pd.DataFrame):
+        if list(matrix.columns) == list(_PWM_BASES):
+            orientation = "positions"
+        elif list(matrix.index) == list(_PWM_BASES):
+            orientation = "bases"
+
+    matrix = np.asarray(matrix, dtype=np.float64)
+    if orientation is None:
+        orientation = "bases" if matrix.shape[0] == 4 and matrix.shape[1] != 4 else "positions"
+    if orientation == "bases":
+        matrix = matrix.T
+
+    if matrix.ndim != 2 or matrix.shape[1] != 4:
+        raise ValueError("Matrices must have one column per base (A, C, G, T). Got: shape {}".format(matrix.shape))
+
+    return matrix
+
+
+def _log_odds_matrix(matrix, background=_UNIFORM_BACKGROUND, pseudocount=0.8, log_odds=False, orientation=None):
+
+    """
+    Convert a count or frequency matrix to a log2-odds score matrix.
+
+    Parameters:
+    -----------
+    matrix
+        Shape (motif_length, 4) with columns A, C, G, T, or (4, motif_length) (as in JASPAR);
+        see `orientation`.
+        type: numpy.ndarray or pandas.DataFrame
+
+    background
+        Background base frequencies (A, C, G, T).
+        type: tuple
+        default: (0.25, 0.25, 0.25, 0.25)
+
+    pseudocount
+        Added to each count, split according to the background.
+        type: float
+        default: 0.8
+
+    log_odds
+        Indicates `matrix` already holds log-odds scores and should be used as-is.
+        type: bool
+        default: False
+
+    orientation
+        "positions" or "bases"; see `_position_matrix`. Pass it explicitly for 4 x 4
+        (bases x positions) matrices, which cannot be told apart by shape.
+        type: str
+        default: None
+
+    Returns:
+    --------
+    score_matrix
+        Shape (motif_length, 5): log2-odds for A, C, G, T and -inf for any other base,
+        so that windows spanning an N are never reported.
+        type: numpy.ndarray (float64)
+    """
+
+    matrix = _position_matrix(matrix, orientation)
+
+    if not log_odds:
+        background = np.asarray(background, dtype=np.float64)
+        probabilities = matrix + pseudocount * background
+        probabilities = probabilities / probabilities.sum(axis=1, keepdims=True)
+        matrix = np.log2(probabilities / background)
+
+    return np.hstack([matrix, np.full([len(matrix), 1], -np.inf)])
+
+
+def _reverse_complement_score_matrix(score_matrix):
+
+    """Score matrix of the reverse complement: reverse positions and swap A<->T, C<->G."""
+
+    return score_matrix[::-1][:, [3, 2, 1, 0, 4]]
+
+
+class _CompiledPWM:
+
+    """
+    A score matrix prepared for pruned, chunked scanning on one strand.
+
+    Notes:
+    ------
+    (1) Columns are visited in decreasing order of their score range. After each column,
+        positions whose partial score plus the best achievable remainder is below the
+        threshold are dropped; the remaining columns are gathered only at surviving
+        positions.
+    """
+
+    def __init__(self, score_matrix, threshold):
+
+        self.score_matrix = score_matrix
+        self.motif_length = len(score_matrix)
+        self.threshold = threshold
+
+        finite_matrix = score_matrix[:, :4]
+        spread = finite_matrix.max(axis=1) - finite_matrix.min(axis=1)
+        self.columns = np.argsort(-spread, kind="stable")
+
+        column_max = finite_matrix.max(axis=1)[self.columns]
+        self.remaining_max = np.append(np.cumsum(column_max[::-1])[::-1], 0.0)[1:]
+
+    def scan(self, encoded_sequence, chunk_size=_CHUNK_SIZE):
+
+        """
+        Parameters:
+        -----------
+        encoded_sequence
+            Output of `_encode_sequence_indices`.
+            type: numpy.ndarray (uint8)
+
+        Returns:
+        --------
+        starts, scores
+            0-based start position and score of every window scoring >= threshold.
+            type: numpy.ndarray
+        """
+
+        n_positions = len(encoded_sequence) - self.motif_length + 1
+        if n_positions <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        score_matrix, columns, remaining_max = self.score_matrix, self.columns, self.remaining_max
+        threshold = self.threshold
+
+        Starts, Scores = [], []
+        for chunk_start in range(0, n_positions, chunk_size):
+            chunk_stop = min(chunk_start + chunk_size, n_positions)
+            first = columns[0]
+            scores = score_matrix[first][encoded_sequence[chunk_start + first : chunk_stop + first]]
+            candidates = np.flatnonzero(scores + remaining_max[0] >= threshold)
+            scores = scores[candidates]
+            candidates += chunk_start
+            for k, column in enumerate(columns[1:], start=1):
+                scores += score_matrix[column][encoded_sequence[candidates + column]]
+                keep = scores + remaining_max[k] >= threshold
+                candidates, scores = candidates[keep], scores[keep]
+            Starts.append(candidates)
+            Scores.append(scores)
+
+        return np.concatenate(Starts).astype(np.int64, copy=False), np.concatenate(Scores)
+
+
+def _resolve_threshold(score_matrix, threshold, relative_threshold):
+
+    """Absolute score threshold, from either an absolute or a relative (0-1) threshold."""
+
+    if threshold is not None:
+        return threshold
+
+    finite_matrix = score_matrix[:, :4]
+    min_score, max_score = finite_matrix.min(axis=1).sum(), finite_matrix.max(axis=1).sum()
+
+    return min_score + relative_threshold * (max_score - min_score)
+
+
+def _format_matrix_dict(matrices):
+
+    """Accept a single matrix (id: "pwm") or a dict of {matrix_id: matrix}."""
+
+    if isinstance(matrices, dict):
+        return dict(matrices)
+
+    return {"pwm": matrices}
+
+
+@_instrumented("scan_pwm", count=len)
+def _scan_pwm(
+    sequence,
+    matrices,
+    threshold=None,
+    relative_threshold=0.8,
+    background=_UNIFORM_BACKGROUND,
+    pseudocount=0.8,
+    log_odds=False,
+    motif_key=False,
+    sort=True,
+    as_frame=True,
+    chunk_size=_CHUNK_SIZE,
+    orientation=None,
+):
+
+    """
+    Score one or many position weight matrices on both strands of a DNA sequence.
+
+    Parameters:
+    -----------
+    sequence
+        type: str
+
+    matrices
+        A count, frequency or log-odds matrix of shape (motif_length, 4), or a dict of
+        {matrix_id: matrix} (e.g. the output of `read_jaspar`).
+        type: numpy.ndarray, pandas.DataFrame or dict
+
+    threshold
+        Absolute log2-odds score threshold. Overrides `relative_threshold`.
+        type: float
+        default: None
+
+    relative_threshold
+        Threshold as a fraction of each matrix's score range (0 = minimum, 1 = maximum).
+        type: float
+        default: 0.8
+
+    background, pseudocount, log_odds
+        Passed to the log-odds conversion (see `_log_odds_matrix`).
+
+    motif_key
+        String to indicate the column titles.
+        type: str
+        default: "motif"
+
+    sort, as_frame
+        As in `query_motif`.
+
+    chunk_size
+        Number of positions scored at once; bounds temporary memory.
+        type: int
+
+    orientation
+        One of: "positions" ((motif_length, 4) matrices), "bases" ((4, motif_length)
+        matrices, as in JASPAR). By default, inferred from labels or shape; a 4 x 4
+        matrix is read as (motif_length, 4). See `_position_matrix`.
+        type: str
+        default: None
+
+    Returns:
+    --------
+    motif_df
+        Same layout and coordinate convention as `query_motif`, with a "{motif_key}.score"
+        column and, if a dict of matrices is passed, a "{motif_key}.id" column.
+        type: pandas.DataFrame or numpy.ndarray
+
+    Notes:
+    ------
+    (1) The sequence is encoded once as uint8 indices; each score is a per-position
+        gather-and-sum over the score matrix.
+    (2) The minus strand is scored with the reverse-complemented matrix on the forward
+        sequence; no reverse-complemented copy of the sequence is built.
+    (3) Windows containing a base other than {A, C, G, T} are not scored.
+    """
+
+    if not motif_key:
+        motif_key = "motif"
+
+    MatrixDict = _format_matrix_dict(matrices)
+    encoded_sequence = _encode_sequence_indices(sequence)
+
+    Starts, Ends, IsMinus, Codes, Scores = [], [], [], [], []
+    for matrix_idx, matrix in enumerate(MatrixDict.values()):
+        score_matrix = _log_odds_matrix(matrix, background, pseudocount, log_odds, orientation)
+        matrix_threshold = _resolve_threshold(score_matrix, threshold, relative_threshold)
+        for is_minus, strand_matrix in [
+            (False, score_matrix),
+            (True, _reverse_complement_score_matrix(score_matrix)),
+        ]:
+            starts, scores = _CompiledPWM(strand_matrix, matrix_threshold).scan(encoded_sequence, chunk_size)
+            Starts.append(starts)
+            Ends.append(starts + len(score_matrix))
+            IsMinus.append(np.full(len(starts), is_minus))
+            Codes.append(np.full(len(starts), matrix_idx, dtype=np.int32))
+            Scores.append(scores)
+
+    multi_matrix = isinstance(matrices, dict)
+
+    return _format_motif_hits(
+        np.concatenate(Starts),
+        np.concatenate(Ends),
+        np.concatenate(IsMinus),
+        motif_key,
+        sort,
+        as_frame,
+        motif_codes=np.concatenate(Codes) if multi_matrix else None,
+        motif_ids=list(MatrixDict.keys()) if multi_matrix else None,
+        scores=np.concatenate(Scores),
+    )
@@ -8,44 +8,121 @@ __email__ = ", ".join(["vinyard@g.harvard.edu",])
 
 # import packages #
 # --------------- #
-import licorice
-import pandas as pd
-import regex
+import numpy as np
 
 
 # local imports #
 # ------------- #
-from ._isolate_constraining_sequence_motif import _isolate_constraining_sequence_motif
-from .._sequence_functions._SequenceManipulation import _SequenceManipulation
+from ._aho_corasick import _query_motifs_bistrand, _format_motif_dict
+from ._format_motif_hits import _format_motif_hits
+from ._MotifSearcher import _MotifSearcher
+from .._sequence_functions._encode_sequence import _encode_sequence
+from .._utility_functions._instrumentation import _instrumented
 
 
-def _query_motif_in_sequence(sequence, motif, strand, start_key, end_key, verbose):
+def _print_motif_search(searcher):
     
     """"""
     
-    if verbose:
-        strand_str = licorice.font_format(strand, ["BOLD"])
-        motif_str = licorice.font_format(motif, ["BOLD", "GREEN"])
-        print("Searching the {} strand of the provided sequence for: {} ...".format(strand_str, motif_str))
-    
-    Motifs = {}
-    motif_matches = regex.finditer(motif, sequence, overlapped=True)
-    
-    for n, match in enumerate(motif_matches):
-        motif_position = match.span()
-        Motifs[n] = {}
-        Motifs[n][start_key] = motif_position[0] - 1
-        Motifs[n][end_key]   = motif_position[1]
-        
-    motif_df = pd.DataFrame(Motifs).T
-    
-    motif_key = start_key.split(".")[0]
-    motif_df["{}.strand".format(motif_key)] = strand
+    import licorice
     
+    m = licorice.font_format(searcher.motif, ['BOLD'])
+    m_ = licorice.font_format(searcher.searchable_motif, ['BOLD', 'GREEN'])
+    print("\nSearching both strands of the provided sequence for motif: {} (from {}) ...".format(m_, m))
+
+
+def _query_motifs_mismatches(
+    sequence,
+    motifs,
+    max_mismatches,
+    motif_key=False,
+    verbose=True,
+    sort=True,
+    as_frame=True,
+    distance="hamming",
+    collapse_palindromes=True,
+):
+
+    """
+    Mismatch-tolerant search of many motifs (e.g. off-targets of several guides) on both strands.
+
+    Parameters:
+    -----------
+    As `_query_motifs_bistrand`, plus `max_mismatches` [ required ] and `distance` (see
+    `MotifSearcher`). There is no default: callers pass the tolerance they were given.
+
+    Returns:
+    --------
+    motif_df
+        Long-format hit table with "{motif_key}.id" and "{motif_key}.mismatches" columns.
+        type: pandas.DataFrame or numpy.ndarray
+
+    Notes:
+    ------
+    (1) The sequence is encoded once; each motif is then matched against it with the
+        mismatch-tolerant matcher. Motifs must be IUPAC motifs.
+    """
+
+    if not motif_key:
+        motif_key = "motif"
+
+    MotifDict = _format_motif_dict(motifs)
+    motif_ids = list(MotifDict.keys())
+
+    if verbose:
+        print("Searching both strands of the provided sequence for {} motifs, allowing up to {} mismatches ...".format(
+            len(motif_ids), max_mismatches
+        ))
+
+    encoded_sequence = _encode_sequence(sequence)
+    starts, ends, is_minus, mismatches, motif_codes = [], [], [], [], []
+    for motif_idx, motif in enumerate(MotifDict.values()):
+        searcher = _MotifSearcher(
+            motif,
+            motif_key,
+            max_mismatches=max_mismatches,
+            distance=distance,
+            collapse_palindromes=collapse_palindromes,
+        )
+        pos_starts, pos_ends, neg_starts, neg_ends, pos_mismatches, neg_mismatches = searcher._scan_mismatch_spans(
+            encoded_sequence
+        )
+        starts += [pos_starts, neg_starts]
+        ends += [pos_ends, neg_ends]
+        is_minus.append(np.repeat([False, True], [len(pos_starts), len(neg_starts)]))
+        mismatches += [pos_mismatches, neg_mismatches]
+        motif_codes.append(np.full(len(pos_starts) + len(neg_starts), motif_idx, dtype=np.int32))
+
+    motif_df = _format_motif_hits(
+        np.concatenate(starts) if starts else np.empty(0, dtype=np.int64),
+        np.concatenate(ends) if ends else np.empty(0, dtype=np.int64),
+        np.concatenate(is_minus) if is_minus else np.empty(0, dtype=bool),
+        motif_key,
+        sort,
+        as_frame,
+        motif_codes=np.concatenate(motif_codes) if motif_codes else np.empty(0, dtype=np.int32),
+        motif_ids=motif_ids,
+        mismatches=np.concatenate(mismatches) if mismatches else np.empty(0, dtype=np.uint8),
+    )
+
+    if verbose:
+        print("\nIdentified {} instances of {} motifs in the provided sequence.".format(len(motif_df), len(motif_ids)))
+
     return motif_df
 
 
-def _query_motif_bistrand(sequence, motif, motif_key=False, verbose=True):
+@_instrumented("query_motif", count=len)
+def _query_motif_bistrand(
+    sequence,
+    motif,
+    motif_key=False,
+    verbose=True,
+    sort=True,
+    as_frame=True,
+    max_mismatches=0,
+    distance="hamming",
+    collapse_palindromes=True,
+):
     
     """
     Look for a motif in both strands of a given DNA sequence. 
@@ -57,8 +134,9 @@ def _query_motif_bistrand(sequence, motif, motif_key=False, verbose=True):
         type: str
     
     motif
-        String to be searched as a sub-string of the provided `sequence`
-        type: str
+        String to be searched as a sub-string of the provided `sequence`. If a list or
+        dict of motifs is passed, all motifs are searched in a single pass (see Notes).
+        type: str, list, or dict
         
     motif_key
         String to indicate the colunmn title for the motif start and end.
@@ -69,51 +147,81 @@ def _query_motif_bistrand(sequence, motif, motif_key=False, verbose=True):
         type: bool
         default: True
     
+    sort
+        Sort hits by start position. Skipping the sort saves time for large hit counts.
+        type: bool
+        default: True
+    
+    as_frame
+        Return a pandas DataFrame. If False, return a numpy structured array with the
+        same fields (strand encoded as int8: 0 = "+", 1 = "-").
+        type: bool
+        default: True
+    
+    max_mismatches
+        Also report near-matches within this distance of the motif, on both strands.
+        Adds a "{motif_key}.mismatches" column. Requires an IUPAC motif.
+        type: int
+        default: 0
+    
+    distance
+        One of: "hamming", "edit". See `MotifSearcher`.
+        type: str
+        default: "hamming"
+    
+    collapse_palindromes
+        Report each site of a motif that is its own reverse complement (e.g. EcoRI, GAATTC)
+        once, on the "+" strand, rather than once per strand. Such motifs are only
+        matched once.
+        type: bool
+        default: True
+    
     Returns:
     --------
     motif_df
-        Pandas DataFrame containing all occurances of the searched motif.
-        type: pandas.DataFrame
+        Pandas DataFrame containing all occurances of the searched motif, built
+        column-wise from int64 arrays (strand is categorical).
+        type: pandas.DataFrame or numpy.ndarray
         
     
     Notes:
     ------
+    (1) Motifs composed of IUPAC nucleotide codes (A, C, G, T, R, Y, S, W, K, M, B, D, H, V, N)
+        are matched with a per-position bitmask matcher, so degenerate bases and internal
+        Ns (e.g. the E-box, CANNTG) are searched as fast as exact motifs. Any other motif
+        is passed to `regex` as a pattern.
+    
+    (2) The compiled motif is taken from an LRU cache shared with `MotifSearcher`; for
+        repeated searches of the same motif, a `MotifSearcher` avoids even the lookup.
+    
+    (3) Multi-motif mode: when `motif` is a list (or dict of {motif_id: motif}), an
+        Aho-Corasick automaton is built once over all motifs and their reverse
+        complements. A long-format DataFrame with an additional "{motif_key}.id"
+        column is returned. With `max_mismatches`, each motif is instead matched
+        with the mismatch-tolerant matcher against a sequence encoded once.
     """
     
-    if not motif_key:
-        motif_key="motif"
-    
-    
-    start_key="{}.start".format(motif_key)
-    end_key="{}.end".format(motif_key)
-    
-    searchable_motif = _isolate_constraining_sequence_motif(motif, verbose=verbose)
-    
-    Sequence = _SequenceManipulation(sequence)
-    Sequence.reverse_complement()        
-
-    pos_df = _query_motif_in_sequence(sequence, 
-                                      searchable_motif, 
-                                      "+", 
-                                      start_key, 
-                                      end_key,
-                                      verbose,)
-    
-    neg_df = _query_motif_in_sequence(Sequence.reverse_complement_sequence, 
-                                      searchable_motif, 
-                                      "-", 
-                                      start_key, 
-                                      end_key,
-                                      verbose,)        
-
-    neg_df[start_key] = len(sequence) - neg_df[start_key]
-    neg_df[end_key] = len(sequence) - neg_df[end_key]
-    
-    motif_df = pd.concat([pos_df, neg_df]).sort_values([start_key]).reset_index(drop=True)
+    if isinstance(motif, (list, tuple, dict)):
+        if max_mismatches:
+            return _query_motifs_mismatches(
+                sequence, motif, max_mismatches, motif_key, verbose, sort, as_frame, distance, collapse_palindromes
+            )
+        return _query_motifs_bistrand(sequence, motif, motif_key, verbose, sort, as_frame, collapse_palindromes)
+    
+    searcher = _MotifSearcher(
+        motif,
+        motif_key,
+        max_mismatches=max_mismatches,
+        distance=distance,
+        collapse_palindromes=collapse_palindromes,
+    )
     
+    if verbose:
+        _print_motif_search(searcher)
     
+    motif_df = searcher.scan(sequence, sort, as_frame)
     
     if verbose:
-        print("\nIdentified {} instances of the {} motif in the provided sequence.".format(len(motif_df), searchable_motif))
+        print("\nIdentified {} instances of the {} motif in the provided sequence.".format(len(motif_df), searcher.searchable_motif))
     
-    return motif_df
\ No newline at end of file
+    return motif_df
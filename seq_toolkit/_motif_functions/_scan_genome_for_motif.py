@@ -0,0 +1,313 @@
+
+# _scan_genome_for_motif.py
+
+__module_name__ = "_scan_genome_for_motif.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+# import packages #
+# --------------- #
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import os
+import pandas as pd
+
+
+# local imports #
+# ------------- #
+from ._MotifSearcher import _MotifSearcher
+from .._genome_functions._fasta_index import _load_fasta_index, _fetch_region
+from .._genome_functions._FeatureWriter import _FeatureWriter
+from .._utility_functions._instrumentation import _instrumented
+
+
+_DEFAULT_CHUNK_SIZE = 10_000_000
+
+
+def _define_genome_chunks(FastaIndex, chunk_size, overlap, chromosomes=None):
+
+    """
+    Split each chromosome into windows of `chunk_size` bases, extended by `overlap` bases.
+
+    Returns:
+    --------
+    chunks
+        List of (chromosome, chunk_start, chunk_end), in genome order. A motif starting in
+        [chunk_start, chunk_start + chunk_size) lies entirely within exactly one window.
+        type: list
+    """
+
+    if chromosomes is None:
+        chromosomes = list(FastaIndex.keys())
+
+    chunks = []
+    for chromosome in chromosomes:
+        chrom_length = FastaIndex[chromosome].length
+        for chunk_start in range(0, chrom_length, chunk_size):
+            chunk_end = min(chunk_start + chunk_size + overlap, chrom_length)
+            chunks.append((chromosome, chunk_start, chunk_end))
+
+    return chunks
+
+
+def _chunk_overlap(searcher):
+
+    """
+    Overlap needed between consecutive chunks so that every hit lies entirely within one:
+    the longest possible match, less one base.
+    """
+
+    if searcher.max_match_length is None:
+        raise ValueError(
+            "Chunked scans require a motif with a bounded match length (e.g. GA[AT]{{1,4}}TC rather "
+            "than GA[AT]+TC). Got: {}".format(searcher.motif)
+        )
+
+    return max(searcher.max_match_length - 1, 0)
+
+
+def _owned_spans(pos_starts, pos_ends, neg_starts, neg_ends, owned_length, overlap, is_first):
+
+    """
+    Keep the hits of one chunk that this chunk alone reports, so that hits are neither lost
+    nor duplicated across overlapping chunks.
+
+    Parameters:
+    -----------
+    pos_starts, pos_ends, neg_starts, neg_ends
+        Output of `MotifSearcher._scan_spans`, in chunk coordinates.
+        type: numpy.ndarray
+
+    owned_length
+        Plus-strand hits starting in the first `owned_length` bases belong to this chunk
+        (the chunk size; the whole chunk for the last chunk of a sequence).
+        type: int
+
+    overlap
+        Output of `_chunk_overlap`.
+        type: int
+
+    is_first
+        Whether the chunk starts the sequence.
+        type: bool
+
+    Notes:
+    ------
+    (1) A plus-strand hit is matched from its start and a minus-strand hit from its end
+        (the start of its reverse complement), so each is assigned to the chunk holding
+        the longest possible match from that anchor. A match that a chunk boundary cuts
+        short (possible for variable-length patterns) is thereby never reported.
+    """
+
+    pos_keep = pos_starts < owned_length
+    neg_keep = np.ones(len(neg_ends), dtype=bool) if is_first else neg_ends > overlap
+
+    return pos_starts[pos_keep], pos_ends[pos_keep], neg_starts[neg_keep], neg_ends[neg_keep]
+
+
+def _map_genome_chunks(function, chunk_args, n_workers):
+
+    """
+    Apply `function` to each tuple of `chunk_args`, yielding results in order.
+
+    If `n_workers` is 1, chunks are processed in the calling process. Otherwise, at most
+    2 x `n_workers` chunks are in flight at once, so memory stays bounded.
+    """
+
+    if n_workers == 1:
+        for args in chunk_args:
+            yield function(*args)
+        return
+
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        in_flight = deque()
+        for args in chunk_args:
+            in_flight.append(executor.submit(function, *args))
+            if len(in_flight) >= 2 * n_workers:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def _scan_window(
+    chunk_seq, chromosome, chunk_start, motif, trim_n, motif_name, collapse_palindromes=True, owned_length=None
+):
+
+    """
+    Hits of `motif` in one window of sequence, as a BED-like DataFrame in chromosome coordinates.
+
+    Parameters:
+    -----------
+    chunk_seq
+        Sequence of the window.
+        type: str
+
+    chromosome, chunk_start
+        Position of the window; `chunk_start` is 0-based.
+        type: str, int
+
+    owned_length
+        For windows of a chunked scan: see `_owned_spans`. By default, every hit is kept.
+        type: int
+        default: None
+
+    Returns:
+    --------
+    hits_df
+        Columns: chrom, start, end, name, score, strand; sorted by start.
+        type: pandas.DataFrame
+    """
+
+    searcher = _MotifSearcher(motif, trim_n=trim_n, collapse_palindromes=collapse_palindromes)
+    pos_starts, pos_ends, neg_starts, neg_ends = searcher._scan_spans(chunk_seq)
+    if owned_length is not None:
+        pos_starts, pos_ends, neg_starts, neg_ends = _owned_spans(
+            pos_starts, pos_ends, neg_starts, neg_ends, owned_length, _chunk_overlap(searcher), chunk_start == 0
+        )
+
+    starts = np.concatenate([pos_starts, neg_starts]) + chunk_start
+    ends = np.concatenate([pos_ends, neg_ends]) + chunk_start
+    strands = np.repeat(np.array(["+", "-"], dtype=object), [len(pos_starts), len(neg_starts)])
+    order = np.lexsort([strands == "-", starts])
+
+    return pd.DataFrame(
+        {
+            "chrom": chromosome,
+            "start": starts[order],
+            "end": ends[order],
+            "name": motif_name,
+            "score": 0,
+            "strand": strands[order],
+        }
+    )
+
+
+def _scan_genome_chunk(
+    ref_seq_path, record, chunk_start, chunk_end, motif, trim_n, motif_name, collapse_palindromes=True, chunk_size=None
+):
+
+    """
+    Worker: read one window of the reference and return its hits as a BED-like DataFrame.
+
+    Only the window itself (plus the per-chunk hit arrays) is held in memory.
+    """
+
+    with open(ref_seq_path, "rb") as fasta:
+        chunk_seq = _fetch_region(fasta, record, chunk_start, chunk_end)
+
+    return _scan_window(
+        chunk_seq, record.name, chunk_start, motif, trim_n, motif_name, collapse_palindromes, owned_length=chunk_size
+    )
+
+
+@_instrumented("scan_genome")
+def _scan_genome_for_motif(
+    ref_seq_path,
+    motif,
+    out_path,
+    chromosomes=None,
+    chunk_size=_DEFAULT_CHUNK_SIZE,
+    n_workers=None,
+    trim_n=True,
+    out_format=None,
+    collapse_palindromes=True,
+):
+
+    """
+    Scan every chromosome of a reference genome for a motif, streaming hits to disk.
+
+    Parameters:
+    -----------
+    ref_seq_path [ required ]
+        Path to a reference genome fasta file.
+        type: str
+
+    motif [ required ]
+        Motif to be searched on both strands. IUPAC nucleotide codes are supported.
+        type: str
+
+    out_path [ required ]
+        Path to the output BED or Parquet file.
+        type: str
+
+    chromosomes
+        Chromosomes to scan. By default, every chromosome in the reference.
+        type: list
+        default: None
+
+    chunk_size
+        Number of bases scanned per task; bounds the memory used by each worker.
+        type: int
+        default: 10_000_000
+
+    n_workers
+        Number of worker processes. If 1, chunks are scanned in the calling process.
+        type: int
+        default: os.cpu_count()
+
+    trim_n
+        Strip flanking Ns from the motif before searching.
+        type: bool
+        default: True
+
+    out_format
+        One of: "bed", "parquet". Inferred from `out_path` if not passed.
+        type: str
+        default: None
+
+    collapse_palindromes
+        Write each site of a motif that is its own reverse complement once, on the "+" strand.
+        type: bool
+        default: True
+
+    Returns:
+    --------
+    n_hits
+        Number of hits written to `out_path`.
+        type: int
+
+    Notes:
+    ------
+    (1) The reference is read in windows of `chunk_size` bases that overlap by
+        (longest possible match - 1) bases, so that no hit is lost at a chunk boundary.
+        Each hit is reported by exactly one window (see `_owned_spans`), so none are
+        duplicated, including for variable-length regex motifs (e.g. GA[AT]{1,4}TC).
+        Motifs with unbounded matches (e.g. GA[AT]+TC) raise a ValueError.
+    (2) Output uses BED conventions (0-based, half-open, forward-strand coordinates):
+        chrom, start, end, name, score, strand. Hits are written in reference order,
+        sorted by start within each chromosome.
+    (3) Results are consumed in submission order with at most 2 x `n_workers` chunks in
+        flight, so memory stays bounded regardless of genome size.
+    (4) The reference is indexed from `ref_seq_path` + ".fai" if present; otherwise it is
+        indexed in one streaming pass. Each worker reads its own window from disk; no
+        sequence is pickled between processes.
+    """
+
+    FastaIndex = _load_fasta_index(ref_seq_path)
+    overlap = _chunk_overlap(_MotifSearcher(motif, trim_n=trim_n))
+    chunks = _define_genome_chunks(FastaIndex, chunk_size, overlap, chromosomes)
+
+    if n_workers is None:
+        n_workers = os.cpu_count()
+
+    def _chunk_args(chunk):
+        chromosome, chunk_start, chunk_end = chunk
+        return (
+            ref_seq_path,
+            FastaIndex[chromosome],
+            chunk_start,
+            chunk_end,
+            motif,
+            trim_n,
+            motif,
+            collapse_palindromes,
+            chunk_size,
+        )
+
+    with _FeatureWriter(out_path, out_format) as writer:
+        for hits_df in _map_genome_chunks(_scan_genome_chunk, map(_chunk_args, chunks), n_workers):
+            writer.write(hits_df)
+
+    return writer.n_written
@@ -0,0 +1,533 @@
+
+# _ReadSimulator.py
+
+__module_name__ = "_ReadSimulator.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+# package imports #
+# --------------- #
+import collections
+import concurrent.futures
+import gzip
+import numpy as np
+import os
+import pandas as pd
+
+
+# local imports #
+# ------------- #
+from ._encode_sequence import _as_bytes, _INDEX_TABLE, _UNKNOWN_BASE_INDEX
+from ._SequenceManipulation import _COMPLEMENT_TABLE
+from .._utility_functions._instrumentation import _stage
+
+
+_PHRED_OFFSET = 33
+_MIN_PHRED, _MAX_PHRED = 2, 41
+_DEFAULT_CHUNK_SIZE = 2 ** 16
+
+# byte -> byte tables, applied to whole read matrices at once
+_UPPER_TABLE = bytes(range(256)).upper()
+_UPPER_COMPLEMENT_TABLE = _UPPER_TABLE.translate(_COMPLEMENT_TABLE)
+_INDEX_LOOKUP = np.frombuffer(_INDEX_TABLE, dtype=np.uint8)
+_BASES = np.frombuffer(b"ACGT", dtype=np.uint8)
+
+
+def _per_cycle_error_rates(error_rate, read_length):
+
+    """
+    Substitution probability at each cycle (read position).
+
+    Parameters:
+    -----------
+    error_rate
+        One rate for every cycle; (first cycle, last cycle), interpolated linearly in
+        between; or one rate per cycle.
+        type: float, tuple, or array-like
+
+    read_length
+        type: int
+
+    Returns:
+    --------
+    cycle_error_rates
+        type: numpy.ndarray of shape (read_length,)
+    """
+
+    error_rate = np.asarray(error_rate, dtype=float).ravel()
+    if error_rate.size == 1:
+        cycle_error_rates = np.full(read_length, error_rate[0])
+    elif error_rate.size == 2:
+        cycle_error_rates = np.linspace(error_rate[0], error_rate[1], read_length)
+    elif error_rate.size == read_length:
+        cycle_error_rates = error_rate
+    else:
+        raise ValueError(
+            "error_rate must be a rate, (first, last) rates or one rate per cycle. Got: {} values for {} cycles".format(
+                error_rate.size, read_length
+            )
+        )
+
+    if (cycle_error_rates < 0).any() or (cycle_error_rates > 1).any():
+        raise ValueError("Error rates must lie in [0, 1]. Got: {}".format(error_rate))
+
+    return cycle_error_rates
+
+
+def _phred_qualities(cycle_error_rates):
+
+    """Phred+33 quality string implied by each cycle's error rate."""
+
+    with np.errstate(divide="ignore"):
+        phred = np.round(-10 * np.log10(cycle_error_rates))
+
+    return (np.clip(phred, _MIN_PHRED, _MAX_PHRED) + _PHRED_OFFSET).astype(np.uint8)
+
+
+def _load_read_sources(reference):
+
+    """
+    Lay out the sequences that reads are drawn from.
+
+    Parameters:
+    -----------
+    reference
+        A sequence (str, bytes or buffer); {name: sequence}; a `SequenceStore`; a `Seq`;
+        or a `Gene`, whose exons are spliced into one transcript.
+
+    Returns:
+    --------
+    ReadSources
+        "text": every source sequence, back to back (type: numpy.ndarray of uint8);
+        "names", "offsets", "lengths": one entry per source;
+        "exons": (genomic starts, transcript starts, lengths) of a `Gene`'s exons, or None.
+        type: dict
+
+    Notes:
+    ------
+    (1) A single sequence or a `SequenceStore` is read in place, without a copy.
+    """
+
+    ReadSources = {"exons": None}
+
+    if hasattr(reference, "gene_df"):
+        exon_df = reference.gene_df.loc[reference.gene_df[reference.feature_key] == "exon"]
+        exon_df = exon_df.sort_values(reference.start_key)
+        genomic_starts = exon_df[reference.start_key].to_numpy(dtype=np.int64)
+        exon_lengths = exon_df[reference.end_key].to_numpy(dtype=np.int64) - genomic_starts
+        gene_seq = np.frombuffer(_as_bytes(reference.seq), dtype=np.uint8)
+        transcript_idx = np.repeat(genomic_starts - np.cumsum(exon_lengths) + exon_lengths, exon_lengths)
+        transcript_idx += np.arange(exon_lengths.sum())
+        ReadSources["text"] = gene_seq[transcript_idx]
+        ReadSources["names"] = ["gene"]
+        ReadSources["exons"] = (genomic_starts, np.cumsum(exon_lengths) - exon_lengths, exon_lengths)
+    elif hasattr(reference, "_spans"):
+        # SequenceStore: chromosomes already lie back to back in shared memory
+        ReadSources["text"] = np.frombuffer(reference._buffer, dtype=np.uint8, offset=reference._data_offset)
+        ReadSources["names"] = reference.chromosomes
+        offsets, lengths = zip(*reference._spans.values()) if len(reference) else ((), ())
+        ReadSources["offsets"], ReadSources["lengths"] = np.array(offsets, dtype=np.int64), np.array(lengths, dtype=np.int64)
+        return ReadSources
+    elif isinstance(reference, dict):
+        ReadSources["names"] = list(reference.keys())
+        sequences = [np.frombuffer(_as_bytes(sequence), dtype=np.uint8) for sequence in reference.values()]
+        ReadSources["text"] = np.concatenate(sequences) if sequences else np.empty(0, dtype=np.uint8)
+    else:
+        sequence = reference.seq if hasattr(reference, "seq") else reference
+        if isinstance(sequence, str):
+            sequence = sequence.encode("ascii")
+        ReadSources["text"] = np.frombuffer(sequence, dtype=np.uint8)
+        ReadSources["names"] = ["seq"]
+
+    if not "lengths" in ReadSources:
+        lengths = [len(ReadSources["text"])] if len(ReadSources["names"]) == 1 else [len(s) for s in sequences]
+        ReadSources["lengths"] = np.array(lengths, dtype=np.int64)
+        ReadSources["offsets"] = np.cumsum(ReadSources["lengths"]) - ReadSources["lengths"]
+
+    return ReadSources
+
+
+def _gather_reads(text, read_starts, reverse, read_length):
+
+    """
+    Copy out reads of `read_length` bases starting at `read_starts`, upper-cased; reads
+    flagged in `reverse` are reverse complemented.
+
+    Returns:
+    --------
+    reads
+        type: numpy.ndarray of uint8, shape (n_reads, read_length)
+
+    Notes:
+    ------
+    (1) Rows of a strided window view are copied whole (no per-base index array), and
+        bases are translated with `bytes.translate`, as in `_reverse_complement_bytes`.
+    """
+
+    reads = np.lib.stride_tricks.sliding_window_view(text, read_length)[read_starts]
+    reverse_reads = np.ascontiguousarray(reads[reverse][:, ::-1]).tobytes().translate(_UPPER_COMPLEMENT_TABLE)
+    reads = np.frombuffer(reads.tobytes().translate(_UPPER_TABLE), dtype=np.uint8).reshape(-1, read_length).copy()
+    reads[reverse] = np.frombuffer(reverse_reads, dtype=np.uint8).reshape(-1, read_length)
+
+    return reads
+
+
+def _add_substitution_errors(reads, cycle_error_rates, rng):
+
+    """
+    Substitute bases in place, each with its cycle's error rate, by one of the other three
+    bases chosen uniformly; Ns are left as they are.
+
+    Returns:
+    --------
+    n_errors
+        Substitutions per read.
+        type: numpy.ndarray
+
+    Notes:
+    ------
+    (1) Rather than drawing a random number per base, the number of errors at each cycle
+        is drawn from a binomial distribution, then assigned to that many distinct reads.
+    """
+
+    n_reads, read_length = reads.shape
+    n_cycle_errors = rng.binomial(n_reads, cycle_error_rates)
+    error_reads = np.concatenate(
+        [rng.choice(n_reads, n_errors, replace=False, shuffle=False) for n_errors in n_cycle_errors]
+    ).astype(np.int64)
+    error_cycles = np.repeat(np.arange(read_length), n_cycle_errors)
+
+    base_idx = _INDEX_LOOKUP[reads[error_reads, error_cycles]]
+    known = base_idx != _UNKNOWN_BASE_INDEX
+    error_reads, error_cycles = error_reads[known], error_cycles[known]
+    reads[error_reads, error_cycles] = _BASES[(base_idx[known] + rng.integers(1, 4, known.sum())) % 4]
+
+    return np.bincount(error_reads, minlength=n_reads)
+
+
+def _format_fastq(read_names, reads, quality):
+
+    """
+    FASTQ records for equal-length reads, assembled as one byte matrix (no per-read loop).
+
+    Parameters:
+    -----------
+    read_names
+        Fixed-width names, without "@".
+        type: numpy.ndarray of uint8, shape (n_reads, name_width)
+
+    reads
+        type: numpy.ndarray of uint8, shape (n_reads, read_length)
+
+    quality
+        type: numpy.ndarray of uint8, shape (read_length,)
+
+    Returns:
+    --------
+    records
+        type: numpy.ndarray of uint8, shape (n_reads, record_width)
+    """
+
+    n_reads, name_width = read_names.shape
+    read_length = reads.shape[1]
+    records = np.empty((n_reads, name_width + 2 * read_length + 6), dtype=np.uint8)
+
+    position = 0
+    for field in [b"@", read_names, b"\n", reads, b"\n+\n", quality, b"\n"]:
+        if isinstance(field, bytes):
+            field = np.frombuffer(field, dtype=np.uint8)
+        width = field.shape[-1]
+        records[:, position : position + width] = field
+        position += width
+
+    return records
+
+
+def _format_read_names(prefix, read_ids, n_digits, suffix=b""):
+
+    """"prefix" + zero-padded read id + suffix, for each read, as a byte matrix."""
+
+    digits = (read_ids[:, None] // 10 ** np.arange(n_digits - 1, -1, -1)) % 10 + ord("0")
+    prefix = np.broadcast_to(np.frombuffer(prefix, dtype=np.uint8), (len(read_ids), len(prefix)))
+    suffix = np.broadcast_to(np.frombuffer(suffix, dtype=np.uint8), (len(read_ids), len(suffix)))
+
+    return np.hstack([prefix, digits.astype(np.uint8), suffix])
+
+
+def _encode_fastq_chunk(chunk, compresslevel):
+
+    """A chunk of FASTQ, as one gzip member if `compresslevel` is not None (run on a worker thread)."""
+
+    if compresslevel is None:
+        return chunk
+
+    return gzip.compress(chunk, compresslevel=compresslevel, mtime=0)
+
+
+class _ReadSimulator:
+
+    def __init__(
+        self,
+        read_length=100,
+        paired=False,
+        fragment_mean=300,
+        fragment_sd=30,
+        error_rate=(0.001, 0.01),
+        prefix="read",
+        seed=None,
+    ):
+
+        """
+        Initialize a sequencing-read simulator.
+
+        Parameters:
+        -----------
+        read_length
+            type: int
+            default: 100
+
+        paired
+            Simulate paired-end reads from both ends of each fragment.
+            type: bool
+            default: False
+
+        fragment_mean, fragment_sd
+            Fragment lengths are drawn from a normal distribution, rounded, and clipped to
+            [read_length, source length]. Only used when `paired`.
+            type: float
+            default: 300, 30
+
+        error_rate
+            Per-cycle substitution rate: one rate; (first cycle, last cycle), interpolated
+            linearly; or one rate per cycle.
+            type: float, tuple, or array-like
+            default: (0.001, 0.01)
+
+        prefix
+            Read names are prefix + zero-padded read number (+ "/1", "/2" when paired).
+            type: str
+            default: "read"
+
+        seed
+            type: int
+            default: None
+
+        Returns:
+        --------
+        self.cycle_error_rates
+            type: numpy.ndarray
+
+        self.quality
+            Phred+33 quality string implied by `cycle_error_rates`, shared by every read.
+            type: str
+
+        Notes:
+        ------
+        (1) Reads are sampled uniformly along the sources (in proportion to each source's
+            length), from either strand with equal probability; reverse-strand reads are
+            reverse complemented with the same table as `seq_toolkit.SequenceManipulator`.
+        """
+
+        if read_length < 1:
+            raise ValueError("read_length must be positive. Got: {}".format(read_length))
+
+        self.read_length = read_length
+        self.paired = paired
+        self.fragment_mean, self.fragment_sd = fragment_mean, fragment_sd
+        self.cycle_error_rates = _per_cycle_error_rates(error_rate, read_length)
+        self._quality = _phred_qualities(self.cycle_error_rates)
+        self.quality = self._quality.tobytes().decode("ascii")
+        self.prefix = prefix
+        self.rng = np.random.default_rng(seed)
+
+    def _sample_fragments(self, ReadSources, n_reads, source_weights):
+
+        """Source, 0-based start, length and strand of `n_reads` fragments."""
+
+        source_idx = self.rng.choice(len(source_weights), n_reads, p=source_weights)
+        source_lengths = ReadSources["lengths"][source_idx]
+
+        if self.paired:
+            fragment_lengths = np.round(self.rng.normal(self.fragment_mean, self.fragment_sd, n_reads)).astype(np.int64)
+            fragment_lengths = np.clip(fragment_lengths, self.read_length, source_lengths)
+        else:
+            fragment_lengths = np.full(n_reads, self.read_length, dtype=np.int64)
+
+        starts = (self.rng.random(n_reads) * (source_lengths - fragment_lengths + 1)).astype(np.int64)
+        forward = self.rng.random(n_reads) < 0.5
+
+        return source_idx, starts, fragment_lengths, forward
+
+    def _to_genomic(self, ReadSources, transcript_positions):
+
+        """Map 0-based transcript positions of a spliced `Gene` to gene coordinates."""
+
+        genomic_starts, transcript_starts, exon_lengths = ReadSources["exons"]
+        exon_idx = np.searchsorted(transcript_starts, transcript_positions, side="right") - 1
+
+        return genomic_starts[exon_idx] + transcript_positions - transcript_starts[exon_idx], exon_idx
+
+    def _truth_df(self, ReadSources, read_names, source_idx, starts, fragment_lengths, forward, n_errors):
+
+        """"""
+
+        TruthDict = {"read": read_names.copy().view("S{}".format(read_names.shape[1])).ravel().astype(str)}
+        TruthDict["Chromosome"] = np.asarray(ReadSources["names"], dtype=object)[source_idx]
+
+        if ReadSources["exons"] is None:
+            TruthDict["Start"], TruthDict["End"] = starts, starts + fragment_lengths
+        else:
+            TruthDict["Start"], first_exon = self._to_genomic(ReadSources, starts)
+            last_position, last_exon = self._to_genomic(ReadSources, starts + fragment_lengths - 1)
+            TruthDict["End"] = last_position + 1
+            TruthDict["spliced"] = first_exon != last_exon
+
+        TruthDict["Strand"] = np.where(forward, "+", "-")
+        TruthDict["fragment_length"] = fragment_lengths
+        for mate, mate_errors in enumerate(n_errors):
+            TruthDict["errors" if len(n_errors) == 1 else "errors_{}".format(mate + 1)] = mate_errors
+
+        return pd.DataFrame(TruthDict)
+
+    def simulate(
+        self,
+        reference,
+        n_reads,
+        out_path,
+        mate_path=None,
+        truth_path=None,
+        compresslevel=1,
+        chunk_size=_DEFAULT_CHUNK_SIZE,
+        n_threads=None,
+    ):
+
+        """
+        Simulate reads and write them as (gzipped) FASTQ.
+
+        Parameters:
+        -----------
+        reference
+            Sequence(s) to draw reads from: a sequence (str, bytes or `SequenceStore` view);
+            {name: sequence}; a `SequenceStore`; a `Seq`; or a `Gene` (after `create()`),
+            whose exons are spliced so that reads span exon junctions.
+
+        n_reads
+            Number of reads (read pairs, when `paired`).
+            type: int
+
+        out_path
+            FASTQ file; gzipped if it ends in ".gz". Mate 1 when `paired`.
+            type: str
+
+        mate_path
+            Mate 2 FASTQ file when `paired`. If None, pairs are interleaved in `out_path`.
+            type: str
+            default: None
+
+        truth_path
+            Optional tab-separated table of each read's origin: read (its name, without
+            "/1", "/2"), Chromosome, Start, End (0-based, half-open; in gene coordinates for
+            a `Gene`), Strand, fragment_length and the number of substitutions: `errors` for
+            single-end runs, `errors_1` and `errors_2` (one per mate) for paired runs. For a
+            `Gene`, `spliced` flags fragments spanning an exon junction.
+            type: str
+            default: None
+
+        compresslevel
+            gzip compression level. Compression dominates run time above level 1.
+            type: int
+            default: 1
+
+        chunk_size
+            Reads generated at once.
+            type: int
+            default: 65536
+
+        n_threads
+            Threads compressing chunks. By default, one per CPU.
+            type: int
+            default: None
+
+        Returns:
+        --------
+        None, writes FASTQ (and the truth table).
+
+        Notes:
+        ------
+        (1) Fragments, strands, errors and FASTQ records are generated for a whole chunk
+            of reads at a time with numpy; there is no per-read Python code.
+        (2) Each chunk is compressed independently, as one gzip member, on a pool of threads
+            (zlib releases the GIL), while the next chunks are generated. Concatenated
+            members are a valid gzip file, read by gzip, zcat and aligners alike.
+        """
+
+        ReadSources = _load_read_sources(reference)
+        usable_lengths = np.maximum(ReadSources["lengths"] - self.read_length + 1, 0)
+        if usable_lengths.sum() == 0:
+            raise ValueError("No source sequence is as long as a read. Got: read_length = {}".format(self.read_length))
+        source_weights = usable_lengths / usable_lengths.sum()
+
+        n_digits = len(str(max(n_reads, 1)))
+        prefix = self.prefix.encode("ascii")
+        suffixes = [b"/1", b"/2"] if self.paired else [b""]
+        interleave = self.paired and mate_path is None
+
+        out_paths = [out_path] if not self.paired or interleave else [out_path, mate_path]
+        out_files = [open(path, "wb") for path in out_paths]
+        compresslevels = [compresslevel if path.endswith(".gz") else None for path in out_paths]
+        truth_file = None if truth_path is None else open(truth_path, "w")
+        n_threads = n_threads or os.cpu_count() or 1
+
+        try:
+            with concurrent.futures.ThreadPoolExecutor(n_threads) as executor, _stage("simulate_reads") as stage:
+                # encoded chunks are written in order; at most ~2 per thread are held at once
+                pending = collections.deque()
+                for chunk_start in range(0, n_reads, chunk_size):
+                    n_chunk = min(chunk_size, n_reads - chunk_start)
+                    source_idx, starts, fragment_lengths, forward = self._sample_fragments(
+                        ReadSources, n_chunk, source_weights
+                    )
+                    fragment_starts = ReadSources["offsets"][source_idx] + starts
+                    fragment_ends = fragment_starts + fragment_lengths - self.read_length
+                    read_ids = np.arange(chunk_start + 1, chunk_start + n_chunk + 1, dtype=np.int64)
+
+                    # mate 1 reads the fragment's strand from its 5' end; mate 2, the other strand
+                    mate_starts = [np.where(forward, fragment_starts, fragment_ends)]
+                    mate_reverse = [~forward]
+                    if self.paired:
+                        mate_starts.append(np.where(forward, fragment_ends, fragment_starts))
+                        mate_reverse.append(forward)
+
+                    records, n_errors = [], []
+                    for read_starts, reverse, suffix in zip(mate_starts, mate_reverse, suffixes):
+                        reads = _gather_reads(ReadSources["text"], read_starts, reverse, self.read_length)
+                        n_errors.append(_add_substitution_errors(reads, self.cycle_error_rates, self.rng))
+                        read_names = _format_read_names(prefix, read_ids, n_digits, suffix)
+                        records.append(_format_fastq(read_names, reads, self._quality))
+
+                    if interleave:
+                        records = [np.stack(records, axis=1)]
+                    for out_file, level, record_matrix in zip(out_files, compresslevels, records):
+                        pending.append((out_file, executor.submit(_encode_fastq_chunk, record_matrix.tobytes(), level)))
+                    while len(pending) > 2 * n_threads * len(out_files):
+                        out_file, future = pending.popleft()
+                        out_file.write(future.result())
+
+                    if truth_file is not None:
+                        truth_df = self._truth_df(
+                            ReadSources,
+                            _format_read_names(prefix, read_ids, n_digits),
+                            source_idx, starts, fragment_lengths, forward, n_errors,
+                        )
+                        truth_df.to_csv(truth_file, sep="\t", index=False, header=chunk_start == 0)
+                    stage.count(n_chunk)
+
+                while pending:
+                    out_file, future = pending.popleft()
+                    out_file.write(future.result())
+        finally:
+            for out_file in out_files:
+                out_file.close()
+            if truth_file is not None:
+                truth_file.close()
@@ -6,6 +6,44 @@ __author__ = ", ".join(["Michael E. Vinyard"])
 __email__ = ", ".join(["vinyard@g.harvard.edu",])
 
 
+# local imports #
+# ------------- #
+from .._utility_functions._instrumentation import _instrumented
+
+
+# IUPAC complements, preserving case; any other byte is left as is
+_COMPLEMENT_TABLE = bytes.maketrans(
+    b"ACGTUNRYSWKMBDHVacgtunryswkmbdhv", b"TGCAANYRSWMKVHDBtgcaanyrswmkvhdb"
+)
+
+
+def _reverse_complement_bytes(sequence):
+
+    """
+    Reverse complement of a DNA sequence held as bytes, in one C-level pass.
+
+    Parameters:
+    -----------
+    sequence
+        type: bytes or any buffer (e.g. a `SequenceStore` view)
+
+    Returns:
+    --------
+    reverse_complement_sequence
+        type: bytes
+
+    Notes:
+    ------
+    (1) Unlike `_SequenceManipulation`, lower-case bases and IUPAC codes are complemented
+        (e.g. R <-> Y) rather than rejected.
+    """
+
+    if not isinstance(sequence, (bytes, bytearray)):
+        sequence = bytes(sequence)
+
+    return sequence.translate(_COMPLEMENT_TABLE)[::-1]
+
+
 class _SequenceManipulation:
 
     """
@@ -14,6 +52,8 @@ class _SequenceManipulation:
     Parameters:
     -----------
     sequence
+        bytes and other buffers (e.g. `SequenceStore` views) are decoded as ASCII.
+        type: str
 
     Returns:
     --------
@@ -30,6 +70,10 @@ class _SequenceManipulation:
 
     def __init__(self, sequence):
 
+        if not isinstance(sequence, str):
+            # bytes or a buffer, e.g. a `SequenceStore` view
+            sequence = bytes(sequence).decode("ascii")
+
         self.sequence = sequence
         self.ComplimentDict = {"C": "G", "G": "C", "T": "A", "A": "T", "N": "N"}
         self.complement_sequence = ""
@@ -77,6 +121,7 @@ class _SequenceManipulation:
 
         self.reverse_sequence = self.sequence[::-1]
 
+    @_instrumented("reverse_complement", count=len)
     def reverse_complement(self):
 
         """
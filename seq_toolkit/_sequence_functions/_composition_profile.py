@@ -0,0 +1,285 @@
+
+# _composition_profile.py
+
+__module_name__ = "_composition_profile.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+# package imports #
+# --------------- #
+import contextlib
+import numpy as np
+import pandas as pd
+
+
+# local imports #
+# ------------- #
+from ._encode_sequence import _encode_sequence, _BASE_BITMASKS
+from .._genome_functions._fasta_index import _load_fasta_index, _fetch_region
+from .._genome_functions._FeatureWriter import _FeatureWriter
+from .._utility_functions._instrumentation import _instrumented
+
+
+_METRICS = ["gc", "cpg_oe", "n_fraction"]
+_CHUNK_SIZE = 2 ** 24
+_C, _G = _BASE_BITMASKS["C"], _BASE_BITMASKS["G"]
+
+
+def _define_window_blocks(sequence_length, window_size, step, chunk_size=_CHUNK_SIZE):
+
+    """
+    Group sliding windows into blocks of about `chunk_size` bases.
+
+    Returns:
+    --------
+    blocks
+        (block_start, block_end, window_starts, window_ends), with forward, 0-based,
+        half-open coordinates. Windows start every `step` bases; the last window of a
+        sequence is clipped to its end.
+        type: generator
+    """
+
+    window_starts = np.arange(0, sequence_length, step, dtype=np.int64)
+    windows_per_block = max(chunk_size // step, 1)
+    for block_idx in range(0, len(window_starts), windows_per_block):
+        block_starts = window_starts[block_idx : block_idx + windows_per_block]
+        block_ends = np.minimum(block_starts + window_size, sequence_length)
+        yield block_starts[0], block_ends.max(), block_starts, block_ends
+
+
+def _window_composition(encoded_sequence, window_starts, window_ends):
+
+    """
+    GC fraction, CpG observed/expected ratio and N fraction of each window, from running counts.
+
+    Parameters:
+    -----------
+    encoded_sequence
+        Output of `_encode_sequence`.
+        type: numpy.ndarray (uint8)
+
+    window_starts, window_ends
+        Relative to the start of `encoded_sequence`.
+        type: numpy.ndarray (int64)
+
+    Returns:
+    --------
+    Composition
+        {"gc": ..., "cpg_oe": ..., "n_fraction": ...}, one float32 value per window.
+        type: dict
+    """
+
+    is_c, is_g = encoded_sequence == _C, encoded_sequence == _G
+    BaseCounts = {
+        "n": encoded_sequence == 0,
+        "c": is_c,
+        "g": is_g,
+        # CpG dinucleotides, counted at the position of the C
+        "cpg": np.append(is_c[:-1] & is_g[1:], False),
+    }
+
+    # int32 running counts suffice for blocks of < 2 ** 31 bases
+    cumsum = np.zeros(len(encoded_sequence) + 1, dtype=np.int32)
+    WindowCounts = {}
+    for key, is_base in BaseCounts.items():
+        np.cumsum(is_base, dtype=np.int32, out=cumsum[1:])
+        window_stops = window_ends - 1 if key == "cpg" else window_ends
+        WindowCounts[key] = (cumsum[np.maximum(window_stops, window_starts)] - cumsum[window_starts]).astype(np.int64)
+
+    window_lengths = window_ends - window_starts
+    n_known = window_lengths - WindowCounts["n"]
+    c, g = WindowCounts["c"], WindowCounts["g"]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gc = (c + g) / n_known
+        cpg_oe = WindowCounts["cpg"] * n_known / (c * g)
+    cpg_oe[c * g == 0] = np.nan
+
+    return {
+        "gc": gc.astype(np.float32),
+        "cpg_oe": cpg_oe.astype(np.float32),
+        "n_fraction": (WindowCounts["n"] / window_lengths).astype(np.float32),
+    }
+
+
+def _n_windows(Profile):
+
+    """Number of windows of a profile, as a DataFrame or a dict of arrays (len would count its keys)."""
+
+    return len(Profile["start"])
+
+
+@_instrumented("composition_profile", count=_n_windows)
+def _composition_profile(sequence, window_size=100, step=None, offset=0, as_frame=True):
+
+    """
+    GC content, CpG observed/expected ratio and N fraction in sliding windows along a sequence.
+
+    Parameters:
+    -----------
+    sequence
+        e.g. the output of `fetch_chromosome` or `Gene.create`.
+        type: str
+
+    window_size
+        type: int
+        default: 100
+
+    step
+        Distance between consecutive window starts. By default, equal to `window_size`
+        (non-overlapping windows).
+        type: int
+        default: None
+
+    offset
+        Added to window coordinates, e.g. the position of `sequence` in its chromosome.
+        type: int
+        default: 0
+
+    as_frame
+        Return a pandas DataFrame. If False, return a dict of numpy arrays.
+        type: bool
+        default: True
+
+    Returns:
+    --------
+    profile
+        Columns: start, end (0-based, half-open), gc, cpg_oe, n_fraction.
+        type: pandas.DataFrame or dict
+
+    Notes:
+    ------
+    (1) The sequence is encoded once per block of windows; each metric is a difference
+        of cumulative base counts, so cost does not depend on `window_size` or `step`.
+    (2) gc is the G + C fraction of non-N bases. cpg_oe is CpG count x non-N bases /
+        (C count x G count), as in Gardiner-Garden & Frommer (1987); NaN without C or G.
+    (3) The last window is clipped to the end of the sequence.
+    """
+
+    if step is None:
+        step = window_size
+
+    Profile = {"start": [], "end": []}
+    Profile.update({metric: [] for metric in _METRICS})
+    for block_start, block_end, window_starts, window_ends in _define_window_blocks(len(sequence), window_size, step):
+        encoded_sequence = _encode_sequence(sequence[block_start:block_end])
+        Composition = _window_composition(encoded_sequence, window_starts - block_start, window_ends - block_start)
+        Profile["start"].append(window_starts + offset)
+        Profile["end"].append(window_ends + offset)
+        for metric in _METRICS:
+            Profile[metric].append(Composition[metric])
+
+    for key, values in Profile.items():
+        dtype = np.int64 if key in ["start", "end"] else np.float32
+        Profile[key] = np.concatenate(values).astype(dtype, copy=False) if values else np.empty(0, dtype=dtype)
+
+    if as_frame:
+        return pd.DataFrame(Profile)
+
+    return Profile
+
+
+@_instrumented("composition_profile_genome")
+def _composition_profile_genome(
+    ref_seq_path,
+    out_path=None,
+    metric="gc",
+    window_size=100,
+    step=None,
+    chromosomes=None,
+    out_format=None,
+):
+
+    """
+    Stream a sliding-window composition profile over a reference genome.
+
+    Parameters:
+    -----------
+    ref_seq_path [ required ]
+        Path to a reference genome fasta file.
+        type: str
+
+    out_path
+        Path to an output bedGraph (or Parquet) file. If None, per-chromosome arrays are
+        returned instead.
+        type: str
+        default: None
+
+    metric
+        One of: "gc", "cpg_oe", "n_fraction".
+        type: str
+        default: "gc"
+
+    window_size, step
+        As in `composition_profile`.
+
+    chromosomes
+        Chromosomes to profile. By default, every chromosome in the reference.
+        type: list
+        default: None
+
+    out_format
+        One of: "bed" (bedGraph), "parquet". Inferred from `out_path` if not passed.
+        type: str
+        default: None
+
+    Returns:
+    --------
+    n_windows or ProfileDict
+        The number of windows written to `out_path`, or {chromosome: numpy.ndarray of
+        `metric`, one value per window}.
+        type: int or dict
+
+    Notes:
+    ------
+    (1) Each chromosome is read from disk one block of windows (about 16 Mb) at a time,
+        so memory does not scale with chromosome length.
+    (2) bedGraph rows are chrom, start, end, value. Windows without a defined value
+        (e.g. all-N windows for "gc") are not written, as bedGraph has no missing value;
+        they are NaN in the returned arrays. `n_windows` counts the windows written.
+    """
+
+    if not metric in _METRICS:
+        raise ValueError("metric must be one of: {}. Got: {}".format(", ".join(_METRICS), metric))
+    if step is None:
+        step = window_size
+
+    FastaIndex = _load_fasta_index(ref_seq_path)
+    if chromosomes is None:
+        chromosomes = list(FastaIndex.keys())
+
+    ProfileDict = {}
+    writer_context = _FeatureWriter(out_path, out_format) if out_path else contextlib.nullcontext()
+    with writer_context as writer, open(ref_seq_path, "rb") as fasta:
+        for chromosome in chromosomes:
+            record = FastaIndex[chromosome]
+            Values = []
+            for block_start, block_end, window_starts, window_ends in _define_window_blocks(
+                record.length, window_size, step
+            ):
+                encoded_sequence = _encode_sequence(_fetch_region(fasta, record, block_start, block_end))
+                values = _window_composition(
+                    encoded_sequence, window_starts - block_start, window_ends - block_start
+                )[metric]
+                if writer is None:
+                    Values.append(values)
+                else:
+                    is_defined = ~np.isnan(values)
+                    writer.write(
+                        pd.DataFrame(
+                            {
+                                "chrom": chromosome,
+                                "start": window_starts[is_defined],
+                                "end": window_ends[is_defined],
+                                "value": values[is_defined].round(4),
+                            }
+                        )
+                    )
+            if writer is None:
+                ProfileDict[chromosome] = np.concatenate(Values) if Values else np.empty(0, dtype=np.float32)
+
+    if writer is None:
+        return ProfileDict
+
+    return writer.n_written
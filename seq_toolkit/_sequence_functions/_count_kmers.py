@@ -0,0 +1,202 @@
+
+# _count_kmers.py
+
+__module_name__ = "_count_kmers.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+# package imports #
+# --------------- #
+import numpy as np
+import pandas as pd
+
+
+# local imports #
+# ------------- #
+from ._encode_sequence import _encode_sequence_indices, _UNKNOWN_BASE_INDEX
+from .._utility_functions._instrumentation import _instrumented
+
+
+_MAX_K = 31  # 2 bits per base in a uint64
+_MAX_DENSE_K = 12  # 4 ** 12 bins (128 MB of int64 counts) for bincount
+_CHUNK_SIZE = 2 ** 24
+_BASES = np.array(list("ACGT"))
+
+
+def _kmer_codes(encoded_sequence, k, canonical=False):
+
+    """
+    2-bit codes of every k-mer of an index-encoded sequence that contains only {A, C, G, T}.
+
+    Parameters:
+    -----------
+    encoded_sequence
+        Output of `_encode_sequence_indices`.
+        type: numpy.ndarray (uint8)
+
+    k
+        type: int
+
+    canonical
+        Return the smaller of each k-mer's code and its reverse complement's code.
+        type: bool
+        default: False
+
+    Returns:
+    --------
+    codes
+        Code of the k-mer at each valid position. The first base occupies the most
+        significant bits, so numeric order is lexicographic order.
+        type: numpy.ndarray (uint64)
+    """
+
+    n_positions = len(encoded_sequence) - k + 1
+    if n_positions <= 0:
+        return np.empty(0, dtype=np.uint64)
+
+    is_unknown = encoded_sequence == _UNKNOWN_BASE_INDEX
+    unknown_cumsum = np.concatenate([[0], np.cumsum(is_unknown, dtype=np.int64)])
+    is_valid = unknown_cumsum[k:] == unknown_cumsum[:n_positions]
+
+    bases = (encoded_sequence & 3).astype(np.uint64)
+    codes = np.zeros(n_positions, dtype=np.uint64)
+    for j in range(k):
+        codes <<= np.uint64(2)
+        codes |= bases[j : j + n_positions]
+
+    if canonical:
+        rc_codes = np.zeros(n_positions, dtype=np.uint64)
+        for j in range(k):
+            rc_codes |= (np.uint64(3) - bases[j : j + n_positions]) << np.uint64(2 * j)
+        codes = np.minimum(codes, rc_codes)
+
+    return codes[is_valid]
+
+
+def _reverse_complement_codes(codes, k):
+
+    """2-bit codes of the reverse complements of k-mer codes."""
+
+    rc_codes = np.zeros(len(codes), dtype=np.uint64)
+    for j in range(k):
+        base = (codes >> np.uint64(2 * j)) & np.uint64(3)
+        rc_codes |= (np.uint64(3) - base) << np.uint64(2 * (k - 1 - j))
+
+    return rc_codes
+
+
+def _decode_kmers(codes, k):
+
+    """k-mer strings from 2-bit codes."""
+
+    codes = np.asarray(codes, dtype=np.uint64)
+    shifts = np.arange(2 * (k - 1), -1, -2, dtype=np.uint64)
+    bases = _BASES[((codes[:, None] >> shifts) & np.uint64(3)).astype(np.int64)]
+
+    return bases.view("<U{}".format(k)).ravel() if len(codes) else np.empty(0, dtype="<U{}".format(k))
+
+
+def _merge_kmer_counts(tables):
+
+    """Sum sparse (sorted codes, int64 counts) tables with a single sort."""
+
+    codes = np.concatenate([codes for codes, _ in tables])
+    counts = np.concatenate([counts for _, counts in tables])
+    if len(codes) == 0:
+        return codes, counts
+
+    order = np.argsort(codes, kind="stable")
+    codes, counts = codes[order], counts[order]
+    first = np.flatnonzero(np.append(True, codes[1:] != codes[:-1]))
+
+    return codes[first], np.add.reduceat(counts, first)
+
+
+@_instrumented("count_kmers")
+def _count_kmers(sequence, k, canonical=False, return_codes=False, chunk_size=_CHUNK_SIZE):
+
+    """
+    Count every k-mer of a DNA sequence.
+
+    Parameters:
+    -----------
+    sequence
+        type: str
+
+    k
+        k-mer length, up to 31.
+        type: int
+
+    canonical
+        Count each k-mer together with its reverse complement, under the lexicographically
+        smaller of the two.
+        type: bool
+        default: False
+
+    return_codes
+        Return 2-bit integer codes rather than k-mer strings (cheaper for large k).
+        type: bool
+        default: False
+
+    chunk_size
+        Number of positions encoded and counted at once; bounds temporary memory.
+        type: int
+
+    Returns:
+    --------
+    kmer_counts
+        Counts indexed by k-mer, in lexicographic order. For k <= 12, every possible
+        (canonical) k-mer is included, with zero counts; for larger k, only observed k-mers.
+        If `return_codes`, a (codes, counts) tuple of numpy arrays.
+        type: pandas.Series or tuple
+
+    Notes:
+    ------
+    (1) The sequence is encoded once per chunk as 2-bit base indices and each k-mer's code
+        is built with k vectorized shift-or passes. Chunks overlap by (k - 1) bases.
+    (2) For k <= 12, codes are counted with `numpy.bincount` into a dense table of 4^k
+        counts; for larger k, each chunk is reduced with sort/unique, and chunk tables are
+        summed into a running sparse table in batches (see `_merge_kmer_counts`).
+    (3) k-mers containing a base other than {A, C, G, T} are skipped.
+    (4) With k = 1, counts are the base composition, e.g. weights for `Seq`.
+    """
+
+    if not 1 <= k <= _MAX_K:
+        raise ValueError("k must be between 1 and {}. Got: {}".format(_MAX_K, k))
+
+    is_dense = k <= _MAX_DENSE_K
+    if is_dense:
+        counts = np.zeros(4 ** k, dtype=np.int64)
+    else:
+        codes, counts = np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)
+        pending_tables, n_pending = [], 0
+
+    n_positions = len(sequence) - k + 1
+    for chunk_start in range(0, max(n_positions, 0), chunk_size):
+        chunk_seq = sequence[chunk_start : chunk_start + chunk_size + k - 1]
+        chunk_codes = _kmer_codes(_encode_sequence_indices(chunk_seq), k, canonical)
+        if is_dense:
+            counts += np.bincount(chunk_codes.astype(np.int64), minlength=4 ** k)
+        else:
+            pending_tables.append(np.unique(chunk_codes, return_counts=True))
+            n_pending += len(pending_tables[-1][0])
+            # reduce only once the pending tables outgrow the running table: each k-mer
+            # is re-sorted O(log n_chunks) times, and memory stays within ~2x the table
+            if n_pending >= max(len(codes), chunk_size):
+                codes, counts = _merge_kmer_counts([(codes, counts)] + pending_tables)
+                pending_tables, n_pending = [], 0
+
+    if not is_dense and pending_tables:
+        codes, counts = _merge_kmer_counts([(codes, counts)] + pending_tables)
+
+    if is_dense:
+        codes = np.arange(4 ** k, dtype=np.uint64)
+        if canonical:
+            is_canonical = codes <= _reverse_complement_codes(codes, k)
+            codes, counts = codes[is_canonical], counts[is_canonical]
+
+    if return_codes:
+        return codes, counts
+
+    return pd.Series(counts, index=_decode_kmers(codes, k), name="count")
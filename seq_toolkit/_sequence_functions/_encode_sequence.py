@@ -0,0 +1,167 @@
+
+# _encode_sequence.py
+
+__module_name__ = "_encode_sequence.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+# package imports #
+# --------------- #
+import numpy as np
+
+
+def _build_translation_table(BaseDict, default=0):
+
+    """Build a 256-byte table for `bytes.translate`, mapping upper- and lower-case bases."""
+
+    table = bytearray([default] * 256)
+    for base, value in BaseDict.items():
+        table[ord(base.upper())] = value
+        table[ord(base.lower())] = value
+
+    return bytes(table)
+
+
+_TRANSLATE_BLOCK_SIZE = 2 ** 22
+
+
+def _as_bytes(sequence):
+
+    """Copy of a sequence (str, bytes, or any buffer, e.g. a `SequenceStore` view) as bytes."""
+
+    if isinstance(sequence, str):
+        return sequence.encode("ascii")
+
+    return bytes(sequence)
+
+
+def _translate_sequence(sequence, table):
+
+    """
+    Apply a `bytes.translate` table to a sequence, returning a uint8 array.
+
+    Parameters:
+    -----------
+    sequence
+        type: str, bytes, or any buffer (e.g. a memoryview over shared memory)
+
+    table
+        Output of `_build_translation_table`.
+        type: bytes
+
+    Notes:
+    ------
+    (1) Buffers other than bytes are translated one block at a time into the output
+        array, so they are never copied whole.
+    """
+
+    if isinstance(sequence, str):
+        sequence = sequence.encode("ascii")
+    if isinstance(sequence, bytes):
+        return np.frombuffer(sequence.translate(table), dtype=np.uint8)
+
+    view = memoryview(sequence).cast("B")
+    encoded_sequence = np.empty(len(view), dtype=np.uint8)
+    for block_start in range(0, len(view), _TRANSLATE_BLOCK_SIZE):
+        block = bytes(view[block_start : block_start + _TRANSLATE_BLOCK_SIZE])
+        encoded_sequence[block_start : block_start + len(block)] = np.frombuffer(block.translate(table), dtype=np.uint8)
+
+    return encoded_sequence
+
+
+def _check_encoded(encoded_sequence, valid_codes, encoder):
+
+    """
+    Return an already-encoded array, after checking it holds only the codes of `encoder`.
+
+    Raises a ValueError for any other array, e.g. bitmasks passed where base indices are
+    expected (any T, encoded 8, is out of range for indices and vice versa for 3).
+    """
+
+    is_valid = np.zeros(256, dtype=bool)
+    is_valid[list(valid_codes)] = True
+    if encoded_sequence.dtype != np.uint8 or not is_valid[encoded_sequence].all():
+        raise ValueError(
+            "Arrays must be encoded with {} (uint8 codes {}). Got: dtype {}, codes {}".format(
+                encoder,
+                sorted(valid_codes),
+                encoded_sequence.dtype,
+                np.unique(encoded_sequence)[:10].tolist(),
+            )
+        )
+
+    return encoded_sequence
+
+
+# one bit per base; anything outside {A, C, G, T} (including N) is encoded as 0
+_BASE_BITMASKS = {"A": 1, "C": 2, "G": 4, "T": 8}
+_BITMASK_TABLE = _build_translation_table(_BASE_BITMASKS)
+
+
+def _encode_sequence(sequence):
+
+    """
+    Encode a DNA sequence as a uint8 array of per-base bitmasks.
+
+    Parameters:
+    -----------
+    sequence
+        A buffer (e.g. a `SequenceStore` view) is read as ASCII text.
+        type: str, bytes, memoryview, or numpy.ndarray
+
+    Returns:
+    --------
+    encoded_sequence
+        A=1, C=2, G=4, T=8. Any other character (e.g. N) is encoded as 0.
+        type: numpy.ndarray (uint8)
+
+    Notes:
+    ------
+    (1) Case-insensitive: soft-masked (lower-case) bases are encoded like upper-case bases.
+    (2) Already-encoded arrays are returned unchanged; any array holding other codes
+        (e.g. the output of `_encode_sequence_indices`) raises a ValueError.
+    """
+
+    if isinstance(sequence, np.ndarray):
+        return _check_encoded(sequence, [0] + list(_BASE_BITMASKS.values()), "_encode_sequence")
+
+    return _translate_sequence(sequence, _BITMASK_TABLE)
+
+
+# 0-3 index per base (A, C, G, T); anything else (including N) is encoded as 4
+_BASE_INDICES = {"A": 0, "C": 1, "G": 2, "T": 3}
+_UNKNOWN_BASE_INDEX = 4
+_INDEX_TABLE = _build_translation_table(_BASE_INDICES, default=_UNKNOWN_BASE_INDEX)
+
+
+def _encode_sequence_indices(sequence):
+
+    """
+    Encode a DNA sequence as a uint8 array of base indices.
+
+    Parameters:
+    -----------
+    sequence
+        A buffer (e.g. a `SequenceStore` view) is read as ASCII text.
+        type: str, bytes, memoryview, or numpy.ndarray
+
+    Returns:
+    --------
+    encoded_sequence
+        A=0, C=1, G=2, T=3. Any other character (e.g. N) is encoded as 4.
+        type: numpy.ndarray (uint8)
+
+    Notes:
+    ------
+    (1) Case-insensitive. Already-encoded arrays are returned unchanged; any array holding
+        other codes (e.g. the bitmasks of `_encode_sequence`) raises a ValueError.
+    (2) The complement of an index b in {0, 1, 2, 3} is 3 - b.
+    """
+
+    if isinstance(sequence, np.ndarray):
+        return _check_encoded(
+            sequence, list(_BASE_INDICES.values()) + [_UNKNOWN_BASE_INDEX], "_encode_sequence_indices"
+        )
+
+    return _translate_sequence(sequence, _INDEX_TABLE)
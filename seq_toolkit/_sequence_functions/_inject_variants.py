@@ -0,0 +1,363 @@
+
+# _inject_variants.py
+
+__module_name__ = "_inject_variants.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+# package imports #
+# --------------- #
+import gzip
+import numpy as np
+import pandas as pd
+
+
+# local imports #
+# ------------- #
+from ._encode_sequence import _as_bytes, _encode_sequence_indices, _UNKNOWN_BASE_INDEX
+from .._utility_functions._instrumentation import _instrumented
+
+
+_BASES = np.frombuffer(b"ACGT", dtype=np.uint8)
+_UPPER_LOOKUP = np.frombuffer(bytes(range(256)).upper(), dtype=np.uint8)
+_VARIANT_COLUMNS = ["Chromosome", "Start", "End", "Ref", "Alt", "Type"]
+
+
+def _variant_types(ref_lengths, alt_lengths):
+
+    """SNP, INS, DEL or MNP (equal-length substitutions of several bases)."""
+
+    return np.select(
+        [alt_lengths > ref_lengths, alt_lengths < ref_lengths, ref_lengths == 1],
+        ["INS", "DEL", "SNP"],
+        default="MNP",
+    )
+
+
+def _allele_matrix(alleles):
+
+    """
+    Alleles as a zero-padded byte matrix.
+
+    Returns:
+    --------
+    allele_matrix
+        type: numpy.ndarray of uint8, shape (n_alleles, max allele length)
+
+    allele_lengths
+        type: numpy.ndarray
+    """
+
+    alleles = np.asarray(alleles, dtype="S")
+    allele_matrix = np.ascontiguousarray(alleles).view(np.uint8).reshape(len(alleles), alleles.itemsize)
+
+    return allele_matrix, np.char.str_len(alleles).astype(np.int64)
+
+
+def _matrix_alleles(allele_matrix):
+
+    """Inverse of `_allele_matrix`: fixed-width rows (zero-padded) -> str alleles."""
+
+    allele_matrix = np.ascontiguousarray(allele_matrix)
+
+    return allele_matrix.view("S{}".format(allele_matrix.shape[1])).ravel().astype(str)
+
+
+@_instrumented("simulate_variants", count=len)
+def _simulate_variants(
+    sequence,
+    snp_rate=1e-3,
+    indel_rate=1e-4,
+    max_indel_length=10,
+    insertion_fraction=0.5,
+    chromosome="seq",
+    seed=None,
+):
+
+    """
+    Draw random SNPs and small indels for a sequence.
+
+    Parameters:
+    -----------
+    sequence
+        e.g. from `Seq.simulate` or `fetch_chromosome`.
+        type: str, bytes, or any buffer (e.g. a `SequenceStore` view)
+
+    snp_rate
+        Expected SNPs per base.
+        type: float
+        default: 1e-3
+
+    indel_rate
+        Expected indels per base.
+        type: float
+        default: 1e-4
+
+    max_indel_length
+        Indel lengths are drawn uniformly from [1, max_indel_length].
+        type: int
+        default: 10
+
+    insertion_fraction
+        Fraction of indels that are insertions.
+        type: float
+        default: 0.5
+
+    chromosome
+        type: str
+        default: "seq"
+
+    seed
+        type: int
+        default: None
+
+    Returns:
+    --------
+    variant_df
+        pandas DataFrame with columns: ["Chromosome", "Start", "End", "Ref", "Alt", "Type"],
+        sorted by Start. Start and End (0-based, half-open) span Ref. As in VCF, indels
+        carry the preceding base (e.g. Ref="A", Alt="ATG" inserts "TG").
+        type: pandas.DataFrame
+
+    Notes:
+    ------
+    (1) Positions, lengths and alleles of all variants are drawn at once. Variants whose
+        Ref would overlap an earlier variant, run off the end of the sequence or contain
+        a base other than A, C, G or T are dropped, so the realized rates are slightly
+        below `snp_rate` and `indel_rate`.
+    """
+
+    encoded_sequence = _encode_sequence_indices(sequence)
+    n_bases = len(encoded_sequence)
+    rng = np.random.default_rng(seed)
+
+    n_snps, n_indels = rng.binomial(n_bases, snp_rate), rng.binomial(n_bases, indel_rate)
+    positions = rng.choice(n_bases, min(n_snps + n_indels, n_bases), replace=False, shuffle=False)
+    is_indel = rng.permutation(np.arange(len(positions)) >= n_snps)
+    order = np.argsort(positions, kind="stable")
+    positions, is_indel = positions[order].astype(np.int64), is_indel[order]
+
+    indel_lengths = rng.integers(1, max_indel_length + 1, len(positions))
+    is_insertion = is_indel & (rng.random(len(positions)) < insertion_fraction)
+    is_deletion = is_indel & ~is_insertion
+    ref_lengths = np.where(is_deletion, indel_lengths + 1, 1)
+    alt_lengths = np.where(is_insertion, indel_lengths + 1, 1)
+    ends = positions + ref_lengths
+
+    # reference bases under each Ref (padded to the widest allele)
+    width = max_indel_length + 1
+    columns = np.arange(width)
+    ref_idx = encoded_sequence[np.minimum(positions[:, None] + columns, max(n_bases - 1, 0))]
+    in_ref = columns < ref_lengths[:, None]
+
+    previous_ends = np.concatenate([[0], np.maximum.accumulate(ends)[:-1]]).astype(np.int64)
+    keep = (ends <= n_bases) & (positions >= previous_ends)
+    keep &= ~((ref_idx == _UNKNOWN_BASE_INDEX) & in_ref).any(axis=1)
+
+    alt_idx = np.zeros_like(ref_idx)
+    alt_idx[:, 0] = np.where(is_indel, ref_idx[:, 0], (ref_idx[:, 0] + rng.integers(1, 4, len(positions))) % 4)
+    alt_idx[:, 1:] = rng.integers(0, 4, (len(positions), width - 1))
+    in_alt = columns < alt_lengths[:, None]
+
+    ref_matrix = np.where(in_ref, _BASES[ref_idx % 4], 0).astype(np.uint8)
+    alt_matrix = np.where(in_alt, _BASES[alt_idx % 4], 0).astype(np.uint8)
+
+    variant_df = pd.DataFrame(
+        {
+            "Chromosome": chromosome,
+            "Start": positions[keep],
+            "End": ends[keep],
+            "Ref": _matrix_alleles(ref_matrix[keep]),
+            "Alt": _matrix_alleles(alt_matrix[keep]),
+            "Type": _variant_types(ref_lengths[keep], alt_lengths[keep]),
+        },
+        columns=_VARIANT_COLUMNS,
+    )
+
+    return variant_df
+
+
+@_instrumented("inject_variants")
+def _inject_variants(sequence, variant_df, chromosome=None, vcf_path=None):
+
+    """
+    Apply variants to a sequence.
+
+    Parameters:
+    -----------
+    sequence
+        type: str, bytes, or any buffer (e.g. a `SequenceStore` view)
+
+    variant_df
+        pandas DataFrame with columns: ["Start", "Ref", "Alt"] (0-based Start, as from
+        `simulate_variants`). Variants may not overlap.
+        type: pandas.DataFrame
+
+    chromosome
+        If passed, only rows of `variant_df` with this "Chromosome" are applied; also
+        names the sequence in the liftover table and VCF.
+        type: str
+        default: None
+
+    vcf_path
+        Write the applied variants as a truth VCF (gzipped if the path ends in ".gz").
+        type: str
+        default: None
+
+    Returns:
+    --------
+    mutated_sequence
+        type: str if `sequence` is a str; otherwise bytes
+
+    liftover_df
+        pandas DataFrame with columns: ["Chromosome", "Start", "End", "NewStart", "NewEnd"]:
+        blocks of the original sequence, [Start, End), and where they lie in the mutated
+        sequence, [NewStart, NewEnd). Bases inserted or deleted by indels are in no block.
+        type: pandas.DataFrame
+
+    Notes:
+    ------
+    (1) Every substitution (SNPs and MNPs) is applied with one fancy-indexing assignment.
+        Indels are then applied with a single concatenation plan: the sequence is split
+        at every indel's Ref span, and the pieces are joined with the Alt alleles in
+        between, in one `np.concatenate`. No variant is applied one at a time.
+    (2) Ref alleles are checked (case-insensitively) against the sequence; a mismatch
+        raises a ValueError.
+    (3) Unchanged bases keep their case, including the bases an Alt allele shares with
+        its Ref (e.g. the anchor base of an indel).
+    """
+
+    if chromosome is not None and "Chromosome" in variant_df.columns:
+        variant_df = variant_df.loc[variant_df["Chromosome"] == chromosome]
+    chromosome = "seq" if chromosome is None else chromosome
+    variant_df = variant_df.sort_values("Start", kind="stable")
+
+    mutated = np.frombuffer(_as_bytes(sequence), dtype=np.uint8).copy()
+    n_bases = len(mutated)
+    starts = variant_df["Start"].to_numpy(dtype=np.int64)
+    ref_matrix, ref_lengths = _allele_matrix(variant_df["Ref"].to_numpy())
+    alt_matrix, alt_lengths = _allele_matrix(variant_df["Alt"].to_numpy())
+    ends = starts + ref_lengths
+
+    if len(starts) and (starts.min() < 0 or ends.max() > n_bases):
+        raise ValueError(
+            "Variants must lie within the sequence (length {}). Got: {}-{}".format(n_bases, starts.min(), ends.max())
+        )
+    if (starts[1:] < ends[:-1]).any():
+        overlap_idx = np.flatnonzero(starts[1:] < ends[:-1])[0]
+        raise ValueError("Variants may not overlap. Got: Start {} and {}".format(starts[overlap_idx], starts[overlap_idx + 1]))
+
+    width = max(ref_matrix.shape[1], alt_matrix.shape[1])
+    ref_matrix = np.pad(ref_matrix, [(0, 0), (0, width - ref_matrix.shape[1])])
+    alt_matrix = np.pad(alt_matrix, [(0, 0), (0, width - alt_matrix.shape[1])])
+    ref_positions = np.minimum(starts[:, None] + np.arange(width), max(n_bases - 1, 0))
+    in_ref = np.arange(width) < ref_lengths[:, None]
+
+    if len(starts):
+        is_mismatch = ((_UPPER_LOOKUP[mutated[ref_positions]] != _UPPER_LOOKUP[ref_matrix]) & in_ref).any(axis=1)
+        if is_mismatch.any():
+            mismatch_idx = np.flatnonzero(is_mismatch)[0]
+            raise ValueError(
+                "Ref alleles must match the sequence. Got: {} at Start {}".format(
+                    variant_df["Ref"].iloc[mismatch_idx], starts[mismatch_idx]
+                )
+            )
+        # bases an Alt shares with its Ref (e.g. an indel's anchor base) are copied from
+        # the sequence, so that soft-masked bases stay lower-case
+        ref_bases = mutated[ref_positions]
+        is_shared = in_ref & (np.arange(width) < alt_lengths[:, None])
+        is_shared &= _UPPER_LOOKUP[alt_matrix] == _UPPER_LOOKUP[ref_bases]
+        alt_matrix = np.where(is_shared, ref_bases, alt_matrix)
+
+    # substitutions: one fancy-indexing step
+    in_substitution = in_ref & (ref_lengths == alt_lengths)[:, None]
+    mutated[ref_positions[in_substitution]] = alt_matrix[in_substitution]
+
+    # indels: split around each Ref span and rejoin with the Alt alleles, in one concatenation
+    is_indel = ref_lengths != alt_lengths
+    indel_starts, indel_ends = starts[is_indel], ends[is_indel]
+    indel_alts = alt_matrix[is_indel][np.arange(width) < alt_lengths[is_indel][:, None]]
+    if is_indel.any():
+        pieces = np.split(mutated, np.column_stack([indel_starts, indel_ends]).ravel())
+        pieces[1::2] = np.split(indel_alts, np.cumsum(alt_lengths[is_indel])[:-1])
+        mutated = np.concatenate(pieces)
+
+    # liftover blocks: aligned stretches between indels (an indel's shared leading bases are aligned)
+    aligned_lengths = np.minimum(ref_lengths[is_indel], alt_lengths[is_indel])
+    block_starts = np.concatenate([[0], indel_ends]).astype(np.int64)
+    block_ends = np.concatenate([indel_starts + aligned_lengths, [n_bases]]).astype(np.int64)
+    offsets = np.concatenate([[0], np.cumsum(alt_lengths[is_indel] - ref_lengths[is_indel])]).astype(np.int64)
+    is_block = block_ends > block_starts
+    liftover_df = pd.DataFrame(
+        {
+            "Chromosome": chromosome,
+            "Start": block_starts[is_block],
+            "End": block_ends[is_block],
+            "NewStart": (block_starts + offsets)[is_block],
+            "NewEnd": (block_ends + offsets)[is_block],
+        }
+    )
+
+    if vcf_path is not None:
+        vcf_variant_df = variant_df.assign(Chromosome=chromosome)
+        _write_vcf(vcf_variant_df, vcf_path, chrom_sizes={chromosome: n_bases})
+
+    mutated_sequence = mutated.tobytes()
+    if isinstance(sequence, str):
+        return mutated_sequence.decode("ascii"), liftover_df
+
+    return mutated_sequence, liftover_df
+
+
+def _write_vcf(variant_df, out_path, chrom_sizes=None):
+
+    """
+    Write variants as a (truth) VCF.
+
+    Parameters:
+    -----------
+    variant_df
+        pandas DataFrame with columns: ["Chromosome", "Start", "Ref", "Alt"], e.g. from
+        `simulate_variants`; Start is 0-based.
+        type: pandas.DataFrame
+
+    out_path
+        Gzipped if it ends in ".gz".
+        type: str
+
+    chrom_sizes
+        {chromosome: length}, for ##contig header lines.
+        type: dict
+        default: None
+
+    Returns:
+    --------
+    None, writes VCF.
+    """
+
+    ref_lengths = variant_df["Ref"].str.len().to_numpy()
+    alt_lengths = variant_df["Alt"].str.len().to_numpy()
+
+    vcf_df = pd.DataFrame(
+        {
+            "#CHROM": variant_df["Chromosome"].to_numpy(),
+            "POS": variant_df["Start"].to_numpy() + 1,
+            "ID": ".",
+            "REF": variant_df["Ref"].to_numpy(),
+            "ALT": variant_df["Alt"].to_numpy(),
+            "QUAL": ".",
+            "FILTER": "PASS",
+            "INFO": np.char.add("TYPE=", _variant_types(ref_lengths, alt_lengths)),
+        }
+    ).sort_values(["#CHROM", "POS"], kind="stable")
+
+    header = ["##fileformat=VCFv4.2", "##source=seq_toolkit"]
+    for chromosome, length in (chrom_sizes or {}).items():
+        header.append("##contig=<ID={},length={}>".format(chromosome, length))
+    header.append('##INFO=<ID=TYPE,Number=1,Type=String,Description="Variant type: SNP, MNP, INS or DEL">')
+
+    open_function = gzip.open if out_path.endswith(".gz") else open
+    with open_function(out_path, "wt") as vcf:
+        vcf.write("\n".join(header) + "\n")
+        vcf_df.to_csv(vcf, sep="\t", index=False)
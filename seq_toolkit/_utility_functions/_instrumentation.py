@@ -0,0 +1,328 @@
+
+# _instrumentation.py
+
+__module_name__ = "_instrumentation.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+# import packages #
+# --------------- #
+import functools
+import json
+import threading
+import time
+import tracemalloc
+
+
+# tracemalloc.reset_peak() was added in Python 3.9
+_HAS_RESET_PEAK = hasattr(tracemalloc, "reset_peak")
+
+# the running _Profiler, if any; every instrumentation point checks only this
+_ACTIVE_PROFILER = None
+_PROFILER_LOCK = threading.Lock()
+
+
+class _NullStage:
+
+    """Returned by `_stage` while profiling is disabled: entering, exiting and counting do nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def count(self, n_items):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+
+    """Times one pass through an instrumented stage and reports it to the profiler on exit."""
+
+    __slots__ = ["profiler", "name", "n_items", "start"]
+
+    def __init__(self, profiler, name):
+
+        self.profiler = profiler
+        self.name = name
+        self.n_items = 0
+
+    def __enter__(self):
+
+        self.profiler._enter_memory_frame()
+        self.start = time.perf_counter()
+
+        return self
+
+    def __exit__(self, *exc_info):
+
+        elapsed = time.perf_counter() - self.start
+        peak_memory = self.profiler._exit_memory_frame()
+        self.profiler._record(self.name, elapsed, self.n_items, peak_memory)
+
+        return False
+
+    def count(self, n_items):
+
+        """Add `n_items` (bases, hits, records, ...) to this pass through the stage."""
+
+        self.n_items += int(n_items)
+
+
+def _stage(name):
+
+    """
+    Context manager around one internal stage (e.g. "regex_scan").
+
+    Usage:
+    ------
+        with _stage("regex_scan") as stage:
+            ...
+            stage.count(len(sequence))
+
+    Notes:
+    ------
+    (1) While no `Profiler` is running, this is a global lookup and returns a shared
+        no-op object.
+    """
+
+    profiler = _ACTIVE_PROFILER
+    if profiler is None:
+        return _NULL_STAGE
+
+    return _Stage(profiler, name)
+
+
+def _instrumented(name, count=None):
+
+    """
+    Decorator recording calls to a function as the stage `name`.
+
+    Parameters:
+    -----------
+    name
+        type: str
+
+    count
+        Called with the function's return value to give the number of items produced,
+        e.g. `len` for a hit table.
+        type: callable
+        default: None
+
+    Notes:
+    ------
+    (1) While no `Profiler` is running, the wrapper calls straight through.
+    """
+
+    def decorator(function):
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            profiler = _ACTIVE_PROFILER
+            if profiler is None:
+                return function(*args, **kwargs)
+            with _Stage(profiler, name) as stage:
+                result = function(*args, **kwargs)
+                if count is not None:
+                    stage.count(count(result))
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+class _Profiler:
+
+    """
+    Opt-in timing, item counts and peak memory for seq_toolkit's public functions and
+    internal stages.
+
+    Parameters:
+    -----------
+    trace_memory
+        Also record the peak memory allocated (by Python and numpy) during each stage,
+        using `tracemalloc`. Adds substantial overhead; off by default. On Python 3.8,
+        where the peak cannot be reset, stage peaks are upper bounds.
+        type: bool
+        default: False
+
+    callback
+        Called with one record per completed stage:
+        {"stage", "time" (s), "items", "peak_memory" (bytes, or None)}.
+        e.g. to forward events to an external metrics pipeline.
+        type: callable
+        default: None
+
+    Usage:
+    ------
+        with seq_toolkit.Profiler() as profiler:
+            seq_toolkit.query_motif(sequence, "CANNTG", verbose=False)
+
+        profiler.to_dict()
+        profiler.to_jsonl("profile.jsonl")
+
+    Notes:
+    ------
+    (1) Instrumented public functions are recorded under their public name (e.g.
+        "query_motif", "Gene.create"); internal stages under: "reverse_complement",
+        "iupac_scan", "regex_scan", "mismatch_scan", "multi_motif_scan",
+        "build_motif_hits", "fasta_parse", "fasta_fetch", "gtf_load", "cluster", "merge".
+    (2) Stages nest: a stage's time includes the stages it calls.
+    (3) While no `Profiler` is running, each instrumentation point costs one global
+        lookup. Only one `Profiler` may run at a time.
+    (4) Stages run in worker processes (e.g. `scan_genome` with n_workers > 1) are not
+        recorded; stages run in threads are.
+    """
+
+    def __init__(self, trace_memory=False, callback=None):
+
+        self.trace_memory = trace_memory
+        self.callback = callback
+        self.Stages = {}
+        self._lock = threading.Lock()
+        self._memory_frames = threading.local()
+        self._started_tracemalloc = False
+
+    def start(self):
+
+        """Start recording. Returns self."""
+
+        global _ACTIVE_PROFILER
+
+        with _PROFILER_LOCK:
+            if _ACTIVE_PROFILER is not None:
+                raise ValueError("Another Profiler is already running: {}".format(_ACTIVE_PROFILER))
+            if self.trace_memory and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            _ACTIVE_PROFILER = self
+
+        return self
+
+    def stop(self):
+
+        """Stop recording; recorded stages are kept."""
+
+        global _ACTIVE_PROFILER
+
+        with _PROFILER_LOCK:
+            if _ACTIVE_PROFILER is self:
+                _ACTIVE_PROFILER = None
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+    def reset(self):
+
+        """Discard recorded stages."""
+
+        with self._lock:
+            self.Stages = {}
+
+    def _enter_memory_frame(self):
+
+        """
+        Open a peak-memory frame for a stage. Frames nest: the tracemalloc peak is reset
+        on entry, after folding it into the enclosing frame.
+        """
+
+        if not self.trace_memory:
+            return
+
+        frames = getattr(self._memory_frames, "frames", None)
+        if frames is None:
+            frames = self._memory_frames.frames = []
+
+        current, peak = tracemalloc.get_traced_memory()
+        if frames:
+            frames[-1][1] = max(frames[-1][1], peak)
+        if _HAS_RESET_PEAK:
+            tracemalloc.reset_peak()
+        frames.append([current, current])
+
+    def _exit_memory_frame(self):
+
+        """Close the innermost frame; returns its peak, in bytes above its starting allocation."""
+
+        if not self.trace_memory:
+            return None
+
+        frames = self._memory_frames.frames
+        start_memory, frame_peak = frames.pop()
+        frame_peak = max(frame_peak, tracemalloc.get_traced_memory()[1])
+        if frames:
+            frames[-1][1] = max(frames[-1][1], frame_peak)
+
+        return frame_peak - start_memory
+
+    def _record(self, name, elapsed, n_items, peak_memory):
+
+        """"""
+
+        with self._lock:
+            Stage = self.Stages.get(name)
+            if Stage is None:
+                Stage = self.Stages[name] = {"calls": 0, "time": 0.0, "items": 0, "peak_memory": None}
+            Stage["calls"] += 1
+            Stage["time"] += elapsed
+            Stage["items"] += n_items
+            if peak_memory is not None:
+                Stage["peak_memory"] = max(Stage["peak_memory"] or 0, peak_memory)
+
+        if self.callback is not None:
+            self.callback({"stage": name, "time": elapsed, "items": n_items, "peak_memory": peak_memory})
+
+    def to_dict(self):
+
+        """
+        Returns:
+        --------
+        StageDict
+            {stage: {"calls", "time" (s, total), "items" (total), "peak_memory" (bytes,
+            max over calls; None without `trace_memory`)}}
+            type: dict
+        """
+
+        with self._lock:
+            return {name: dict(Stage) for name, Stage in self.Stages.items()}
+
+    def to_jsonl(self, out_path=None):
+
+        """
+        One JSON object per stage: {"stage", "calls", "time", "items", "peak_memory"}.
+
+        Parameters:
+        -----------
+        out_path
+            File to append the lines to. If None, the lines are returned as a string.
+            type: str
+            default: None
+        """
+
+        lines = "".join(
+            json.dumps(dict({"stage": name}, **Stage)) + "\n" for name, Stage in self.to_dict().items()
+        )
+        if out_path is None:
+            return lines
+
+        with open(out_path, "a") as jsonl:
+            jsonl.write(lines)
+
+    def __repr__(self):
+
+        return "Profiler(stages={}, trace_memory={})".format(len(self.Stages), self.trace_memory)
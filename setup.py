@@ -1,4 +1,4 @@
-from setuptools import setup
+from setuptools import setup, find_namespace_packages
 import re
 import os
 import sys
@@ -15,14 +15,23 @@ setup(
     long_description=open("README.md", encoding="utf-8").read(),
     long_description_content_type="text/markdown",
     description="seq-toolkit - Basic sequence manipulation tools. A vintools package.",
-    packages=[
-        "seq_toolkit",
-    ],
-    
+    packages=find_namespace_packages(include=["seq_toolkit", "seq_toolkit.*"]),
+    entry_points={
+        "console_scripts": [
+            "seq-toolkit = seq_toolkit._cli_functions._cli:main",
+        ],
+    },
+
     install_requires=[
         "pandas>=1.3.3",
 	"licorice>=0.0.2",
+        "regex",
+        "natsort",
     ],
+    extras_require={
+        "parquet": ["pyarrow"],
+        "test": ["pytest", "pyarrow"],
+    },
     classifiers=[
         "Development Status :: 2 - Pre-Alpha",
         "Programming Language :: Python :: 3.7",
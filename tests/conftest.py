@@ -0,0 +1,162 @@
+
+# conftest.py
+
+__module_name__ = "conftest.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+"""
+Shared fixtures and naive reference implementations.
+
+Each vectorized engine is tested against a deliberately simple, per-position Python
+version of the same computation, on small random inputs.
+"""
+
+
+# import packages #
+# --------------- #
+from itertools import repeat
+import re
+import numpy as np
+import pytest
+
+
+IUPAC_BASES = {
+    "A": "A", "C": "C", "G": "G", "T": "T",
+    "R": "AG", "Y": "CT", "S": "CG", "W": "AT", "K": "GT", "M": "AC",
+    "B": "CGT", "D": "AGT", "H": "ACT", "V": "ACG", "N": "ACGT",
+}
+_COMPLEMENT = str.maketrans("ACGTRYSWKMBDHVNacgtryswkmbdhvn", "TGCAYRSWMKVHDBNtgcayrswmkvhdbn")
+
+
+def reverse_complement(sequence):
+
+    """"""
+
+    return sequence.translate(_COMPLEMENT)[::-1]
+
+
+def random_sequence(rng, n_bases, alphabet="ACGT", soft_mask=False):
+
+    """Random sequence; with `soft_mask`, random stretches are lower-cased."""
+
+    sequence = "".join(rng.choice(list(alphabet), n_bases))
+    if not soft_mask:
+        return sequence
+
+    is_lower = np.repeat(rng.random(n_bases // 10 + 1) < 0.3, 10)[:n_bases]
+
+    return "".join(base.lower() if lower else base for base, lower in zip(sequence, is_lower))
+
+
+def naive_iupac_hits(sequence, motif, max_mismatches=0, collapse_palindromes=True):
+
+    """{(start, end, strand, mismatches)}: forward-strand, 0-based, half-open spans."""
+
+    sequence = sequence.upper()
+    rc_motif = reverse_complement(motif)
+    strand_motifs = [("+", motif)]
+    if not (collapse_palindromes and rc_motif == motif):
+        strand_motifs.append(("-", rc_motif))
+
+    hits = set()
+    for strand, strand_motif in strand_motifs:
+        for start in range(len(sequence) - len(strand_motif) + 1):
+            window = sequence[start : start + len(strand_motif)]
+            mismatches = sum(
+                not (code == "N" or base in IUPAC_BASES[code]) for base, code in zip(window, strand_motif)
+            )
+            if mismatches <= max_mismatches:
+                hits.add((start, start + len(strand_motif), strand, mismatches))
+
+    return hits
+
+
+def naive_regex_hits(sequence, pattern):
+
+    """Every start position with a (leftmost, greedy) match, on both strands."""
+
+    compiled = re.compile(pattern)
+    sequence = sequence.upper()
+    rc_sequence = reverse_complement(sequence)
+
+    hits = set()
+    for start in range(len(sequence)):
+        match = compiled.match(sequence, start)
+        if match:
+            hits.add((start, match.end(), "+"))
+        rc_match = compiled.match(rc_sequence, start)
+        if rc_match:
+            hits.add((len(sequence) - rc_match.end(), len(sequence) - start, "-"))
+
+    return hits
+
+
+def hit_spans(motif_df, motif_key="motif", columns=()):
+
+    """
+    {(start, end, strand, *columns)} from a `query_motif`-style table: forward-strand,
+    0-based, half-open spans (undoing the (start - 1, end) / (end + 1, start) convention),
+    followed by the values of any further `columns` (e.g. "mismatches", "score").
+    """
+
+    reported_starts = motif_df["{}.start".format(motif_key)].to_numpy()
+    reported_ends = motif_df["{}.end".format(motif_key)].to_numpy()
+    strands = motif_df["{}.strand".format(motif_key)].astype(str).to_numpy()
+    extra_values = zip(*[motif_df["{}.{}".format(motif_key, column)].tolist() for column in columns]) if columns else repeat(())
+
+    spans = set()
+    for reported_start, reported_end, strand, extra in zip(reported_starts, reported_ends, strands, extra_values):
+        if strand == "+":
+            spans.add((int(reported_start) + 1, int(reported_end), "+") + extra)
+        else:
+            spans.add((int(reported_end), int(reported_start) - 1, "-") + extra)
+
+    return spans
+
+
+def naive_merge(intervals):
+
+    """Merge overlapping and book-ended (start, end) intervals."""
+
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+
+    return [tuple(interval) for interval in merged]
+
+
+def write_fasta(path, Records, line_width=60):
+
+    """"""
+
+    with open(path, "w") as fasta:
+        for name, sequence in Records.items():
+            fasta.write(">{}\n".format(name))
+            for line_start in range(0, len(sequence), line_width):
+                fasta.write(sequence[line_start : line_start + line_width] + "\n")
+
+    return str(path)
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+@pytest.fixture
+def genome(tmp_path, rng):
+
+    """A small soft-masked genome with N runs: ({chromosome: sequence}, fasta path)."""
+
+    Records = {
+        "chr1": random_sequence(rng, 3001, soft_mask=True),
+        "chr2": random_sequence(rng, 997) + "N" * 20 + random_sequence(rng, 500),
+        "chr10": random_sequence(rng, 61),
+    }
+
+    return Records, write_fasta(tmp_path / "genome.fa", Records)
@@ -0,0 +1,186 @@
+
+# test_cli.py
+
+__module_name__ = "test_cli.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+"""
+`seq-toolkit` subcommands, run through `main` on small files, vs naive Python.
+"""
+
+
+# import packages #
+# --------------- #
+import gzip
+import numpy as np
+import pytest
+
+
+# local imports #
+# ------------- #
+from seq_toolkit._cli_functions._cli import main
+from conftest import reverse_complement, naive_iupac_hits, naive_regex_hits, naive_merge
+
+
+def read_fasta(path):
+
+    """{header: sequence}, and the set of line lengths of every record's sequence lines."""
+
+    Records, line_lengths, header = {}, set(), None
+    with open(path) as fasta:
+        for line in fasta.read().splitlines():
+            if line.startswith(">"):
+                header = line[1:]
+                Records[header] = ""
+            else:
+                Records[header] += line
+                line_lengths.add(len(line))
+
+    return Records, line_lengths
+
+
+@pytest.mark.parametrize("line_width", [0, 7, 60])
+def test_revcomp(genome, tmp_path, line_width):
+
+    Records, fasta_path = genome
+    out_path = str(tmp_path / "revcomp.fa")
+
+    assert main(["revcomp", fasta_path, "-o", out_path, "--line-width", str(line_width)]) == 0
+
+    RevcompRecords, line_lengths = read_fasta(out_path)
+    assert RevcompRecords == {name: reverse_complement(sequence) for name, sequence in Records.items()}
+    if line_width:
+        assert max(line_lengths) == line_width
+
+
+def test_revcomp_raw_lines(tmp_path):
+
+    in_path, out_path = tmp_path / "lines.txt", str(tmp_path / "revcomp.txt")
+    in_path.write_text("ACGTTn\nggcA\n")
+
+    assert main(["revcomp", str(in_path), "-o", out_path]) == 0
+    with open(out_path) as out_file:
+        assert out_file.read() == "nAACGT\nTgcc\n"
+
+
+@pytest.mark.parametrize("motif", ["GAATTC", "CANNTG", "GA[AT]{1,3}TC"])
+@pytest.mark.parametrize("chunk_size", [11, 300, 100_000])
+def test_motif_scan(genome, tmp_path, motif, chunk_size):
+
+    Records, fasta_path = genome
+    out_path = str(tmp_path / "hits.bed")
+
+    assert main(["motif-scan", motif, fasta_path, "-o", out_path, "--chunk-size", str(chunk_size), "--name", "site"]) == 0
+
+    with open(out_path) as bed:
+        hits = [line.split("\t") for line in bed.read().splitlines()]
+    observed = {(chromosome, int(start), int(end), strand) for chromosome, start, end, _, _, strand in hits}
+    assert {name for _, _, _, name, _, _ in hits} <= {"site"}
+
+    if motif.isalpha():
+        expected = {
+            (chromosome, start, end, strand)
+            for chromosome, sequence in Records.items()
+            for start, end, strand, _ in naive_iupac_hits(sequence, motif)
+        }
+    else:
+        expected = {
+            (chromosome,) + span
+            for chromosome, sequence in Records.items()
+            for span in naive_regex_hits(sequence, motif)
+        }
+    assert len(hits) == len(expected)
+    assert observed == expected
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 10_000])
+@pytest.mark.parametrize("compress", [False, True])
+def test_merge(tmp_path, chunk_size, compress):
+
+    rng = np.random.default_rng(chunk_size)
+    Features = {chromosome: [] for chromosome in ["chr1", "chr10", "chr2"]}
+    lines = ["track name=features", "browser position chr1:1-100", "# comment"]
+    for chromosome in Features:
+        starts = np.sort(rng.integers(0, 500, 30))
+        for start, length in zip(starts.tolist(), rng.integers(1, 30, 30).tolist()):
+            Features[chromosome].append((start, start + length))
+            lines.append("{}\t{}\t{}\tname\t0\t+".format(chromosome, start, start + length))
+
+    in_path = str(tmp_path / ("features.bed.gz" if compress else "features.bed"))
+    with (gzip.open(in_path, "wt") if compress else open(in_path, "w")) as bed:
+        bed.write("\n".join(lines) + "\n")
+    out_path = str(tmp_path / "merged.bed")
+
+    assert main(["merge", in_path, "-o", out_path, "--chunk-size", str(chunk_size)]) == 0
+
+    with open(out_path) as merged_bed:
+        observed = [tuple(line.split("\t")[:3]) for line in merged_bed.read().splitlines()]
+    expected = [
+        (chromosome, str(start), str(end))
+        for chromosome, features in Features.items()
+        for start, end in naive_merge(features)
+    ]
+    assert observed == expected
+
+
+def test_merge_rejects_unsorted(tmp_path, capsys):
+
+    in_path = tmp_path / "unsorted.bed"
+    in_path.write_text("chr1\t10\t20\nchr1\t5\t8\n")
+
+    with pytest.raises(SystemExit) as exit_info:
+        main(["merge", str(in_path), "-o", str(tmp_path / "merged.bed")])
+    assert exit_info.value.code == 2
+    assert "sorted" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("line_width", [0, 13, 60])
+def test_fetch(genome, tmp_path, line_width):
+
+    Records, fasta_path = genome
+    bed_path = tmp_path / "regions.bed"
+    bed_path.write_text("track name=regions\nchr1\t0\t10\nchr2\t990\t1030\n")
+    out_path = str(tmp_path / "regions.fa")
+
+    argv = ["fetch", fasta_path, "chr10", "chr1:2,001-2,500", "chr2:1-1", "-b", str(bed_path), "-o", out_path]
+    assert main(argv + ["--line-width", str(line_width)]) == 0
+
+    FetchedRecords, line_lengths = read_fasta(out_path)
+    assert FetchedRecords == {
+        "chr10": Records["chr10"],
+        "chr1:2001-2500": Records["chr1"][2000:2500],
+        "chr2:1-1": Records["chr2"][:1],
+        "chr1:1-10": Records["chr1"][:10],
+        "chr2:991-1030": Records["chr2"][990:1030],
+    }
+    if line_width:
+        assert max(line_lengths) == line_width
+
+
+@pytest.mark.parametrize("region", ["chrX", "chr1:10-5"])
+def test_fetch_rejects_invalid_regions(genome, tmp_path, region):
+
+    _, fasta_path = genome
+    with pytest.raises(SystemExit) as exit_info:
+        main(["fetch", fasta_path, region, "-o", str(tmp_path / "regions.fa")])
+    assert exit_info.value.code == 2
+
+
+def test_simulate(tmp_path):
+
+    out_path = str(tmp_path / "simulated.fa")
+    argv = ["simulate", "1000", "-n", "3", "--prefix", "read", "--seed", "7", "--weights", "1", "0", "0", "1"]
+
+    assert main(argv + ["-o", out_path]) == 0
+
+    Records, line_lengths = read_fasta(out_path)
+    assert list(Records) == ["read1", "read2", "read3"]
+    assert all(len(sequence) == 1000 and set(sequence) <= set("AT") for sequence in Records.values())
+    assert max(line_lengths) == 60
+
+    # seeded runs are reproducible
+    repeat_path = str(tmp_path / "repeat.fa")
+    main(argv + ["-o", repeat_path])
+    assert read_fasta(repeat_path)[0] == Records
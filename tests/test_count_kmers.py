@@ -0,0 +1,141 @@
+
+# test_count_kmers.py
+
+__module_name__ = "test_count_kmers.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+"""
+k-mer counts (dense and sparse tables, chunked) and composition profiles vs `collections.Counter`.
+"""
+
+
+# import packages #
+# --------------- #
+from collections import Counter
+import numpy as np
+import pandas as pd
+import pytest
+
+
+# local imports #
+# ------------- #
+from seq_toolkit import count_kmers, composition_profile, composition_profile_genome
+from conftest import reverse_complement, random_sequence
+
+
+def naive_kmer_counts(sequence, k, canonical=False):
+
+    """Counter of every k-mer composed only of {A, C, G, T}."""
+
+    sequence = sequence.upper()
+    kmers = (sequence[i : i + k] for i in range(len(sequence) - k + 1))
+    kmers = (kmer for kmer in kmers if not set(kmer) - set("ACGT"))
+    if canonical:
+        kmers = (min(kmer, reverse_complement(kmer)) for kmer in kmers)
+
+    return Counter(kmers)
+
+
+@pytest.fixture(params=range(3))
+def sequence(request):
+
+    rng = np.random.default_rng(request.param)
+
+    # low-complexity stretches, so that sparse tables hold repeated k-mers
+    return (
+        random_sequence(rng, 1500, soft_mask=True)
+        + "N" * 7
+        + random_sequence(rng, 40) * 5
+        + random_sequence(rng, 300, alphabet="AC")
+    )
+
+
+@pytest.mark.parametrize("k", [1, 2, 3, 6])
+@pytest.mark.parametrize("canonical", [False, True])
+@pytest.mark.parametrize("chunk_size", [1, 64, 2 ** 22])
+def test_dense_kmer_counts(sequence, k, canonical, chunk_size):
+
+    kmer_counts = count_kmers(sequence, k, canonical=canonical, chunk_size=chunk_size)
+
+    expected = naive_kmer_counts(sequence, k, canonical)
+    assert kmer_counts[kmer_counts > 0].to_dict() == dict(expected)
+    assert list(kmer_counts.index) == sorted(kmer_counts.index)
+    if canonical:
+        assert all(kmer <= reverse_complement(kmer) for kmer in kmer_counts.index)
+    else:
+        assert len(kmer_counts) == 4 ** k
+
+
+@pytest.mark.parametrize("k", [13, 21, 31])
+@pytest.mark.parametrize("canonical", [False, True])
+@pytest.mark.parametrize("chunk_size", [7, 100, 2 ** 22])
+def test_sparse_kmer_counts(sequence, k, canonical, chunk_size):
+
+    kmer_counts = count_kmers(sequence, k, canonical=canonical, chunk_size=chunk_size)
+
+    assert kmer_counts.to_dict() == dict(naive_kmer_counts(sequence, k, canonical))
+    assert list(kmer_counts.index) == sorted(kmer_counts.index)
+
+
+def test_kmer_codes(sequence):
+
+    codes, counts = count_kmers(sequence, 15, return_codes=True, chunk_size=50)
+    kmer_counts = count_kmers(sequence, 15)
+
+    np.testing.assert_array_equal(counts, kmer_counts.to_numpy())
+    assert np.all(np.diff(codes.astype(np.int64)) > 0)
+
+
+@pytest.mark.parametrize("k", [0, 32])
+def test_kmer_length_bounds(k):
+    with pytest.raises(ValueError):
+        count_kmers("ACGT", k)
+
+
+@pytest.mark.parametrize("window_size, step, offset", [(100, None, 0), (64, 25, 3), (1000, 1000, 0)])
+def test_composition_profile(sequence, window_size, step, offset):
+
+    profile_df = composition_profile(sequence, window_size=window_size, step=step, offset=offset)
+
+    expected_starts = list(range(offset, len(sequence) + offset, step or window_size))
+    assert profile_df["start"].tolist() == expected_starts
+    for start, end, gc, cpg_oe, n_fraction in profile_df[["start", "end", "gc", "cpg_oe", "n_fraction"]].to_numpy().tolist():
+        window = sequence[int(start) - offset : int(end) - offset].upper()
+        assert len(window) == min(window_size, len(sequence) - int(start) + offset)
+        n_known = sum(window.count(base) for base in "ACGT")
+        n_c, n_g, n_cpg = window.count("C"), window.count("G"), window.count("CG")
+        np.testing.assert_allclose(gc, (n_c + n_g) / n_known if n_known else np.nan, rtol=1e-6)
+        np.testing.assert_allclose(cpg_oe, n_cpg * n_known / (n_c * n_g) if n_c * n_g else np.nan, rtol=1e-6)
+        np.testing.assert_allclose(n_fraction, 1 - n_known / len(window), rtol=1e-6)
+
+
+@pytest.mark.parametrize("out_name", ["gc.bedGraph", "gc.parquet"])
+def test_composition_profile_genome_skips_undefined_windows(genome, tmp_path, out_name):
+
+    _, fasta_path = genome
+    out_path = str(tmp_path / out_name)
+    ProfileDict = composition_profile_genome(fasta_path, metric="gc", window_size=10)
+
+    n_windows = composition_profile_genome(fasta_path, out_path, metric="gc", window_size=10)
+
+    if out_name.endswith(".parquet"):
+        profile_df = pd.read_parquet(out_path)
+    else:
+        profile_df = pd.read_csv(out_path, sep="\t", header=None, names=["chrom", "start", "end", "value"], dtype={"value": str})
+        assert not profile_df["value"].str.lower().eq("nan").any()
+        profile_df["value"] = profile_df["value"].astype(float)
+
+    # the all-N stretch of chr2 has no defined GC content: NaN in memory, absent on disk
+    assert np.isnan(ProfileDict["chr2"][100])
+    expected = [
+        (chromosome, window * 10, round(float(value), 4))
+        for chromosome, values in ProfileDict.items()
+        for window, value in enumerate(values.tolist())
+        if not np.isnan(value)
+    ]
+    assert n_windows == len(profile_df) == len(expected)
+    observed = [(chromosome, start, value) for chromosome, start, value in profile_df[["chrom", "start", "value"]].to_numpy().tolist()]
+    assert [row[:2] for row in observed] == [row[:2] for row in expected]
+    np.testing.assert_allclose([row[2] for row in observed], [row[2] for row in expected], atol=1e-4)
@@ -0,0 +1,142 @@
+
+# test_extract_features.py
+
+__module_name__ = "test_extract_features.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+"""
+Feature and transcript extraction (offsets into one buffer) vs slicing and joining each one.
+"""
+
+
+# import packages #
+# --------------- #
+import numpy as np
+import pandas as pd
+import pytest
+
+
+# local imports #
+# ------------- #
+from seq_toolkit import extract_features, extract_transcripts, SequenceStore
+from conftest import reverse_complement
+
+
+def random_gtf(rng, Records, n_transcripts):
+
+    """
+    Mixed-strand transcripts of 1-4 exons on random chromosomes, rows shuffled, with
+    "transcript" and "CDS" rows that extraction must skip.
+    """
+
+    rows = []
+    for i in range(n_transcripts):
+        chromosome = rng.choice([chromosome for chromosome, sequence in Records.items() if len(sequence) > 100])
+        n_exons = rng.integers(1, 5)
+        bounds = np.sort(rng.choice(len(Records[chromosome]), 2 * n_exons, replace=False))
+        strand = rng.choice(["+", "-"])
+        transcript_id = "tx{}".format(i)
+        rows.append((chromosome, "transcript", bounds[0] + 1, bounds[-1], strand, transcript_id))
+        for start, end in zip(bounds[0::2].tolist(), bounds[1::2].tolist()):
+            rows.append((chromosome, "exon", start + 1, end, strand, transcript_id))
+            rows.append((chromosome, "CDS", start + 1, end, strand, transcript_id))
+
+    gtf = pd.DataFrame(rows, columns=["seqname", "feature", "start", "end", "strand", "transcript_id"])
+
+    return gtf.iloc[rng.permutation(len(gtf))].reset_index(drop=True)
+
+
+def naive_transcripts(Records, gtf, feature="exon"):
+
+    """{transcript_id: sequence}, in order of first appearance: exons joined in ascending order."""
+
+    exon_df = gtf.loc[gtf["feature"] == feature]
+    Transcripts = {}
+    for transcript_id in pd.unique(exon_df["transcript_id"]):
+        transcript_df = exon_df.loc[exon_df["transcript_id"] == transcript_id].sort_values("start")
+        sequence = "".join(
+            Records[chromosome][start - 1 : end]
+            for chromosome, start, end in transcript_df[["seqname", "start", "end"]].to_numpy().tolist()
+        )
+        Transcripts[transcript_id] = reverse_complement(sequence) if transcript_df["strand"].iloc[0] == "-" else sequence
+
+    return Transcripts
+
+
+@pytest.fixture(params=["fasta", "store"])
+def reference(request, genome):
+
+    Records, fasta_path = genome
+    if request.param == "fasta":
+        yield fasta_path
+    else:
+        with SequenceStore(fasta_path) as store:
+            yield store
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_extract_transcripts(genome, reference, tmp_path, seed):
+
+    Records, _ = genome
+    gtf = random_gtf(np.random.default_rng(seed), Records, 12)
+    transcripts = extract_transcripts(gtf, reference)
+
+    expected = naive_transcripts(Records, gtf)
+    assert transcripts.to_dict() == expected
+    assert list(transcripts) == list(expected)
+    for transcript_id, sequence in expected.items():
+        assert transcripts.fetch(transcript_id) == sequence
+        assert bytes(transcripts[transcript_id]) == sequence.encode()
+
+    fasta_path = str(tmp_path / "transcripts.fa")
+    transcripts.to_fasta(fasta_path, line_width=0)
+    with open(fasta_path) as fasta:
+        lines = fasta.read().splitlines()
+    assert dict(zip([line[1:] for line in lines[0::2]], lines[1::2])) == expected
+
+
+def test_extract_transcripts_chromosomes(genome, reference):
+
+    Records, _ = genome
+    gtf = random_gtf(np.random.default_rng(7), Records, 10)
+    transcripts = extract_transcripts(gtf, reference, chromosomes=["chr2"])
+
+    assert transcripts.to_dict() == naive_transcripts(Records, gtf.loc[gtf["seqname"] == "chr2"])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_extract_features(genome, seed):
+
+    Records, fasta_path = genome
+    rng = np.random.default_rng(seed)
+    gtf = random_gtf(rng, {"chr1": Records["chr1"]}, 6)
+    gene_df = gtf.assign(start=gtf["start"] - 1)
+
+    with SequenceStore(fasta_path) as store:
+        for sequence in [Records["chr1"], store["chr1"]]:
+            # each feature on its own, reverse complemented on the minus strand
+            features = extract_features(
+                gene_df, sequence, start_key="start", end_key="end", feature_key="feature", strand_key="strand"
+            )
+            exon_df = gene_df.loc[gene_df["feature"] == "exon"]
+            expected = [
+                reverse_complement(Records["chr1"][start:end]) if strand == "-" else Records["chr1"][start:end]
+                for start, end, strand in exon_df[["start", "end", "strand"]].to_numpy().tolist()
+            ]
+            assert list(features.to_dict().values()) == expected
+            assert [features.fetch(i) for i in range(len(features))] == expected
+
+            # plus-strand features are views into `sequence`
+            plus_features = extract_features(gene_df, sequence, start_key="start", end_key="end", feature_key="feature")
+            assert list(plus_features.to_dict().values()) == [
+                Records["chr1"][start:end] for start, end in exon_df[["start", "end"]].to_numpy().tolist()
+            ]
+
+            # spliced, one sequence per transcript
+            transcripts = extract_features(
+                gene_df, sequence, spliced=True, start_key="start", end_key="end", feature_key="feature",
+                group_key="transcript_id", strand_key="strand",
+            )
+            assert transcripts.to_dict() == naive_transcripts(Records, gtf)
@@ -0,0 +1,76 @@
+
+# test_find_crispr_guides.py
+
+__module_name__ = "test_find_crispr_guides.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+"""
+Chunked, parallel CRISPR guide enumeration vs a per-position search of each strand.
+"""
+
+
+# import packages #
+# --------------- #
+import pandas as pd
+import pytest
+
+
+# local imports #
+# ------------- #
+from seq_toolkit import find_crispr_guides
+from conftest import IUPAC_BASES, reverse_complement
+
+
+def naive_guides(sequence, pam, guide_length, pam_side):
+
+    """{(start, end, guide, strand, pam)}: forward-strand, 0-based, half-open protospacer spans."""
+
+    sequence = sequence.upper()
+    n_bases, site_length = len(sequence), guide_length + len(pam)
+    guide_offset, pam_offset = (0, guide_length) if pam_side == "3prime" else (len(pam), 0)
+
+    guides = set()
+    for strand, strand_sequence in [("+", sequence), ("-", reverse_complement(sequence))]:
+        for site_start in range(n_bases - site_length + 1):
+            guide_start = site_start + guide_offset
+            guide = strand_sequence[guide_start : guide_start + guide_length]
+            site_pam = strand_sequence[site_start + pam_offset : site_start + pam_offset + len(pam)]
+            if set(guide) - set("ACGT") or not all(code == "N" or base in IUPAC_BASES[code] for base, code in zip(site_pam, pam)):
+                continue
+            if strand == "-":
+                guide_start = n_bases - (guide_start + guide_length)
+            guides.add((guide_start, guide_start + guide_length, guide, strand, site_pam))
+
+    return guides
+
+
+@pytest.mark.parametrize("pam, pam_side, guide_length", [("NGG", "3prime", 20), ("TTTV", "5prime", 23)])
+@pytest.mark.parametrize("out_name", ["guides.parquet", "guides.bed"])
+def test_find_crispr_guides(genome, tmp_path, pam, pam_side, guide_length, out_name):
+
+    Records, fasta_path = genome
+    out_path = str(tmp_path / out_name)
+
+    n_guides = find_crispr_guides(
+        fasta_path, out_path, pam=pam, guide_length=guide_length, pam_side=pam_side, chunk_size=500, n_workers=2
+    )
+
+    if out_name.endswith(".parquet"):
+        guide_df = pd.read_parquet(out_path)
+    else:
+        guide_df = pd.read_csv(
+            out_path, sep="\t", header=None, names=["chrom", "start", "end", "guide", "gc", "strand", "pam"]
+        )
+    assert n_guides == len(guide_df)
+    assert guide_df["chrom"].tolist() == sorted(guide_df["chrom"], key=list(Records).index)
+
+    for chromosome, sequence in Records.items():
+        chrom_df = guide_df.loc[guide_df["chrom"] == chromosome]
+        observed = [tuple(row) for row in chrom_df[["start", "end", "guide", "strand", "pam"]].to_numpy().tolist()]
+        assert set(observed) == naive_guides(sequence, pam, guide_length, pam_side)
+        assert len(observed) == len(set(observed))
+        assert observed == sorted(observed, key=lambda row: (row[0], row[3] == "-"))
+        for guide, gc in chrom_df[["guide", "gc"]].to_numpy().tolist():
+            assert gc == pytest.approx((guide.count("G") + guide.count("C")) / guide_length)
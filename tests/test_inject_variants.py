@@ -0,0 +1,179 @@
+
+# test_inject_variants.py
+
+__module_name__ = "test_inject_variants.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+"""
+Variant simulation, injection, liftover and VCF output vs applying each variant in turn.
+"""
+
+
+# import packages #
+# --------------- #
+import gzip
+import numpy as np
+import pandas as pd
+import pytest
+
+
+# local imports #
+# ------------- #
+from seq_toolkit import simulate_variants, inject_variants, write_vcf
+from conftest import random_sequence
+
+
+def naive_inject(sequence, variant_df):
+
+    """Splice in one variant at a time, right to left; bases an Alt shares with its Ref keep their case."""
+
+    for start, ref, alt in variant_df.sort_values("Start")[["Start", "Ref", "Alt"]].to_numpy()[::-1].tolist():
+        ref_bases = sequence[start : start + len(ref)]
+        assert ref_bases.upper() == ref.upper()
+        alt = "".join(
+            ref_bases[i] if i < len(ref) and base.upper() == ref_bases[i].upper() else base
+            for i, base in enumerate(alt)
+        )
+        sequence = sequence[:start] + alt + sequence[start + len(ref) :]
+
+    return sequence
+
+
+def naive_liftover(n_bases, variant_df):
+
+    """{position: new position} of every original base that is aligned in the mutated sequence."""
+
+    Liftover, offset, position = {}, 0, 0
+    for start, ref, alt in variant_df.sort_values("Start")[["Start", "Ref", "Alt"]].to_numpy().tolist():
+        for unchanged in range(position, start):
+            Liftover[unchanged] = unchanged + offset
+        n_aligned = len(ref) if len(ref) == len(alt) else min(len(ref), len(alt))
+        for aligned in range(start, start + n_aligned):
+            Liftover[aligned] = aligned + offset
+        offset += len(alt) - len(ref)
+        position = start + len(ref)
+    for unchanged in range(position, n_bases):
+        Liftover[unchanged] = unchanged + offset
+
+    return Liftover
+
+
+@pytest.fixture(params=range(10))
+def sequence_variants(request):
+
+    sequence = random_sequence(np.random.default_rng(request.param), 3000, soft_mask=True)
+    variant_df = simulate_variants(sequence, snp_rate=0.02, indel_rate=0.01, max_indel_length=6, seed=request.param)
+
+    return sequence, variant_df
+
+
+def test_simulate_variants(sequence_variants):
+
+    sequence, variant_df = sequence_variants
+
+    assert len(variant_df) > 0
+    assert variant_df["Start"].is_monotonic_increasing
+    assert (variant_df["Start"].to_numpy()[1:] >= variant_df["End"].to_numpy()[:-1]).all()
+    for start, end, ref, alt, variant_type in variant_df[["Start", "End", "Ref", "Alt", "Type"]].to_numpy().tolist():
+        assert sequence[start:end].upper() == ref
+        assert ref != alt
+        if len(ref) == len(alt):
+            assert variant_type == "SNP"
+        else:
+            assert variant_type == ("INS" if len(alt) > len(ref) else "DEL")
+            assert ref[0] == alt[0]
+
+
+def test_inject_variants(sequence_variants):
+
+    sequence, variant_df = sequence_variants
+    mutated_sequence, _ = inject_variants(sequence, variant_df)
+
+    assert mutated_sequence == naive_inject(sequence, variant_df)
+
+
+def test_inject_variants_bytes(sequence_variants):
+
+    sequence, variant_df = sequence_variants
+    mutated_bytes, _ = inject_variants(sequence.encode(), variant_df.sample(frac=1, random_state=0))
+
+    assert mutated_bytes == naive_inject(sequence, variant_df).encode()
+
+
+def test_liftover(sequence_variants):
+
+    sequence, variant_df = sequence_variants
+    mutated_sequence, liftover_df = inject_variants(sequence, variant_df)
+
+    Liftover = {}
+    for start, end, new_start, new_end in liftover_df[["Start", "End", "NewStart", "NewEnd"]].to_numpy().tolist():
+        assert end - start == new_end - new_start
+        Liftover.update(zip(range(start, end), range(new_start, new_end)))
+
+    assert Liftover == naive_liftover(len(sequence), variant_df)
+
+    # aligned bases outside substitutions are unchanged
+    substituted = {
+        position
+        for start, ref, alt in variant_df[["Start", "Ref", "Alt"]].to_numpy().tolist()
+        for position in range(start, start + min(len(ref), len(alt)))
+        if len(ref) == len(alt)
+    }
+    for position, new_position in Liftover.items():
+        if not position in substituted:
+            assert mutated_sequence[new_position] == sequence[position]
+
+
+def test_inject_variants_keeps_anchor_case():
+
+    variant_df = pd.DataFrame({"Start": [1, 4, 8], "Ref": ["C", "TA", "G"], "Alt": ["CGG", "T", "T"]})
+    mutated_sequence, _ = inject_variants("acgtTAcgG", variant_df)
+
+    assert mutated_sequence == "acGGgtTcgT"
+
+
+@pytest.mark.parametrize(
+    "variant_df",
+    [
+        pd.DataFrame({"Start": [2], "Ref": ["A"], "Alt": ["C"]}),
+        pd.DataFrame({"Start": [1, 2], "Ref": ["CG", "G"], "Alt": ["C", "T"]}),
+        pd.DataFrame({"Start": [7], "Ref": ["TA"], "Alt": ["T"]}),
+    ],
+)
+def test_inject_variants_rejects_invalid(variant_df):
+    with pytest.raises(ValueError):
+        inject_variants("ACGTACGT", variant_df)
+
+
+@pytest.mark.parametrize("out_name", ["truth.vcf", "truth.vcf.gz"])
+def test_write_vcf(sequence_variants, tmp_path, out_name):
+
+    sequence, variant_df = sequence_variants
+    vcf_path = str(tmp_path / out_name)
+    inject_variants(sequence, variant_df, chromosome="seq", vcf_path=vcf_path)
+
+    open_function = gzip.open if vcf_path.endswith(".gz") else open
+    with open_function(vcf_path, "rt") as vcf:
+        lines = vcf.read().splitlines()
+
+    assert "##contig=<ID=seq,length={}>".format(len(sequence)) in lines
+    records = [line.split("\t") for line in lines if not line.startswith("#")]
+    assert [(int(pos), ref, alt) for _, pos, _, ref, alt, *_ in records] == [
+        (start + 1, ref, alt) for start, ref, alt in variant_df[["Start", "Ref", "Alt"]].to_numpy().tolist()
+    ]
+
+
+def test_write_vcf_sorts_records(tmp_path):
+
+    variant_df = pd.DataFrame(
+        {"Chromosome": ["chr2", "chr1", "chr1"], "Start": [0, 9, 3], "Ref": ["A", "C", "G"], "Alt": ["T", "CA", "G"]}
+    )
+    vcf_path = str(tmp_path / "truth.vcf")
+    write_vcf(variant_df, vcf_path)
+
+    with open(vcf_path) as vcf:
+        records = [line.split("\t")[:2] for line in vcf.read().splitlines() if not line.startswith("#")]
+
+    assert records == [["chr1", "4"], ["chr1", "10"], ["chr2", "1"]]
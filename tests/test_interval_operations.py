@@ -0,0 +1,218 @@
+
+# test_interval_operations.py
+
+__module_name__ = "test_interval_operations.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+"""
+Sweep-line set operations and incremental merging vs per-base coverage arrays.
+"""
+
+
+# import packages #
+# --------------- #
+import numpy as np
+import pandas as pd
+import pytest
+
+
+# local imports #
+# ------------- #
+from seq_toolkit import GenomicFeatures
+from seq_toolkit._genome_functions._interval_operations import _merge_sorted_feature_chunks
+from conftest import naive_merge
+
+
+CHROM_SIZES = {"chr1": 400, "chr2": 250, "chr10": 120}
+
+
+def random_features(rng, n_features, chromosomes=("chr1", "chr2", "chr10"), max_length=40):
+
+    """Non-empty features in random order, with a 'Name' column recording the row."""
+
+    chromosomes = rng.choice(list(chromosomes), n_features)
+    sizes = np.array([CHROM_SIZES[chromosome] for chromosome in chromosomes])
+    starts = rng.integers(0, sizes - 1)
+    ends = np.minimum(starts + rng.integers(1, max_length, n_features), sizes)
+
+    return pd.DataFrame(
+        {"Chromosome": chromosomes, "Start": starts, "End": ends, "Name": ["f{}".format(i) for i in range(n_features)]}
+    )
+
+
+def coverage(df, chromosome):
+
+    """Boolean per-base coverage of `chromosome`."""
+
+    covered = np.zeros(CHROM_SIZES[chromosome], dtype=bool)
+    for start, end in df.loc[df["Chromosome"] == chromosome, ["Start", "End"]].to_numpy():
+        covered[start:end] = True
+
+    return covered
+
+
+def runs(is_set, offset=0):
+
+    """Maximal runs of True as (start, end) tuples."""
+
+    padded = np.concatenate([[False], is_set, [False]]).astype(np.int8)
+    bounds = np.flatnonzero(np.diff(padded))
+
+    return [(int(start) + offset, int(end) + offset) for start, end in zip(bounds[::2], bounds[1::2])]
+
+
+def rows(df, columns=("Name", "Start", "End")):
+    return [tuple(row) for row in df[list(columns)].astype(object).to_numpy().tolist()]
+
+
+@pytest.fixture(params=range(20))
+def features(request):
+
+    rng = np.random.default_rng(request.param)
+
+    return random_features(rng, rng.integers(1, 40)), random_features(rng, rng.integers(1, 40), ("chr1", "chr2"))
+
+
+def test_merge(features):
+
+    df, _ = features
+    merged_df = GenomicFeatures(df, incremental=True).merged_df
+
+    expected = [
+        (chromosome, start, end)
+        for chromosome in ["chr1", "chr2", "chr10"]
+        for start, end in naive_merge(df.loc[df["Chromosome"] == chromosome, ["Start", "End"]].to_numpy().tolist())
+    ]
+    assert rows(merged_df, ["Chromosome", "Start", "End"]) == expected
+
+
+def test_incremental_merge_matches_one_shot(features):
+
+    df, other_df = features
+    all_df = pd.concat([df, other_df], ignore_index=True)
+
+    one_shot = GenomicFeatures(all_df)
+    one_shot.merge()
+
+    incremental = GenomicFeatures()
+    for batch in np.array_split(np.arange(len(all_df)), 4):
+        incremental.add(all_df.iloc[batch])
+        incremental.merged_df
+
+    assert rows(incremental.merged_df, ["Chromosome", "Start", "End"]) == rows(one_shot.merged_df, ["Chromosome", "Start", "End"])
+    assert len(incremental.df) == len(all_df)
+
+
+def test_incremental_add_requires_incremental(features):
+
+    df, other_df = features
+    with pytest.raises(ValueError):
+        GenomicFeatures(df).add(other_df)
+
+
+def test_intersect(features):
+
+    df, other_df = features
+    intersected_df = GenomicFeatures(df).intersect(other_df)
+
+    expected = []
+    for name, chromosome, start, end in df[["Name", "Chromosome", "Start", "End"]].to_numpy().tolist():
+        other_covered = coverage(other_df, chromosome) if chromosome in set(other_df["Chromosome"]) else np.zeros(CHROM_SIZES[chromosome], dtype=bool)
+        expected += [(name, run_start, run_end) for run_start, run_end in runs(other_covered[start:end], start)]
+
+    assert rows(intersected_df) == expected
+    assert list(intersected_df.columns) == list(df.columns)
+
+
+@pytest.mark.parametrize("remove_overlapping", [False, True])
+def test_subtract(features, remove_overlapping):
+
+    df, other_df = features
+    subtracted_df = GenomicFeatures(df).subtract(other_df, remove_overlapping=remove_overlapping)
+
+    expected = []
+    for name, chromosome, start, end in df[["Name", "Chromosome", "Start", "End"]].to_numpy().tolist():
+        other_covered = coverage(other_df, chromosome)[start:end]
+        if remove_overlapping:
+            if not other_covered.any():
+                expected.append((name, start, end))
+        else:
+            expected += [(name, run_start, run_end) for run_start, run_end in runs(~other_covered, start)]
+
+    assert rows(subtracted_df) == expected
+    assert list(subtracted_df.columns) == list(df.columns)
+
+
+def test_complement(features):
+
+    df, _ = features
+    complement_df = GenomicFeatures(df).complement(CHROM_SIZES)
+
+    expected = [
+        (chromosome, start, end)
+        for chromosome in CHROM_SIZES
+        for start, end in runs(~coverage(df, chromosome))
+    ]
+    assert rows(complement_df, ["Chromosome", "Start", "End"]) == expected
+
+
+def test_closest(features):
+
+    df, other_df = features
+    closest_df = GenomicFeatures(df).closest(other_df)
+
+    expected_names, expected_distances = [], []
+    for name, chromosome, start, end in df[["Name", "Chromosome", "Start", "End"]].to_numpy().tolist():
+        other_chrom = other_df.loc[other_df["Chromosome"] == chromosome]
+        if len(other_chrom) == 0:
+            continue
+        gaps = np.maximum(np.maximum(other_chrom["Start"] - end, start - other_chrom["End"]), 0)
+        expected_names.append(name)
+        expected_distances.append(int(gaps.min()))
+
+    assert closest_df["Name"].tolist() == expected_names
+    assert closest_df["Distance"].tolist() == expected_distances
+
+    # the reported feature of `other` lies at the reported distance
+    reported_gaps = np.maximum(
+        np.maximum(closest_df["Start_b"] - closest_df["End"], closest_df["Start"] - closest_df["End_b"]), 0
+    )
+    assert reported_gaps.tolist() == expected_distances
+    assert set(closest_df["Name_b"]) <= set(other_df["Name"])
+
+
+def test_closest_ties():
+
+    df = pd.DataFrame({"Chromosome": ["chr1"] * 2, "Start": [20, 100], "End": [30, 110]})
+    other_df = pd.DataFrame({"Chromosome": ["chr1"] * 4, "Start": [10, 35, 90, 95], "End": [15, 40, 120, 105]})
+
+    closest_df = GenomicFeatures(df).closest(other_df)
+
+    # equally close: the lower coordinates; overlapping: the one reaching furthest right
+    assert closest_df[["Start_b", "End_b", "Distance"]].to_numpy().tolist() == [[10, 15, 5], [90, 120, 0]]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 17, 1000])
+def test_merge_sorted_feature_chunks(features, chunk_size):
+
+    df, _ = features
+    sorted_df = df.sort_values(["Chromosome", "Start"], kind="stable").reset_index(drop=True)
+    chunks = [sorted_df.iloc[i : i + chunk_size] for i in range(0, len(sorted_df), chunk_size)]
+
+    merged_df = pd.concat(list(_merge_sorted_feature_chunks(chunks)), ignore_index=True)
+
+    expected = [
+        (chromosome, start, end)
+        for chromosome in sorted(CHROM_SIZES)
+        for start, end in naive_merge(df.loc[df["Chromosome"] == chromosome, ["Start", "End"]].to_numpy().tolist())
+    ]
+    assert rows(merged_df, ["Chromosome", "Start", "End"]) == expected
+
+
+def test_merge_sorted_feature_chunks_rejects_unsorted():
+
+    unsorted_df = pd.DataFrame({"Chromosome": ["chr1", "chr2", "chr1"], "Start": [0, 0, 5], "End": [1, 1, 6]})
+    with pytest.raises(ValueError):
+        list(_merge_sorted_feature_chunks([unsorted_df]))
@@ -0,0 +1,328 @@
+
+# test_motif_search.py
+
+__module_name__ = "test_motif_search.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+"""
+Motif matchers, counts and chunked genome scans vs per-position Python searches.
+"""
+
+
+# import packages #
+# --------------- #
+import numpy as np
+import pandas as pd
+import pytest
+
+
+# local imports #
+# ------------- #
+from seq_toolkit import query_motif, MotifSearcher, scan_genome, count_motif, count_motif_genome, FMIndex, scan_pwm
+from seq_toolkit._motif_functions._iupac_motif import _compile_iupac_motif
+from seq_toolkit._motif_functions._mismatch_search import _match_iupac_motif_edit_distance
+from seq_toolkit._sequence_functions._encode_sequence import _encode_sequence
+from conftest import IUPAC_BASES, random_sequence, naive_iupac_hits, naive_regex_hits, hit_spans
+
+
+IUPAC_MOTIFS = ["GAATTC", "CANNTG", "TGASTCA", "RRCATG", "ACGTNNNNACGT", "GGWCC", "AC", "T"]
+REGEX_MOTIFS = ["GA[AT]{1,3}TC", "CG(A|TT)G", "AC.?GT", "T{2,4}A"]
+
+
+def spans_without_mismatches(hits):
+    return {(start, end, strand) for start, end, strand, _ in hits}
+
+
+def naive_semiglobal_ends(sequence, motif, max_distance):
+
+    """{end: distance} of every end position at which `motif` aligns within `max_distance` edits."""
+
+    previous = list(range(len(motif) + 1))
+    Ends = {}
+    for position, base in enumerate(sequence, start=1):
+        current = [0]
+        for i, code in enumerate(motif, start=1):
+            substitution = previous[i - 1] + (base not in IUPAC_BASES[code])
+            current.append(min(substitution, previous[i] + 1, current[i - 1] + 1))
+        if current[-1] <= max_distance:
+            Ends[position] = current[-1]
+        previous = current
+
+    return Ends
+
+
+@pytest.fixture(params=range(4))
+def sequence(request):
+    return random_sequence(np.random.default_rng(request.param), 2000, soft_mask=True)
+
+
+@pytest.mark.parametrize("motif", IUPAC_MOTIFS)
+@pytest.mark.parametrize("collapse_palindromes", [True, False])
+def test_iupac_motif(sequence, motif, collapse_palindromes):
+
+    motif_df = query_motif(sequence, motif, verbose=False, collapse_palindromes=collapse_palindromes)
+
+    expected = spans_without_mismatches(naive_iupac_hits(sequence, motif, 0, collapse_palindromes))
+    assert hit_spans(motif_df) == expected
+    assert len(motif_df) == len(expected)
+    assert motif_df["motif.start"].is_monotonic_increasing
+
+
+def test_iupac_motif_skips_n():
+
+    sequence = "GAATTCNNNGAANTCGAATTC"
+    assert hit_spans(query_motif(sequence, "GAATTC", verbose=False)) == {(0, 6, "+"), (15, 21, "+")}
+    for motif in ["GAANTC", "NNNGAA"]:
+        expected = spans_without_mismatches(naive_iupac_hits(sequence, motif.strip("N")))
+        assert hit_spans(query_motif(sequence, motif, verbose=False)) == expected
+
+
+@pytest.mark.parametrize("motif", ["GAATTC", "CANNTG", "TGASTCA", "RRCATG"])
+@pytest.mark.parametrize("max_mismatches", [1, 2])
+def test_hamming_mismatches(sequence, motif, max_mismatches):
+
+    motif_df = query_motif(sequence, motif, verbose=False, max_mismatches=max_mismatches)
+
+    expected = naive_iupac_hits(sequence, motif, max_mismatches)
+    assert hit_spans(motif_df, columns=["mismatches"]) == expected
+    assert len(motif_df) == len(expected)
+
+
+def test_multi_motif_mismatches(sequence):
+
+    Motifs = {"EcoRI": "GAATTC", "Ebox": "CANNTG", "AP1": "TGASTCA"}
+    motif_df = query_motif(sequence, Motifs, verbose=False, max_mismatches=1)
+
+    for motif_id, motif in Motifs.items():
+        motif_hits = motif_df.loc[motif_df["motif.id"] == motif_id]
+        assert hit_spans(motif_hits) == spans_without_mismatches(naive_iupac_hits(sequence, motif, 1))
+        assert len(motif_hits) == len(naive_iupac_hits(sequence, motif, 1))
+
+
+@pytest.mark.parametrize("motif", ["GAATTC", "CANNTG", "TGASTCAGG"])
+@pytest.mark.parametrize("max_distance", [0, 1, 2])
+def test_edit_distance(motif, max_distance):
+
+    sequence = random_sequence(np.random.default_rng(len(motif) + max_distance), 1500)
+    ends, distances = _match_iupac_motif_edit_distance(
+        _encode_sequence(sequence), _compile_iupac_motif(motif), max_distance
+    )
+
+    assert dict(zip(ends.tolist(), distances.tolist())) == naive_semiglobal_ends(sequence, motif, max_distance)
+
+
+@pytest.mark.parametrize("collapse_palindromes", [True, False])
+def test_aho_corasick(sequence, collapse_palindromes):
+
+    motifs = ["GAATTC", "GATC", "ACGT", "TTTA", "TTTAA", "CCGG", "AGGT"]
+    motif_df = query_motif(sequence, motifs, verbose=False, collapse_palindromes=collapse_palindromes)
+
+    for motif in motifs:
+        expected = spans_without_mismatches(naive_iupac_hits(sequence, motif, 0, collapse_palindromes))
+        motif_hits = motif_df.loc[motif_df["motif.id"] == motif]
+        assert hit_spans(motif_hits) == expected
+        assert len(motif_hits) == len(expected)
+
+
+@pytest.mark.parametrize("motif", REGEX_MOTIFS)
+def test_regex_motif(sequence, motif):
+
+    motif_df = query_motif(sequence, motif, verbose=False)
+
+    expected = naive_regex_hits(sequence, motif)
+    assert hit_spans(motif_df) == expected
+    assert len(motif_df) == len(expected)
+
+
+def test_motif_searcher_matches_query_motif(sequence):
+
+    searcher = MotifSearcher("TGASTCA", motif_key="AP1")
+    pd.testing.assert_frame_equal(searcher.scan(sequence), query_motif(sequence, "TGASTCA", motif_key="AP1", verbose=False))
+
+
+@pytest.mark.parametrize(
+    "search",
+    [
+        lambda sequence, **kwargs: query_motif(sequence, "CANNTG", verbose=False, **kwargs),
+        lambda sequence, **kwargs: query_motif(sequence, ["GAATTC", "GATC", "CCGG"], verbose=False, **kwargs),
+        lambda sequence, **kwargs: query_motif(sequence, {"EcoRI": "GAATTC", "Ebox": "CANNTG"}, verbose=False, max_mismatches=1, **kwargs),
+        lambda sequence, **kwargs: scan_pwm(
+            sequence, np.random.default_rng(0).integers(-3, 3, size=(6, 4)).astype(np.float64), threshold=4, log_odds=True, **kwargs
+        ),
+    ],
+    ids=["single", "multi", "mismatches", "pwm"],
+)
+def test_structured_hits_match_frame(sequence, search):
+
+    hits = search(sequence, as_frame=False)
+    motif_df = search(sequence)
+
+    assert isinstance(hits, np.ndarray)
+    assert list(hits.dtype.names) == list(motif_df.columns)
+    assert len(hits) == len(motif_df)
+    Dtypes = {"start": np.int64, "end": np.int64, "strand": np.int8, "id": np.int32, "score": np.float32, "mismatches": np.uint8}
+    for key in hits.dtype.names:
+        assert hits.dtype[key] == Dtypes[key.split(".")[-1]]
+        if key.endswith((".strand", ".id")):
+            np.testing.assert_array_equal(hits[key], motif_df[key].cat.codes.to_numpy())
+        else:
+            np.testing.assert_array_equal(hits[key], motif_df[key].to_numpy())
+
+    # sorted by reported start, then motif id
+    sort_keys = [hits["motif.start"]] if not "motif.id" in hits.dtype.names else [hits["motif.id"], hits["motif.start"]]
+    np.testing.assert_array_equal(np.lexsort(sort_keys), np.arange(len(hits)))
+
+
+@pytest.mark.parametrize("motif", ["GAATTC", "GATC", "ACGTA", "TTT", "A"])
+def test_fm_index(sequence, motif):
+
+    index = FMIndex(sequence.upper())
+    query_df = query_motif(sequence, motif, verbose=False)
+
+    assert index.count(motif) == len(query_df)
+    located_df = index.locate(motif)
+    assert hit_spans(located_df) == hit_spans(query_df)
+    assert len(located_df) == len(query_df)
+
+    uncollapsed = spans_without_mismatches(naive_iupac_hits(sequence, motif, 0, collapse_palindromes=False))
+    assert index.count(motif, collapse_palindromes=False) == len(uncollapsed)
+    assert hit_spans(index.locate(motif, collapse_palindromes=False)) == uncollapsed
+
+
+def test_fm_index_save_load(sequence, tmp_path):
+
+    index = FMIndex(sequence.upper())
+    index.save(str(tmp_path / "index"))
+    loaded = FMIndex.load(str(tmp_path / "index"))
+
+    pd.testing.assert_frame_equal(loaded.locate("GATC"), index.locate("GATC"))
+
+
+@pytest.mark.parametrize("motif", ["GAATTC", "CG", "TGASTCA"])
+@pytest.mark.parametrize("window_size", [None, 97])
+@pytest.mark.parametrize("max_mismatches", [0, 1])
+def test_count_motif(sequence, motif, window_size, max_mismatches):
+
+    counts = count_motif(sequence, motif, window_size=window_size, max_mismatches=max_mismatches, chunk_size=333)
+
+    for strand in ["+", "-"]:
+        starts = np.array([start for start, _, hit_strand, _ in naive_iupac_hits(sequence, motif, max_mismatches) if hit_strand == strand], dtype=np.int64)
+        if window_size is None:
+            assert counts[strand] == len(starts)
+        else:
+            expected = np.bincount(starts // window_size, minlength=-(-len(sequence) // window_size))
+            np.testing.assert_array_equal(counts[strand], expected)
+
+
+def read_bed_spans(bed_path):
+
+    """{(chromosome, start, end, strand)} from a BED file written by `scan_genome`."""
+
+    bed_df = pd.read_csv(bed_path, sep="\t", header=None, dtype={0: str})
+
+    return {(row[0], int(row[1]), int(row[2]), row[5]) for row in bed_df.itertuples(index=False)}
+
+
+@pytest.mark.parametrize("motif", ["GAATTC", "CANNTG", "GA[AT]{1,3}TC", "AC.?GT"])
+@pytest.mark.parametrize("chunk_size", [7, 50, 499, 100_000])
+def test_scan_genome(genome, tmp_path, motif, chunk_size):
+
+    Records, fasta_path = genome
+    out_path = str(tmp_path / "hits.bed")
+    n_hits = scan_genome(fasta_path, motif, out_path, chunk_size=chunk_size, n_workers=1)
+
+    if motif.isalpha():
+        naive = lambda sequence: spans_without_mismatches(naive_iupac_hits(sequence, motif))
+    else:
+        naive = lambda sequence: naive_regex_hits(sequence, motif)
+    expected = {
+        (chromosome, start, end, strand)
+        for chromosome, sequence in Records.items()
+        for start, end, strand in naive(sequence)
+    }
+
+    assert n_hits == len(expected)
+    if n_hits:
+        assert read_bed_spans(out_path) == expected
+
+
+def test_scan_genome_rejects_unbounded_regex(genome, tmp_path):
+
+    _, fasta_path = genome
+    with pytest.raises(ValueError):
+        scan_genome(fasta_path, "GA[AT]+TC", str(tmp_path / "hits.bed"), n_workers=1)
+
+
+def test_scan_genome_writes_empty_parquet(genome, tmp_path):
+
+    _, fasta_path = genome
+    out_path = str(tmp_path / "hits.parquet")
+
+    assert scan_genome(fasta_path, "GAATTCGAATTCGAATTC", out_path, chunk_size=500, n_workers=1) == 0
+
+    hits_df = pd.read_parquet(out_path)
+    assert len(hits_df) == 0
+    assert list(hits_df.columns) == ["chrom", "start", "end", "name", "score", "strand"]
+    assert hits_df["start"].dtype == np.int64
+
+
+@pytest.mark.parametrize("window_size", [None, 101])
+def test_count_motif_genome(genome, window_size):
+
+    Records, fasta_path = genome
+    GenomeCounts = count_motif_genome(fasta_path, "CG", window_size=window_size, chunk_size=211, n_workers=1)
+
+    assert set(GenomeCounts) == set(Records)
+    for chromosome, sequence in Records.items():
+        expected = count_motif(sequence, "CG", window_size=window_size)
+        for strand in ["+", "-"]:
+            np.testing.assert_array_equal(GenomeCounts[chromosome][strand], expected[strand])
+
+
+def naive_pwm_hits(sequence, score_matrix, threshold):
+
+    """{(start, end, strand, score)} of every window scoring >= threshold; windows with N are skipped."""
+
+    sequence = sequence.upper()
+    motif_length = len(score_matrix)
+    Strands = {"+": score_matrix, "-": score_matrix[::-1, ::-1]}
+
+    hits = set()
+    for start in range(len(sequence) - motif_length + 1):
+        window = sequence[start : start + motif_length]
+        if set(window) - set("ACGT"):
+            continue
+        for strand, strand_matrix in Strands.items():
+            score = sum(strand_matrix[i, "ACGT".index(base)] for i, base in enumerate(window))
+            if score >= threshold:
+                hits.add((start, start + motif_length, strand, float(score)))
+
+    return hits
+
+
+@pytest.mark.parametrize("threshold", [2, 6, 9])
+def test_scan_pwm(sequence, threshold):
+
+    # integer scores, so that sums are exact regardless of summation order
+    score_matrix = np.random.default_rng(threshold).integers(-3, 3, size=(6, 4)).astype(np.float64)
+    sequence = sequence[:900] + "N" + sequence[900:]
+    motif_df = scan_pwm(sequence, score_matrix, threshold=threshold, log_odds=True, chunk_size=257)
+
+    expected = naive_pwm_hits(sequence, score_matrix, threshold)
+    assert hit_spans(motif_df, columns=["score"]) == expected
+    assert len(motif_df) == len(expected)
+
+
+def test_scan_pwm_orientation():
+
+    score_matrix = np.random.default_rng(1).integers(-3, 3, size=(4, 4)).astype(np.float64)
+    sequence = random_sequence(np.random.default_rng(2), 500)
+
+    by_positions = scan_pwm(sequence, score_matrix, threshold=3, log_odds=True, orientation="positions")
+    by_bases = scan_pwm(sequence, score_matrix.T, threshold=3, log_odds=True, orientation="bases")
+    pd.testing.assert_frame_equal(by_positions, by_bases)
+
+    labelled = pd.DataFrame(score_matrix.T, index=list("ACGT"))
+    pd.testing.assert_frame_equal(scan_pwm(sequence, labelled, threshold=3, log_odds=True), by_positions)
@@ -0,0 +1,102 @@
+
+# test_plot_gene.py
+
+__module_name__ = "test_plot_gene.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+"""
+Gene model figures, drawn off-screen: one collection per layer, one shape per feature.
+"""
+
+
+# import packages #
+# --------------- #
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection, PolyCollection
+import numpy as np
+import pytest
+
+
+# local imports #
+# ------------- #
+from seq_toolkit import Gene, plot_gene_tracks
+
+
+@pytest.fixture
+def genes():
+
+    np.random.seed(0)
+    genes = []
+    for n_exons in [4, 6, 9]:
+        gene = Gene()
+        gene.create(n_exons=n_exons, verbose=False)
+        genes.append(gene)
+
+    yield genes
+
+    plt.close("all")
+
+
+def features(gene_df, feature):
+    return gene_df.loc[gene_df["gene_feature"] == feature, ["gene_feature.start", "gene_feature.end"]].to_numpy()
+
+
+def covers(segments, start, end, y):
+
+    """Whether any horizontal segment at height `y` spans [start, end]."""
+
+    return any(
+        x_min <= start and end <= x_max and y_min == y_max == y
+        for (x_min, y_min), (x_max, y_max) in np.asarray(segments).tolist()
+    )
+
+
+def test_gene_plot(genes):
+
+    gene = genes[1]
+    gene.plot(label_exons=False)
+    ax = plt.gcf().axes[0]
+
+    body, boundaries = [collection for collection in ax.collections if isinstance(collection, LineCollection)]
+    [exon_blocks] = [collection for collection in ax.collections if isinstance(collection, PolyCollection)]
+    exons, introns = features(gene.gene_df, "exon"), features(gene.gene_df, "intron")
+
+    assert len(exons) == 6
+    assert len(exon_blocks.get_paths()) == len(exons)
+    np.testing.assert_array_equal([path.vertices[:, 0].min() for path in exon_blocks.get_paths()], exons[:, 0])
+
+    # one gene body line, under every intron; two dashed guides per exon
+    assert len(body.get_segments()) == 1
+    assert len(introns) == len(exons) - 1
+    assert all(covers(body.get_segments(), start, end, 1) for start, end in introns)
+    assert len(boundaries.get_segments()) == 2 * len(exons)
+
+
+def test_gene_plot_labels_exons(genes):
+
+    gene = genes[0]
+    gene.plot()
+
+    assert len(plt.gcf().axes[0].texts) == len(features(gene.gene_df, "exon"))
+
+
+def test_plot_gene_tracks(genes, tmp_path):
+
+    out_path = str(tmp_path / "tracks.png")
+    fig, ax = plot_gene_tracks({"a": genes[0], "b": genes[1], "c": genes[2].gene_df}, save=out_path)
+
+    [bodies] = [collection for collection in ax.collections if isinstance(collection, LineCollection)]
+    [exon_blocks] = [collection for collection in ax.collections if isinstance(collection, PolyCollection)]
+
+    assert len(bodies.get_segments()) == len(genes)
+    assert len(exon_blocks.get_paths()) == sum(len(features(gene.gene_df, "exon")) for gene in genes)
+    for track, gene in enumerate(genes):
+        assert all(covers(bodies.get_segments(), start, end, track) for start, end in features(gene.gene_df, "intron"))
+    assert [label.get_text() for label in ax.get_yticklabels()] == ["a", "b", "c"]
+    assert (tmp_path / "tracks.png").stat().st_size > 0
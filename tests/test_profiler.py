@@ -0,0 +1,133 @@
+
+# test_profiler.py
+
+__module_name__ = "test_profiler.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+"""
+Profiler stage timing, counts, peak memory and output, and no-op instrumentation when idle.
+"""
+
+
+# import packages #
+# --------------- #
+import json
+import time
+import numpy as np
+import pytest
+
+
+# local imports #
+# ------------- #
+from seq_toolkit import Profiler, query_motif
+from seq_toolkit._utility_functions._instrumentation import _instrumented, _stage, _NULL_STAGE
+
+
+@_instrumented("outer", count=len)
+def outer(n_inner):
+
+    """Runs the "inner" stage `n_inner` times; returns a list of `n_inner` items."""
+
+    for _ in range(n_inner):
+        with _stage("inner") as stage:
+            time.sleep(0.002)
+            stage.count(3)
+
+    return [None] * n_inner
+
+
+def test_nested_stages():
+
+    with Profiler() as profiler:
+        outer(4)
+        outer(2)
+
+    StageDict = profiler.to_dict()
+    assert set(StageDict) == {"outer", "inner"}
+    assert (StageDict["outer"]["calls"], StageDict["outer"]["items"]) == (2, 6)
+    assert (StageDict["inner"]["calls"], StageDict["inner"]["items"]) == (6, 18)
+    assert StageDict["inner"]["time"] >= 6 * 0.002
+    assert StageDict["outer"]["time"] >= StageDict["inner"]["time"]
+    assert StageDict["outer"]["peak_memory"] is None
+
+
+def test_public_function_stages():
+
+    sequence = "GAATTC" * 50
+    with Profiler() as profiler:
+        motif_df = query_motif(sequence, "GAATTC", verbose=False)
+
+    StageDict = profiler.to_dict()
+    assert StageDict["query_motif"]["calls"] == 1
+    assert StageDict["query_motif"]["items"] == StageDict["build_motif_hits"]["items"] == len(motif_df)
+
+
+def test_to_jsonl(tmp_path):
+
+    with Profiler() as profiler:
+        outer(3)
+
+    lines = profiler.to_jsonl()
+    Records = [json.loads(line) for line in lines.splitlines()]
+    assert {Record.pop("stage"): Record for Record in Records} == profiler.to_dict()
+
+    # lines are appended
+    out_path = str(tmp_path / "profile.jsonl")
+    profiler.to_jsonl(out_path)
+    profiler.to_jsonl(out_path)
+    with open(out_path) as jsonl:
+        assert jsonl.read() == lines * 2
+
+
+def test_callback():
+
+    Records = []
+    with Profiler(callback=Records.append):
+        outer(2)
+
+    # one record per completed stage, inner stages first
+    assert [Record["stage"] for Record in Records] == ["inner", "inner", "outer"]
+    assert [Record["items"] for Record in Records] == [3, 3, 2]
+    assert all(set(Record) == {"stage", "time", "items", "peak_memory"} for Record in Records)
+
+
+def test_trace_memory():
+
+    n_bytes = 8_000_000
+
+    @_instrumented("allocate")
+    def allocate():
+        with _stage("allocate_inner"):
+            return np.ones(n_bytes, dtype=np.uint8).sum()
+
+    with Profiler(trace_memory=True) as profiler:
+        allocate()
+
+    StageDict = profiler.to_dict()
+    assert StageDict["allocate_inner"]["peak_memory"] >= n_bytes
+    assert StageDict["allocate"]["peak_memory"] >= StageDict["allocate_inner"]["peak_memory"]
+
+
+def test_no_op_without_profiler():
+
+    assert _stage("inner") is _NULL_STAGE
+    with _stage("inner") as stage:
+        stage.count(10)
+    assert outer(2) == [None, None]
+
+    with Profiler() as profiler:
+        outer(1)
+    outer(5)
+
+    # nothing is recorded once the profiler is stopped
+    assert profiler.to_dict()["outer"]["calls"] == 1
+    assert _stage("inner") is _NULL_STAGE
+
+
+def test_one_profiler_at_a_time():
+
+    with Profiler():
+        with pytest.raises(ValueError):
+            Profiler().start()
@@ -0,0 +1,147 @@
+
+# test_read_simulator.py
+
+__module_name__ = "test_read_simulator.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+"""
+Simulated FASTQ reads vs the reference slices recorded in the truth table.
+"""
+
+
+# import packages #
+# --------------- #
+import gzip
+import numpy as np
+import pandas as pd
+import pytest
+
+
+# local imports #
+# ------------- #
+from seq_toolkit import ReadSimulator, Gene
+from conftest import reverse_complement, random_sequence
+
+
+READ_LENGTH = 50
+
+
+def read_fastq(path):
+
+    """[(name, sequence, quality)]"""
+
+    open_function = gzip.open if path.endswith(".gz") else open
+    with open_function(path, "rt") as fastq:
+        lines = fastq.read().splitlines()
+    assert lines[2::4] == ["+"] * (len(lines) // 4)
+
+    return [(name[1:], sequence, quality) for name, sequence, quality in zip(lines[0::4], lines[1::4], lines[3::4])]
+
+
+def expected_mates(source, start, end, strand, paired):
+
+    """Mate 1 reads the fragment's strand from its 5' end; mate 2, the other strand."""
+
+    source = source.upper()
+    left, right = source[start : start + READ_LENGTH], reverse_complement(source[end - READ_LENGTH : end])
+    if not paired:
+        return [left] if strand == "+" else [right]
+
+    return [left, right] if strand == "+" else [right, left]
+
+
+@pytest.fixture
+def reference():
+
+    rng = np.random.default_rng(3)
+
+    return {"chr1": random_sequence(rng, 2000, soft_mask=True), "chr2": random_sequence(rng, 300), "chr3": "ACGT" * 10}
+
+
+@pytest.mark.parametrize("out_name", ["reads.fq", "reads.fq.gz"])
+def test_single_end(reference, tmp_path, out_name):
+
+    out_path, truth_path = str(tmp_path / out_name), str(tmp_path / "truth.tsv")
+    simulator = ReadSimulator(read_length=READ_LENGTH, error_rate=(0, 0), seed=0)
+    simulator.simulate(reference, 500, out_path, truth_path=truth_path, chunk_size=128)
+
+    reads = read_fastq(out_path)
+    truth_df = pd.read_csv(truth_path, sep="\t")
+
+    assert list(truth_df.columns) == ["read", "Chromosome", "Start", "End", "Strand", "fragment_length", "errors"]
+    assert [name for name, _, _ in reads] == truth_df["read"].tolist() == ["read{:03d}".format(i) for i in range(1, 501)]
+    assert (truth_df["errors"] == 0).all()
+    assert set(truth_df["Chromosome"]) == {"chr1", "chr2"}
+    for (_, sequence, quality), (chromosome, start, end, strand) in zip(
+        reads, truth_df[["Chromosome", "Start", "End", "Strand"]].to_numpy().tolist()
+    ):
+        assert end - start == READ_LENGTH
+        assert [sequence] == expected_mates(reference[chromosome], start, end, strand, paired=False)
+        assert quality == simulator.quality
+
+
+@pytest.mark.parametrize("interleave", [True, False])
+def test_paired_end(reference, tmp_path, interleave):
+
+    out_path, mate_path, truth_path = [str(tmp_path / name) for name in ["reads_1.fq.gz", "reads_2.fq.gz", "truth.tsv"]]
+    simulator = ReadSimulator(read_length=READ_LENGTH, paired=True, fragment_mean=150, fragment_sd=40, error_rate=(0, 0), seed=1)
+    simulator.simulate(reference, 400, out_path, mate_path=None if interleave else mate_path, truth_path=truth_path, chunk_size=100)
+
+    if interleave:
+        records = read_fastq(out_path)
+        mates = [records[0::2], records[1::2]]
+    else:
+        mates = [read_fastq(out_path), read_fastq(mate_path)]
+    truth_df = pd.read_csv(truth_path, sep="\t")
+
+    assert list(truth_df.columns) == ["read", "Chromosome", "Start", "End", "Strand", "fragment_length", "errors_1", "errors_2"]
+    assert (truth_df[["errors_1", "errors_2"]] == 0).all().all()
+    assert [name for name, _, _ in mates[0]] == [name + "/1" for name in truth_df["read"]]
+    assert [name for name, _, _ in mates[1]] == [name + "/2" for name in truth_df["read"]]
+    for i, (chromosome, start, end, strand, fragment_length) in enumerate(
+        truth_df[["Chromosome", "Start", "End", "Strand", "fragment_length"]].to_numpy().tolist()
+    ):
+        assert end - start == fragment_length
+        assert READ_LENGTH <= fragment_length <= len(reference[chromosome])
+        assert [mates[0][i][1], mates[1][i][1]] == expected_mates(reference[chromosome], start, end, strand, paired=True)
+
+
+def test_substitution_errors(reference, tmp_path):
+
+    out_path, truth_path = str(tmp_path / "reads.fq"), str(tmp_path / "truth.tsv")
+    ReadSimulator(read_length=READ_LENGTH, error_rate=0.05, seed=2).simulate(reference, 300, out_path, truth_path=truth_path)
+
+    truth_df = pd.read_csv(truth_path, sep="\t")
+    for (_, sequence, _), (chromosome, start, end, strand, n_errors) in zip(
+        read_fastq(out_path), truth_df[["Chromosome", "Start", "End", "Strand", "errors"]].to_numpy().tolist()
+    ):
+        [expected] = expected_mates(reference[chromosome], start, end, strand, paired=False)
+        assert sum(base != expected_base for base, expected_base in zip(sequence, expected)) == n_errors
+    assert truth_df["errors"].sum() > 0
+
+
+def test_gene_reads_are_spliced(tmp_path):
+
+    np.random.seed(4)
+    gene = Gene()
+    gene.create(n_exons=8, verbose=False)
+    out_path, truth_path = str(tmp_path / "reads.fq"), str(tmp_path / "truth.tsv")
+    ReadSimulator(read_length=READ_LENGTH, error_rate=(0, 0), seed=4).simulate(gene, 1000, out_path, truth_path=truth_path)
+
+    exon_df = gene.gene_df.loc[gene.gene_df["gene_feature"] == "exon"].sort_values("gene_feature.start")
+    exon_positions = np.concatenate([np.arange(start, end) for start, end in exon_df[["gene_feature.start", "gene_feature.end"]].to_numpy()])
+    transcript = "".join(gene.seq[position] for position in exon_positions)
+    TranscriptPosition = {int(position): i for i, position in enumerate(exon_positions)}
+
+    truth_df = pd.read_csv(truth_path, sep="\t")
+    assert truth_df["spliced"].any() and not truth_df["spliced"].all()
+    for (_, sequence, _), (start, end, strand, spliced) in zip(
+        read_fastq(out_path), truth_df[["Start", "End", "Strand", "spliced"]].to_numpy().tolist()
+    ):
+        # Start and End are gene coordinates of the read's first and last transcript bases
+        transcript_start, transcript_end = TranscriptPosition[start], TranscriptPosition[end - 1] + 1
+        assert transcript_end - transcript_start == READ_LENGTH
+        assert spliced == (end - start != READ_LENGTH)
+        assert [sequence] == expected_mates(transcript, transcript_start, transcript_end, strand, paired=False)
@@ -0,0 +1,160 @@
+
+# test_sequence_store.py
+
+__module_name__ = "test_sequence_store.py"
+__author__ = ", ".join(["Michael E. Vinyard"])
+__email__ = ", ".join(["vinyard@g.harvard.edu",])
+
+
+"""
+Shared-memory SequenceStore: loading, views, attaching (by name and by pickle) and cleanup.
+"""
+
+
+# import packages #
+# --------------- #
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import os
+import pickle
+import pandas as pd
+import pytest
+
+
+# local imports #
+# ------------- #
+from seq_toolkit import SequenceStore, query_motif
+
+
+def fetch_in_worker(store, chromosome):
+    return store.fetch(chromosome, 10, 70)
+
+
+@pytest.fixture(params=["ref_seq_path", "sequences"])
+def store(request, genome):
+
+    Records, fasta_path = genome
+    if request.param == "ref_seq_path":
+        store = SequenceStore(fasta_path)
+    else:
+        store = SequenceStore(sequences=Records)
+
+    yield store
+
+    store.close()
+    store.unlink()
+
+
+def test_load(store, genome):
+
+    Records, _ = genome
+
+    assert store.chromosomes == list(Records)
+    assert store.lengths == {chromosome: len(sequence) for chromosome, sequence in Records.items()}
+    assert store.nbytes == sum(len(sequence) for sequence in Records.values())
+    assert len(store) == len(Records) and list(store) == list(Records) and "chr2" in store
+    for chromosome, sequence in Records.items():
+        assert store.fetch(chromosome) == sequence
+        assert bytes(store[chromosome]) == sequence.encode()
+
+
+@pytest.mark.parametrize(
+    "chromosome, start, end",
+    [("chr1", 0, None), ("chr1", 5, 17), ("chr2", 990, 1030), ("chr1", -10, 20), ("chr1", 2990, 5000), ("chr10", 40, 30)],
+)
+def test_view_and_fetch(store, genome, chromosome, start, end):
+
+    Records, _ = genome
+    sequence = Records[chromosome]
+
+    # coordinates are clipped to the chromosome
+    expected = sequence[max(start, 0) : end]
+    assert bytes(store.view(chromosome, start, end)) == expected.encode()
+    assert store.fetch(chromosome, start, end) == expected
+
+
+def test_views_are_read_only(store):
+
+    with pytest.raises(TypeError):
+        store.view("chr1")[0] = ord("A")
+
+    attached = SequenceStore.attach(store.name)
+    with pytest.raises(TypeError):
+        attached.view("chr1")[0] = ord("A")
+    attached.close()
+
+
+def test_pickle_and_attach(store, genome):
+
+    Records, _ = genome
+    for attached in [pickle.loads(pickle.dumps(store)), SequenceStore.attach(store.name)]:
+        assert not attached.owner
+        assert attached.name == store.name
+        assert attached.lengths == store.lengths
+        assert {chromosome: attached.fetch(chromosome) for chromosome in attached} == Records
+        attached.close()
+
+        # only the creating process removes the store
+        attached.unlink()
+        assert os.path.exists(store.path)
+
+
+def test_worker_processes(store, genome):
+
+    Records, _ = genome
+    with ProcessPoolExecutor(2) as executor:
+        fetched = list(executor.map(fetch_in_worker, itertools.repeat(store), store.chromosomes))
+
+    assert fetched == [sequence[10:70] for sequence in Records.values()]
+
+
+def test_query_motif_accepts_views(store, genome):
+
+    Records, _ = genome
+    pd.testing.assert_frame_equal(
+        query_motif(store["chr1"], "CANNTG", verbose=False), query_motif(Records["chr1"], "CANNTG", verbose=False)
+    )
+
+
+def test_close_and_unlink(genome):
+
+    Records, _ = genome
+    store = SequenceStore(sequences=Records, name="seq_toolkit_test_store")
+    assert os.path.exists(store.path)
+
+    view = store.view("chr10")
+    store.close()
+    # views handed out before close stay valid
+    assert bytes(view) == Records["chr10"].encode()
+    assert os.path.exists(store.path)
+
+    store.unlink()
+    assert not os.path.exists(store.path)
+    with pytest.raises(ValueError):
+        SequenceStore.attach("seq_toolkit_test_store")
+
+
+def test_context_manager_unlinks(genome):
+
+    _, fasta_path = genome
+    with SequenceStore(fasta_path) as store:
+        path = store.path
+        assert os.path.exists(path)
+        if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+            assert os.path.dirname(path) == "/dev/shm"
+
+    assert not os.path.exists(path)
+
+
+def test_invalid_arguments(genome):
+
+    Records, fasta_path = genome
+    with pytest.raises(ValueError):
+        SequenceStore()
+    with pytest.raises(ValueError):
+        SequenceStore(fasta_path, sequences=Records)
+    with pytest.raises(ValueError):
+        SequenceStore(sequences=Records, name="../escape")
+    with SequenceStore(sequences=Records) as store:
+        with pytest.raises(ValueError):
+            store.view("chrX")